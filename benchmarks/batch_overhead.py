@@ -0,0 +1,50 @@
+"""Measures the per batch overhead of the batch objects when evaluating a small model, i.e., creating the DatasetBatch,
+moving it to the device, wrapping the predictions into an InferenceResultBatch, filtering and aggregating the results.
+The model forward pass alone is reported as reference.
+
+    python benchmarks/batch_overhead.py --num_batches 20000 --batch_size 32 --device cpu
+"""
+import argparse
+import time
+import torch
+from ml_gym.batching.batch import DatasetBatch, InferenceResultBatch, InferenceResultBatchAggregator
+
+
+def run_forward(model: torch.nn.Module, samples: torch.Tensor, targets: torch.Tensor, tags: torch.Tensor, num_batches: int,
+                device: torch.device):
+    for _ in range(num_batches):
+        model(samples.to(device))
+
+
+def run_evaluation(model: torch.nn.Module, samples: torch.Tensor, targets: torch.Tensor, tags: torch.Tensor, num_batches: int,
+                   device: torch.device):
+    aggregator = InferenceResultBatchAggregator(num_samples=num_batches * len(samples), device=torch.device("cpu"))
+    prediction_paths = None
+    for _ in range(num_batches):
+        batch = DatasetBatch(samples=samples, targets={"target": targets}, tags=tags)
+        batch.to_device(device)
+        result_batch = InferenceResultBatch(targets=batch.targets, tags=batch.tags,
+                                            predictions={"logits": model(batch.samples), "hidden": {"pooled": batch.samples}})
+        result_batch.detach()
+        if prediction_paths is None:
+            prediction_paths = result_batch.get_prediction_paths(["logits"])
+        aggregator.add(result_batch.split_results(target_keys=["target"], predictions_keys=["logits"], prediction_paths=prediction_paths))
+    aggregator.get_result()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark of the per batch overhead of the batch objects')
+    parser.add_argument('--num_batches', type=int, default=20000)
+    parser.add_argument('--batch_size', type=int, default=32)
+    parser.add_argument('--device', type=str, default="cpu")
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    device = torch.device(args.device)
+    model = torch.nn.Linear(16, 4).to(device)
+    samples, targets, tags = torch.randn(args.batch_size, 16), torch.randint(0, 4, (args.batch_size,)), torch.arange(args.batch_size)
+    with torch.no_grad():
+        for name, fun in [("forward", run_forward), ("evaluation", run_evaluation)]:
+            start = time.perf_counter()
+            fun(model, samples, targets, tags, args.num_batches, device)
+            print(f"{name}: {(time.perf_counter() - start) / args.num_batches * 1e6:.1f} us per batch")
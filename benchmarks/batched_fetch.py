@@ -0,0 +1,50 @@
+"""Measures one epoch of a DatasetLoader over a stack of iterators (shuffled view, combined iterator, label mapping and
+one-hot encoded targets), i.e., the per sample overhead of the iterator stack.
+
+    python benchmarks/batched_fetch.py --num_samples 100000 --batch_size 256
+"""
+import argparse
+import time
+import torch
+from data_stack.dataset.factory import InformedDatasetFactory
+from data_stack.dataset.iterator import SequenceDatasetIterator
+from data_stack.dataset.meta import MetaFactory
+from ml_gym.data_handling.dataset_loader import DatasetLoader, SamplerFactory
+from ml_gym.data_handling.postprocessors.collator import Collator
+from ml_gym.data_handling.postprocessors.factory import ModelGymInformedIteratorFactory
+
+
+def get_iterator(num_samples: int):
+    iterator = SequenceDatasetIterator([torch.randn(num_samples, 16), torch.randint(0, 10, (num_samples,)), torch.arange(num_samples)])
+    iterator_meta = MetaFactory.get_iterator_meta(sample_pos=0, target_pos=1, tag_pos=2)
+    meta = MetaFactory.get_dataset_meta(identifier="benchmark", dataset_name="benchmark", dataset_tag="train", iterator_meta=iterator_meta)
+    iterator = InformedDatasetFactory.get_dataset_iterator(iterator, meta)
+    shuffled = ModelGymInformedIteratorFactory.get_shuffled_iterator("shuffled", iterator, seed=1)
+    combined = ModelGymInformedIteratorFactory.get_combined_iterators(
+        "combined", {"it": {"a": shuffled, "b": iterator}},
+        [{"new_split": "train", "old_splits": [{"iterators_name": "it", "splits": ["a", "b"]}]}])
+    mapped = ModelGymInformedIteratorFactory.get_mapped_labels_iterator(
+        "mapped", combined["train"], mappings=[{"previous_labels": [0, 1], "new_label": 2}])
+    return ModelGymInformedIteratorFactory.get_one_hot_encoded_target_iterators("one_hot", {"train": mapped}, 10)["train"]
+
+
+class StackingCollator(Collator):
+
+    def __call__(self, batch):
+        return torch.stack([sample[0] for sample in batch]), torch.stack([sample[1] for sample in batch])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark of the per sample overhead of the iterator stack')
+    parser.add_argument('--num_samples', type=int, default=100000)
+    parser.add_argument('--batch_size', type=int, default=256)
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    iterator = get_iterator(args.num_samples)
+    data_loader = DatasetLoader(dataset_iterator=iterator, batch_size=args.batch_size,
+                                sampler=SamplerFactory.get_random_sampler(iterator, seed=0), collate_fn=StackingCollator())
+    start = time.perf_counter()
+    for _ in data_loader:
+        pass
+    print(f"epoch: {time.perf_counter() - start:.2f} s")
@@ -0,0 +1,32 @@
+"""Measures fitting and transforming a categorical table column by column with the CategoricalEncoder.
+
+    python benchmarks/categorical_encoder.py --num_rows 1000000 --num_features 50 --cardinality 20
+"""
+import argparse
+import time
+import numpy as np
+from ml_gym.data_handling.postprocessors.feature_encoder import CategoricalEncoder
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark of the categorical encoder')
+    parser.add_argument('--num_rows', type=int, default=1000000)
+    parser.add_argument('--num_features', type=int, default=50)
+    parser.add_argument('--cardinality', type=int, default=20)
+    parser.add_argument('--output_codes', action="store_true")
+    args = parser.parse_args()
+
+    table = np.random.default_rng(0).integers(0, args.cardinality, (args.num_rows, args.num_features))
+    encoder_params = {"output_codes": True} if args.output_codes else {}
+    encoders = [CategoricalEncoder(**encoder_params) for _ in range(args.num_features)]
+
+    start = time.perf_counter()
+    for feature_index, encoder in enumerate(encoders):
+        encoder.fit(table[:, feature_index])
+    fit_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for feature_index, encoder in enumerate(encoders):
+        encoder.transform(table[:, feature_index])
+    transform_duration = time.perf_counter() - start
+    print(f"fit: {fit_duration:.2f} s, transform: {transform_duration:.2f} s")
@@ -0,0 +1,54 @@
+"""Compares iterating an evaluation split of tabular samples through the DatasetLoader in every epoch with iterating the
+batches cached by the EvalBatchCache after the first epoch.
+
+    python benchmarks/eval_batch_cache.py --num_samples 100000 --num_features 64 --batch_size 256 --num_epochs 5 --location ram
+"""
+import argparse
+import time
+from typing import List, Tuple
+import torch
+from data_stack.dataset.factory import InformedDatasetFactory
+from data_stack.dataset.iterator import SequenceDatasetIterator
+from data_stack.dataset.meta import MetaFactory
+from ml_gym.batching.batch import DatasetBatch
+from ml_gym.data_handling.dataset_loader import DatasetLoader, SamplerFactory
+from ml_gym.data_handling.eval_batch_cache import EvalBatchCache
+from ml_gym.data_handling.postprocessors.collator import Collator
+
+
+class TabularCollator(Collator):
+
+    def __call__(self, batch: List[Tuple[torch.Tensor, int]]) -> DatasetBatch:
+        samples = torch.stack([sample for sample, _ in batch])
+        targets = torch.tensor([target for _, target in batch])
+        return DatasetBatch(samples=samples, targets={"target": targets}, tags=targets)
+
+
+def get_loader(num_samples: int, num_features: int, batch_size: int) -> DatasetLoader:
+    samples, targets = list(torch.randn(num_samples, num_features)), torch.randint(0, 2, (num_samples,)).tolist()
+    iterator_meta = MetaFactory.get_iterator_meta(sample_pos=0, target_pos=1, tag_pos=1)
+    meta = MetaFactory.get_dataset_meta(identifier="tabular", dataset_name="tabular", dataset_tag="val", iterator_meta=iterator_meta)
+    iterator = InformedDatasetFactory.get_dataset_iterator(SequenceDatasetIterator([samples, targets]), meta)
+    return DatasetLoader(iterator, batch_size=batch_size, sampler=SamplerFactory.get_sequential_sampler(iterator),
+                         collate_fn=TabularCollator())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark of the evaluation batch cache')
+    parser.add_argument('--num_samples', type=int, default=100000)
+    parser.add_argument('--num_features', type=int, default=64)
+    parser.add_argument('--batch_size', type=int, default=256)
+    parser.add_argument('--num_epochs', type=int, default=5)
+    parser.add_argument('--location', type=str, default="ram")
+    parser.add_argument('--folder', type=str, default=None)
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    loader = get_loader(args.num_samples, args.num_features, args.batch_size)
+    cache = EvalBatchCache(location=args.location, folder=args.folder)
+    for name, get_batches in [("loader", lambda: loader), ("cache", lambda: cache.iterate("val", loader, torch.device("cpu")))]:
+        for epoch in range(args.num_epochs):
+            start = time.perf_counter()
+            for batch in get_batches():
+                batch.samples.sum()
+            print(f"{name} epoch {epoch}: {time.perf_counter() - start:.3f} s")
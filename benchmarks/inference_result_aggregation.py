@@ -0,0 +1,43 @@
+"""Compares the aggregation of the inference result batches of a split by concatenating the collected batches
+(InferenceResultBatch.combine) with the in place aggregation into preallocated buffers (InferenceResultBatchAggregator).
+
+    python benchmarks/inference_result_aggregation.py --num_samples 1000000 --batch_size 256 --num_classes 100
+"""
+import argparse
+import time
+import torch
+from ml_gym.batching.batch import InferenceResultBatch, InferenceResultBatchAggregator
+
+
+def get_batches(num_samples: int, batch_size: int, num_classes: int):
+    for offset in range(0, num_samples, batch_size):
+        size = min(batch_size, num_samples - offset)
+        yield InferenceResultBatch(targets={"target": torch.randint(0, num_classes, (size,))},
+                                   predictions={"logits": torch.randn(size, num_classes), "embedding": {"pooled": torch.randn(size, 16)}},
+                                   tags=torch.arange(offset, offset + size))
+
+
+def combine(num_samples: int, batch_size: int, num_classes: int) -> InferenceResultBatch:
+    return InferenceResultBatch.combine(list(get_batches(num_samples, batch_size, num_classes)))
+
+
+def aggregate(num_samples: int, batch_size: int, num_classes: int) -> InferenceResultBatch:
+    aggregator = InferenceResultBatchAggregator(num_samples=num_samples)
+    for batch in get_batches(num_samples, batch_size, num_classes):
+        aggregator.add(batch)
+    return aggregator.get_result()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark of the aggregation of inference result batches')
+    parser.add_argument('--num_samples', type=int, default=1000000)
+    parser.add_argument('--batch_size', type=int, default=256)
+    parser.add_argument('--num_classes', type=int, default=100)
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    for name, fun in [("combine", combine), ("aggregator", aggregate)]:
+        torch.manual_seed(0)
+        start = time.perf_counter()
+        fun(args.num_samples, args.batch_size, args.num_classes)
+        print(f"{name}: {time.perf_counter() - start:.2f} s")
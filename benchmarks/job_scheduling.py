@@ -0,0 +1,71 @@
+"""Measures the scheduling overhead of the Pool for a sweep of no-op jobs, whose param_dicts carry a config of the size of a
+typical experiment config, i.e., the time for enqueueing the jobs, for running them and for the JobCollection bookkeeping of
+the status updates. Additionally, reports the sizes of the messages passed through the queues per job.
+
+    python benchmarks/job_scheduling.py --num_jobs 50000 --num_processes 4
+"""
+import argparse
+import pickle
+import tempfile
+import time
+import torch
+from ml_gym.multiprocessing.job import Job, JobCollection, JobStatusUpdate
+from ml_gym.multiprocessing.pool import Pool
+from ml_gym.multiprocessing.states import JobStatus
+from ml_gym.util.logger import QueuedLogging
+
+
+def noop(blueprint, device, config):
+    return None
+
+
+def get_jobs(num_jobs: int, config_size: int):
+    config = {f"component_{i}": {"component_type_key": "DATASET_ITERATORS", "variant_key": "DEFAULT", "config": {"value": i}}
+              for i in range(config_size)}
+    return [Job(job_id=i, fun=noop, blueprint=None, param_dict={"config": config}) for i in range(num_jobs)]
+
+
+def run_bookkeeping(num_jobs: int, config_size: int):
+    jobs = get_jobs(num_jobs, config_size)
+    job_collection = JobCollection()
+    for job in jobs:
+        job_collection.add_or_update_job(job)
+    start = time.perf_counter()
+    for status in [JobStatus.RUNNING, JobStatus.DONE]:
+        for job in jobs:
+            job_collection.apply_update(JobStatusUpdate(job_id=job.job_id, status=status, starting_time=1.0, finishing_time=2.0,
+                                                        executing_process_id=0, device="cpu"))
+            job_collection.done
+            job_collection.done_count
+    duration = time.perf_counter() - start
+    print(f"JobCollection bookkeeping of {2 * num_jobs} updates: {duration:.2f} s")
+
+
+def run_pool(num_jobs: int, num_processes: int, config_size: int):
+    jobs = get_jobs(num_jobs, config_size)
+    update = JobStatusUpdate.from_job(jobs[0])
+    print(f"Pickled job: {len(pickle.dumps(jobs[0]))} bytes, status update: {len(pickle.dumps(update))} bytes")
+    pool = Pool(num_processes=num_processes, devices=[torch.device("cpu")], max_jobs_per_process=num_jobs)
+    start = time.perf_counter()
+    pool.add_jobs(jobs)
+    enqueued = time.perf_counter()
+    pool.run()
+    duration = time.perf_counter() - start
+    print(f"Enqueueing: {enqueued - start:.2f} s, total: {duration:.2f} s, {num_jobs / duration:.0f} jobs/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark of the scheduling overhead of the Pool')
+    parser.add_argument('--num_jobs', type=int, default=50000)
+    parser.add_argument('--num_processes', type=int, default=4)
+    parser.add_argument('--config_size', type=int, default=50)
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    run_bookkeeping(args.num_jobs, args.config_size)
+    with tempfile.TemporaryDirectory() as log_dir_path:
+        QueuedLogging.start_logging(log_dir_path)
+        try:
+            run_pool(args.num_jobs, args.num_processes, args.config_size)
+        finally:
+            QueuedLogging.stop_listener()
@@ -0,0 +1,41 @@
+"""Measures the construction time of the weighted random sampler, the label filter and the stratified split, which all
+read the labels of every sample.
+
+    python benchmarks/label_index.py --num_samples 10000000
+"""
+import argparse
+import time
+import torch
+from data_stack.dataset.iterator import SequenceDatasetIterator
+from data_stack.dataset.factory import InformedDatasetFactory
+from data_stack.dataset.meta import MetaFactory
+from ml_gym.data_handling.dataset_loader import SamplerFactory
+from ml_gym.data_handling.postprocessors.factory import ModelGymInformedIteratorFactory
+
+
+def get_iterator(num_samples: int, num_classes: int):
+    samples = torch.zeros(num_samples, 1)
+    targets = torch.randint(0, num_classes, (num_samples,)).tolist()
+    iterator = SequenceDatasetIterator([samples, targets, targets])
+    iterator_meta = MetaFactory.get_iterator_meta(sample_pos=0, target_pos=1, tag_pos=2)
+    meta = MetaFactory.get_dataset_meta(identifier="benchmark", dataset_name="benchmark", dataset_tag="train", iterator_meta=iterator_meta)
+    return InformedDatasetFactory.get_dataset_iterator(iterator, meta)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark of the label based sampler, filter and split construction')
+    parser.add_argument('--num_samples', type=int, default=10000000)
+    parser.add_argument('--num_classes', type=int, default=10)
+    args = parser.parse_args()
+
+    benchmarks = {
+        "weighted_sampler": lambda it: SamplerFactory.get_weighted_sampler(it, label_pos=2, seed=0),
+        "filtered_labels": lambda it: ModelGymInformedIteratorFactory.get_filtered_labels_iterator("filtered", it, [0, 1]),
+        "stratified_split": lambda it: ModelGymInformedIteratorFactory.get_splitted_iterators("split", {"train": it}, 1, True,
+                                                                                              {"train": {"a": 0.8, "b": 0.2}}),
+    }
+    for name, fun in benchmarks.items():
+        iterator = get_iterator(args.num_samples, args.num_classes)  # fresh iterator, i.e., the label index is built within the measurement
+        start = time.perf_counter()
+        fun(iterator)
+        print(f"{name}: {time.perf_counter() - start:.3f} s")
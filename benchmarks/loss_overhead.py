@@ -0,0 +1,53 @@
+"""Measures the per batch overhead of the loss functions for small models, i.e., small batches where the
+Python overhead of the loss computation dominates over the actual tensor operations.
+
+    python benchmarks/loss_overhead.py --batch_size 32 --num_classes 10
+"""
+import argparse
+import timeit
+import torch
+from ml_gym.batching.batch import InferenceResultBatch
+from ml_gym.loss_functions.loss_factory import LossFactory
+from ml_gym.loss_functions.loss_scaler import MeanScaler, NoScaler
+from ml_gym.loss_functions.multi_term_loss_functions import MultiLoss
+
+
+def get_inference_result_batch(batch_size: int, num_classes: int) -> InferenceResultBatch:
+    targets = {"class": torch.randint(0, num_classes, (batch_size,)),
+               "binary": torch.randint(0, 2, (batch_size, 1)),
+               "reconstruction": torch.randn(batch_size, num_classes)}
+    predictions = {"logits": torch.randn(batch_size, num_classes, requires_grad=True),
+                   "binary_logits": torch.randn(batch_size, 1, requires_grad=True),
+                   "reconstruction": torch.randn(batch_size, num_classes, requires_grad=True)}
+    return InferenceResultBatch(targets=targets, predictions=predictions, tags=torch.arange(batch_size))
+
+
+def get_loss_funs():
+    cross_entropy = LossFactory.get_cross_entropy_loss("class", "logits")
+    bce = LossFactory.get_bce_with_logits_loss("binary", "binary_logits")
+    lp_selected = LossFactory.get_lp_loss("reconstruction", "reconstruction",
+                                          class_selection_fun_params={"target_subscription_key": "class", "selected_class": 1})
+    mean_scaler = MeanScaler()
+    mean_scaler.mean = 2.0
+    multi_loss = MultiLoss(tag="multi", scalers=[mean_scaler, NoScaler(), NoScaler()],
+                           loss_terms=[cross_entropy, bce, LossFactory.get_lp_loss("reconstruction", "reconstruction")],
+                           loss_weights=[1.0, 0.5, 0.1])
+    return {"cross_entropy": cross_entropy,
+            "nll": LossFactory.get_nll_loss("class", "logits"),
+            "lp_loss_with_class_selection": lp_selected,
+            "multi_loss": multi_loss}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark of the per batch loss overhead')
+    parser.add_argument('--batch_size', type=int, default=32)
+    parser.add_argument('--num_classes', type=int, default=10)
+    parser.add_argument('--repetitions', type=int, default=10000)
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    batch = get_inference_result_batch(args.batch_size, args.num_classes)
+    for name, loss_fun in get_loss_funs().items():
+        loss_fun(batch)  # warm up
+        duration = min(timeit.repeat(lambda: loss_fun(batch), number=args.repetitions, repeat=3)) / args.repetitions
+        print(f"{name}: {duration * 1e6:.1f} us/batch")
@@ -0,0 +1,109 @@
+"""Measures the wall time and peak memory of registering model parameters with an `OptimizerAdapter`.
+
+Each scenario runs in a fresh process. The peak memory is the maximum resident set size sampled while the
+scenario runs, relative to the resident set size right before it starts.
+
+    python benchmarks/optimizer_registration.py --num_params 50000000
+"""
+import argparse
+import pickle
+import os
+import threading
+import time
+import torch
+from torch.optim import Adam
+from torch.multiprocessing import Process, Queue
+from ml_gym.optimizers.optimizer import OptimizerAdapter
+
+
+def get_model(num_params: int, num_layers: int = 10) -> torch.nn.Module:
+    width = int((num_params / num_layers) ** 0.5)
+    return torch.nn.Sequential(*[torch.nn.Linear(width, width, bias=False) for _ in range(num_layers)])
+
+
+def get_trained_adapter(model: torch.nn.Module) -> OptimizerAdapter:
+    optimizer = OptimizerAdapter(Adam, {"lr": 0.001})
+    optimizer.register_model_params(model_params=dict(model.named_parameters()))
+    for p in model.parameters():
+        p.grad = torch.ones_like(p)
+    optimizer.step()
+    return optimizer
+
+
+class PeakMemorySampler:
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.baseline = self._get_rss()
+        self.peak = self.baseline
+        self._running = False
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    @staticmethod
+    def _get_rss() -> int:
+        with open("/proc/self/statm") as fd:
+            return int(fd.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+    def _sample(self):
+        while self._running:
+            self.peak = max(self.peak, self._get_rss())
+            time.sleep(self.interval)
+
+    def __enter__(self) -> "PeakMemorySampler":
+        self._running = True
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._running = False
+        self._thread.join()
+        self.peak = max(self.peak, self._get_rss())
+
+    @property
+    def peak_increase_mb(self) -> float:
+        return (self.peak - self.baseline) / 1024**2
+
+
+def run_reregistration(num_params: int, result_q: Queue):
+    model = get_model(num_params)
+    optimizer = get_trained_adapter(model)
+    with PeakMemorySampler() as sampler:
+        start = time.perf_counter()
+        optimizer.register_model_params(model_params=dict(model.named_parameters()))
+        duration = time.perf_counter() - start
+    result_q.put(("re-registration", duration, sampler.peak_increase_mb))
+
+
+def run_warm_start(num_params: int, result_q: Queue):
+    model = get_model(num_params)
+    state_dict = get_trained_adapter(model).state_dict()
+    # serialize the state the same way the checkpoint logger does
+    if hasattr(OptimizerAdapter, "serialize_state_dict"):
+        serialized_state = OptimizerAdapter.serialize_state_dict(state_dict)
+    else:
+        serialized_state = pickle.dumps(state_dict)
+    del state_dict
+    model = get_model(num_params)
+    with PeakMemorySampler() as sampler:
+        start = time.perf_counter()
+        optimizer = OptimizerAdapter(Adam, {"lr": 0.001})
+        if hasattr(optimizer, "load_serialized_state_dict"):
+            optimizer.load_serialized_state_dict(serialized_state)
+        else:
+            optimizer.load_state_dict(pickle.loads(serialized_state))
+        optimizer.register_model_params(model_params=dict(model.named_parameters()))
+        duration = time.perf_counter() - start
+    result_q.put(("warm start", duration, sampler.peak_increase_mb))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark of the optimizer parameter registration')
+    parser.add_argument('--num_params', type=int, default=50000000)
+    args = parser.parse_args()
+
+    result_q = Queue()
+    for scenario in [run_reregistration, run_warm_start]:
+        p = Process(target=scenario, args=(args.num_params, result_q))
+        p.start()
+        p.join()
+        name, duration, peak_increase = result_q.get()
+        print(f"{name}: {duration:.3f}s, peak RSS increase: {peak_increase:.1f} MB")
@@ -0,0 +1,67 @@
+"""Compares the throughput of passing inference result batches with 100MB of prediction tensors to another process by
+pickling them through a multiprocessing queue with passing them through the SharedTensorRing.
+
+    python benchmarks/tensor_transport.py --num_batches 20 --prediction_mb 100
+"""
+import argparse
+import pickle
+import time
+import torch
+from torch.multiprocessing import get_context
+from ml_gym.batching.batch import InferenceResultBatch
+from ml_gym.multiprocessing.tensor_transport import SharedTensorRing, SharedTensorQueue
+
+
+def consume_pickled(queue, done_q, num_batches: int):
+    done_q.put(True)
+    for _ in range(num_batches):
+        # the batches are pickled explicitly, as torch registers shared memory reductions for tensors in the queues
+        batch = pickle.loads(queue.get())
+        batch.get_predictions("logits")[0, 0].item()
+    done_q.put(True)
+
+
+def consume_shared(shared_q: SharedTensorQueue, done_q, num_batches: int):
+    done_q.put(True)
+    for _ in range(num_batches):
+        with shared_q.get() as batch:
+            batch.get_predictions("logits")[0, 0].item()
+    done_q.put(True)
+
+
+def get_batch(prediction_mb: int) -> InferenceResultBatch:
+    num_samples = prediction_mb * 2**20 // (4 * 1000)
+    return InferenceResultBatch(targets={"target": torch.zeros(num_samples, dtype=torch.long)}, tags=torch.arange(num_samples),
+                                predictions={"logits": torch.randn(num_samples, 1000)})
+
+
+def run(name: str, target, queue, put_fun, num_batches: int, batch: InferenceResultBatch, context):
+    done_q = context.Queue()
+    process = context.Process(target=target, args=(queue, done_q, num_batches))
+    process.start()
+    # the consumer signals when it is ready, such that its start up is not measured
+    done_q.get()
+    start = time.perf_counter()
+    for _ in range(num_batches):
+        put_fun(batch)
+    done_q.get()
+    duration = time.perf_counter() - start
+    process.join()
+    num_bytes = sum(t.numel() * t.element_size() for t in batch.flat_predictions.values())
+    print(f"{name}: {duration:.2f} s, {num_batches * num_bytes / 2**30 / duration:.2f} GiB/s of predictions")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark of passing batches between processes')
+    parser.add_argument('--num_batches', type=int, default=20)
+    parser.add_argument('--prediction_mb', type=int, default=100)
+    args = parser.parse_args()
+
+    context = get_context("spawn")
+    batch = get_batch(args.prediction_mb)
+    queue = context.Queue()
+    pickled_put = lambda b: queue.put(pickle.dumps(b, protocol=pickle.HIGHEST_PROTOCOL))  # noqa: E731
+    run("pickled", consume_pickled, queue, pickled_put, args.num_batches, batch, context)
+    ring = SharedTensorRing(num_slots=2, slot_size_bytes=(args.prediction_mb + 2) * 2**20, context=context)
+    shared_q = SharedTensorQueue(context.Queue(), ring)
+    run("shared tensor ring", consume_shared, shared_q, shared_q.put, args.num_batches, batch, context)
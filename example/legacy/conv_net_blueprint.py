@@ -7,7 +7,7 @@ from ml_gym.blueprints.blue_prints import BluePrint
 from ml_gym.gym.jobs import AbstractGymJob, GymJobFactory
 from ml_gym.batching.batch import DatasetBatch
 from dataclasses import dataclass
-from ml_gym.blueprints.component_factory import ComponentFactory, Injector
+from ml_gym.blueprints.component_factory import ComponentFactory, Injector, SharedComponents
 from ml_gym.data_handling.postprocessors.collator import Collator
 from ml_gym.persistency.io import GridSearchAPIClientConstructableIF
 from conv_net import ConvNet
@@ -53,7 +53,8 @@ class ConvNetBluePrint(BluePrint):
                          experiment_id, external_injection, logger_collection_constructable, warm_start_epoch)
 
     @staticmethod
-    def construct_components(config: Dict, component_names: List[str], device: torch.device, external_injection: Dict[str, Any] = None) -> Dict[str, Any]:
+    def construct_components(config: Dict, component_names: List[str], device: torch.device, external_injection: Dict[str, Any] = None,
+                             shared_components: SharedComponents = None) -> Dict[str, Any]:
         if external_injection is not None:
             injection_mapping = {"id_conv_mnist_standard_collator": MNISTCollator,
                                  "id_computation_device": device,
@@ -64,15 +65,16 @@ class ConvNetBluePrint(BluePrint):
             injection_mapping = {"id_conv_mnist_standard_collator": MNISTCollator}
             injector = Injector(injection_mapping, raise_mapping_not_found=False)
 
-        component_factory = ComponentFactory(injector)
+        component_factory = ComponentFactory(injector, shared_components=shared_components)
         component_factory.register_component_type("MODEL_REGISTRY", "DEFAULT", MyModelRegistryConstructable)
 
         components = component_factory.build_components_from_config(config, component_names)
         return components
 
-    def construct(self, device: torch.device = None) -> AbstractGymJob:
+    def construct(self, device: torch.device = None, shared_components: SharedComponents = None) -> AbstractGymJob:
         component_names = ["model", "trainer", "optimizer", "evaluator", "early_stopping_strategy", "checkpointing_strategy"]
-        components = ConvNetBluePrint.construct_components(self.config, component_names, device, self.external_injection)
+        components = ConvNetBluePrint.construct_components(self.config, component_names, device, self.external_injection,
+                                                           shared_components)
 
         logger_collection = self.logger_collection_constructable.construct()
         experiment_status_logger = ExperimentStatusLogger(logger=logger_collection, grid_search_id=self.grid_search_id,
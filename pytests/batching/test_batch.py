@@ -2,7 +2,8 @@ from typing import List, Union
 
 import pytest
 import torch
-from ml_gym.batching.batch import InferenceResultBatch, DatasetBatch
+from ml_gym.error_handling.exception import BatchStateError
+from ml_gym.batching.batch import InferenceResultBatch, DatasetBatch, InferenceResultBatchAggregator
 
 
 class TestInferenceResultBatch:
@@ -48,6 +49,97 @@ class TestInferenceResultBatch:
         assert len(filtered_inference_batch_result.targets.keys()) == target_num
         assert len(filtered_inference_batch_result.predictions.keys()) == predictions_num
 
+    def test_flat_predictions(self, inference_batch_result):
+        assert set(inference_batch_result.flat_predictions.keys()) == {("a",), ("b", "b_1"), ("b", "b_2")}
+        assert list(inference_batch_result.predictions["b"].keys()) == ["b_1", "b_2"]
+        assert inference_batch_result.get_predictions(("b", "b_2")) is inference_batch_result.predictions["b"]["b_2"]
+
+    def test_nested_view_writes_through(self, inference_batch_result):
+        inference_batch_result.add_predictions("c", {"c_1": torch.zeros(6)})
+        inference_batch_result.predictions["b"]["b_1"] = torch.ones(6)
+        inference_batch_result.drop_predictions(["a"])
+        assert set(inference_batch_result.flat_predictions.keys()) == {("b", "b_1"), ("b", "b_2"), ("c", "c_1")}
+        assert torch.equal(inference_batch_result.predictions.to_dict()["b"]["b_1"], torch.ones(6))
+
+    @pytest.mark.parametrize("predictions_keys, prediction_paths",
+                             [
+                                 (["a"], [("a",)]),
+                                 (["b"], [("b", "b_1"), ("b", "b_2")]),
+                                 ([["b", "b_2"], "a"], [("b", "b_2"), ("a",)]),
+                                 ([["*", "b_1"]], [("b", "b_1")]),
+                             ])
+    def test_get_prediction_paths(self, inference_batch_result, predictions_keys, prediction_paths):
+        assert inference_batch_result.get_prediction_paths(predictions_keys) == prediction_paths
+        filtered_inference_batch_result = inference_batch_result.split_results([], predictions_keys, prediction_paths=prediction_paths)
+        assert list(filtered_inference_batch_result.flat_predictions.keys()) == prediction_paths
+
+    def test_split_results_without_copy(self, inference_batch_result):
+        filtered_inference_batch_result = inference_batch_result.split_results(["target_key"], ["a"], torch.device("cpu"))
+        assert filtered_inference_batch_result.predictions["a"] is inference_batch_result.predictions["a"]
+        assert filtered_inference_batch_result.tags is inference_batch_result.tags
+
+    def test_lazy_split_results(self, inference_batch_result):
+        inference_batch_result.to_device(torch.device("meta"))
+        filtered_inference_batch_result = inference_batch_result.split_results(["target_key"], ["a"])
+        assert filtered_inference_batch_result.predictions["a"].device == torch.device("meta")
+        # the pending move of the source batch is only applied to the selected tensors
+        assert inference_batch_result._predictions[("b", "b_1")].device == torch.device("cpu")
+
+    def test_combine(self, inference_batch_result):
+        combined_batch = InferenceResultBatch.combine([inference_batch_result, inference_batch_result])
+        assert torch.equal(combined_batch.tags, torch.cat([inference_batch_result.tags, inference_batch_result.tags]))
+        assert combined_batch.predictions["b"]["b_1"].shape == (12,)
+        assert torch.equal(InferenceResultBatch.combine_pair(inference_batch_result, inference_batch_result).tags, combined_batch.tags)
+
+
+class TestInferenceResultBatchAggregator:
+
+    @staticmethod
+    def get_batches(num_batches: int, batch_size: int) -> List[InferenceResultBatch]:
+        batches = []
+        for i in range(num_batches):
+            indices = torch.arange(i * batch_size, (i + 1) * batch_size)
+            batches.append(InferenceResultBatch(targets={"target": indices % 2},
+                                                predictions={"a": indices.float().unsqueeze(1).repeat(1, 3), "b": {"b_1": indices * 2}},
+                                                tags=indices))
+        return batches
+
+    @pytest.mark.parametrize("num_samples", [20, 15, 4])
+    def test_aggregation_equals_combine(self, num_samples: int):
+        batches = TestInferenceResultBatchAggregator.get_batches(num_batches=4, batch_size=5)
+        aggregator = InferenceResultBatchAggregator(num_samples=num_samples)
+        for batch in batches:
+            aggregator.add(batch)
+        aggregated_batch = aggregator.get_result()
+        combined_batch = InferenceResultBatch.combine(batches)
+        assert len(aggregator) == 20
+        assert torch.equal(aggregated_batch.tags, combined_batch.tags)
+        assert torch.equal(aggregated_batch.targets["target"], combined_batch.targets["target"])
+        assert torch.equal(aggregated_batch.predictions["a"], combined_batch.predictions["a"])
+        assert torch.equal(aggregated_batch.predictions["b"]["b_1"], combined_batch.predictions["b"]["b_1"])
+
+    def test_result_is_truncated(self):
+        aggregator = InferenceResultBatchAggregator(num_samples=100, device=torch.device("cpu"))
+        for batch in TestInferenceResultBatchAggregator.get_batches(num_batches=2, batch_size=5):
+            aggregator.add(batch)
+        assert len(aggregator.get_result()) == 10
+
+    def test_untagged_batches(self):
+        aggregator = InferenceResultBatchAggregator(num_samples=10)
+        for batch in TestInferenceResultBatchAggregator.get_batches(num_batches=2, batch_size=5):
+            aggregator.add(InferenceResultBatch(targets=batch.targets, predictions=batch.predictions, tags=torch.Tensor()))
+        aggregated_batch = aggregator.get_result()
+        assert aggregated_batch.tags.numel() == 0
+        assert len(aggregated_batch.targets["target"]) == 10
+
+    def test_inconsistent_batches_raise(self):
+        batches = TestInferenceResultBatchAggregator.get_batches(num_batches=2, batch_size=5)
+        batches[1].predictions["a"] = batches[1].predictions["a"][:, :2]
+        aggregator = InferenceResultBatchAggregator(num_samples=10)
+        aggregator.add(batches[0])
+        with pytest.raises(BatchStateError):
+            aggregator.add(batches[1])
+
 
 class TestDatasetBatch:
     target_key = "target_key"
@@ -72,3 +164,20 @@ class TestDatasetBatch:
 
     def test_detach(self, dataset_batch: DatasetBatch):
         dataset_batch.detach()
+
+    def test_lazy_to_device(self, dataset_batch: DatasetBatch):
+        samples = dataset_batch._samples
+        dataset_batch.to_device(torch.device("meta"), non_blocking=True)
+        assert dataset_batch.get_device() == torch.device("meta")
+        assert dataset_batch._samples is samples
+        assert dataset_batch.samples.device == torch.device("meta")
+        assert dataset_batch.targets[TestDatasetBatch.target_key].device == torch.device("meta")
+
+    def test_to_same_device_is_noop(self, dataset_batch: DatasetBatch):
+        samples = dataset_batch.samples
+        dataset_batch.to_device(torch.device("cpu"))
+        assert dataset_batch.samples is samples
+
+    def test_slots(self, dataset_batch: DatasetBatch):
+        assert not hasattr(dataset_batch, "__dict__")
+        assert not hasattr(InferenceResultBatch(), "__dict__")
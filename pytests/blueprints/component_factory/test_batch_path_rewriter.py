@@ -0,0 +1,74 @@
+import random
+from dataclasses import dataclass
+from typing import Any, Dict, List
+import pytest
+import torch
+from ml_gym.batching.batch import DatasetBatch
+from ml_gym.blueprints.component_factory import ComponentFactory
+from ml_gym.data_handling.postprocessors.collator import Collator
+from ml_gym.data_handling.postprocessors.collator_stages import StagedCollator
+from pytests.blueprints.constructables.mocked_classes import MockedRepositoryConstructable, get_mocked_mnist_pipeline_config
+
+
+@dataclass
+class StackingCollator(Collator):
+    label_preserving = True
+    target_publication_key: str = None
+
+    def __call__(self, batch: List[torch.Tensor]) -> DatasetBatch:
+        samples = torch.stack([item[0] for item in batch])
+        targets = torch.stack([torch.as_tensor(item[1]) for item in batch])
+        tags = torch.as_tensor([item[2] for item in batch])
+        return DatasetBatch(samples=samples, targets={self.target_publication_key: targets}, tags=tags)
+
+
+class TestBatchPathRewriter:
+
+    @pytest.fixture
+    def config(self) -> Dict[str, Any]:
+        return {
+            **get_mocked_mnist_pipeline_config(),
+            "mapped_labels": {"component_type_key": "MAPPED_LABELS_ITERATOR", "variant_key": "DEFAULT",
+                              "requirements": [{"name": "iterators", "component_name": "dataset_iterators"}],
+                              "config": {"applicable_splits": ["train", "test"],
+                                         "mappings": [{"previous_labels": [0, 1], "new_label": 2}, {"previous_labels": [2], "new_label": 3}]}},
+            "one_hot_targets": {"component_type_key": "ONE_HOT_ENCODED_TARGETS_ITERATOR", "variant_key": "DEFAULT",
+                                "requirements": [{"name": "iterators", "component_name": "mapped_labels"}],
+                                "config": {"applicable_splits": ["train"], "target_vector_size": 10}},
+            "data_collator": {"component_type_key": "DATA_COLLATOR", "variant_key": "DEFAULT",
+                              "config": {"collator_type": StackingCollator, "collator_params": {"target_publication_key": "target"}}},
+            "data_loaders": {"component_type_key": "DATA_LOADER", "variant_key": "FUTURE",
+                             "requirements": [{"name": "iterators", "component_name": "one_hot_targets", "subscription": ["train"]},
+                                              {"name": "data_collator", "component_name": "data_collator"}],
+                             "config": {"batch_size": 50, "sampling_strategies": {"train": {"strategy": "IN_ORDER"}}}}
+        }
+
+    @staticmethod
+    def build_data_loaders(config: Dict[str, Any], rewrite_batch_path: bool):
+        component_factory = ComponentFactory(rewrite_batch_path=rewrite_batch_path)
+        component_factory.register_component_type("MOCKED_REPOSITORY", "DEFAULT", MockedRepositoryConstructable)
+        random.seed(0)
+        torch.manual_seed(0)
+        return component_factory.build_components_from_config(config, ["data_loaders"])["data_loaders"]
+
+    def test_rewrite(self, config: Dict[str, Any]):
+        component_representations = ComponentFactory()._calc_dependency_graph(config)
+        assert component_representations["data_loaders"].requirements["iterators"].component_name == "dataset_iterators"
+        assert [stage["stage_type"] for stage in component_representations["data_collator"].config["batch_stages"]] == \
+            ["label_mapping", "one_hot_encoded_targets"]
+
+    def test_batches_equal(self, config: Dict[str, Any]):
+        data_loaders = TestBatchPathRewriter.build_data_loaders(config, rewrite_batch_path=False)
+        rewritten_data_loaders = TestBatchPathRewriter.build_data_loaders(config, rewrite_batch_path=True)
+        assert not isinstance(data_loaders["train"].collate_fn, StagedCollator)
+        assert isinstance(rewritten_data_loaders["train"].collate_fn, StagedCollator)
+        for batch, rewritten_batch in zip(data_loaders["train"], rewritten_data_loaders["train"]):
+            assert torch.equal(batch.samples, rewritten_batch.samples)
+            assert torch.equal(batch.targets["target"], rewritten_batch.targets["target"])
+            assert torch.equal(batch.tags, rewritten_batch.tags)
+
+    def test_weighted_sampling_is_not_rewritten(self, config: Dict[str, Any]):
+        config["data_loaders"]["config"]["sampling_strategies"] = {"train": {"strategy": "WEIGHTED_RANDOM", "label_pos": 2}}
+        component_representations = ComponentFactory()._calc_dependency_graph(config)
+        assert component_representations["data_loaders"].requirements["iterators"].component_name == "one_hot_targets"
+        assert "batch_stages" not in component_representations["data_collator"].config
@@ -0,0 +1,87 @@
+from typing import Any, Dict
+import numpy as np
+import pytest
+import torch
+from ml_gym.blueprints.component_cache import ComponentCache
+from ml_gym.blueprints.component_factory import ComponentFactory
+from pytests.blueprints.constructables.mocked_classes import MockedRepositoryConstructable, get_mocked_mnist_pipeline_config
+
+
+class TestComponentCache:
+
+    @pytest.fixture(autouse=True)
+    def component_cache(self):
+        ComponentCache.clear()
+        ComponentCache.configure(max_size_bytes=2**30)
+        yield ComponentCache
+        ComponentCache.configure(max_size_bytes=0)
+        ComponentCache.clear()
+
+    @pytest.fixture
+    def config(self) -> Dict[str, Any]:
+        # the repository is registered as the cacheable DATASET_REPOSITORY type
+        return {
+            **get_mocked_mnist_pipeline_config(repository_component_type_key="DATASET_REPOSITORY"),
+            "mapped_labels": {"component_type_key": "MAPPED_LABELS_ITERATOR", "variant_key": "DEFAULT",
+                              "requirements": [{"name": "iterators", "component_name": "dataset_iterators"}],
+                              "config": {"applicable_splits": ["train"], "mappings": [{"previous_labels": [0, 1], "new_label": 2}]}}
+        }
+
+    @staticmethod
+    def build_components(config: Dict[str, Any], component_names) -> Dict[str, Any]:
+        component_factory = ComponentFactory()
+        component_factory.register_component_type("DATASET_REPOSITORY", "DEFAULT", MockedRepositoryConstructable)
+        return component_factory.build_components_from_config(config, component_names)
+
+    def test_reuse_between_jobs(self, config: Dict[str, Any]):
+        MockedRepositoryConstructable.num_constructions = 0
+        components = TestComponentCache.build_components(config, ["mapped_labels"])
+        cached_components = TestComponentCache.build_components(config, ["mapped_labels", "dataset_iterators"])
+
+        assert MockedRepositoryConstructable.num_constructions == 1
+        assert cached_components["mapped_labels"] == components["mapped_labels"]
+        assert cached_components["mapped_labels"] is not components["mapped_labels"]
+        assert all(cached_components["mapped_labels"][split_name] is iterator
+                   for split_name, iterator in components["mapped_labels"].items())
+        assert ComponentCache.stats.num_hits == 2
+        assert ComponentCache.stats.num_entries == 3
+        assert ComponentCache.stats.saved_seconds > 0
+
+        # a changed config is built again, reusing the unchanged requirements
+        config["mapped_labels"]["config"]["applicable_splits"] = ["test"]
+        TestComponentCache.build_components(config, ["mapped_labels"])
+        assert MockedRepositoryConstructable.num_constructions == 1
+        assert ComponentCache.stats.num_entries == 4
+
+    def test_disabled(self, config: Dict[str, Any]):
+        ComponentCache.configure(max_size_bytes=0)
+        MockedRepositoryConstructable.num_constructions = 0
+        TestComponentCache.build_components(config, ["mapped_labels"])
+        TestComponentCache.build_components(config, ["mapped_labels"])
+        assert MockedRepositoryConstructable.num_constructions == 2
+        assert ComponentCache.stats.num_entries == 0
+
+    def test_stateful_components_not_cached(self):
+        for component_type_key in ["MODEL", "OPTIMIZER", "DATA_LOADER", "TRAINER", "EVALUATOR", "STREAMING_DATASET_ITERATORS"]:
+            assert not ComponentCache.is_cacheable(component_type_key)
+        assert ComponentCache.is_cacheable("DATASET_ITERATORS")
+
+    def test_eviction(self):
+        ComponentCache.configure(max_size_bytes=2500)
+        for key in ["a", "b"]:
+            ComponentCache.put(key, key, torch.zeros(1000, dtype=torch.uint8), 1.0)
+        assert ComponentCache.get("a", "a") is not None
+        ComponentCache.put("c", "c", torch.zeros(1000, dtype=torch.uint8), 1.0)
+        # b is the least recently used entry
+        assert ComponentCache.get("b", "b") is None
+        assert ComponentCache.get("a", "a") is not None and ComponentCache.get("c", "c") is not None
+        assert ComponentCache.stats.size_bytes == 2000
+
+        ComponentCache.put("d", "d", torch.zeros(3000, dtype=torch.uint8), 1.0)
+        assert ComponentCache.get("d", "d") is None
+
+    def test_get_size_bytes(self):
+        tensor = torch.zeros(1000, dtype=torch.uint8)
+        array = np.zeros(1000, dtype=np.uint8)
+        size_bytes = ComponentCache.get_size_bytes({"splits": [tensor, tensor[10:], array, array[10:]]})
+        assert 2000 <= size_bytes < 3000
@@ -4,8 +4,11 @@ from data_stack.dataset.factory import BaseDatasetFactory
 import torch
 import random
 from data_stack.dataset.meta import IteratorMeta
+from data_stack.repository.repository import DatasetRepository
+from dataclasses import dataclass
 from typing import Tuple, Dict, Any, List
 
+from ml_gym.blueprints.constructables import ComponentConstructable
 from ml_gym.data_handling.postprocessors.collator import Collator
 from ml_gym.models.nn.net import NNModel
 from ml_gym.multiprocessing.states import JobStatus, JobType
@@ -32,6 +35,34 @@ class MockedMNISTFactory(BaseDatasetFactory):
         return MockedMNISTIterator(), IteratorMeta(sample_pos=0, target_pos=1, tag_pos=2)
 
 
+@dataclass
+class MockedRepositoryConstructable(ComponentConstructable):
+    num_constructions = 0
+
+    def _construct_impl(self) -> DatasetRepository:
+        MockedRepositoryConstructable.num_constructions += 1
+        dataset_repository = DatasetRepository()
+        dataset_repository.register("mnist", MockedMNISTFactory())
+        return dataset_repository
+
+
+@dataclass
+class FailingRepositoryConstructable(ComponentConstructable):
+    def _construct_impl(self) -> DatasetRepository:
+        raise RuntimeError("The repository of a reused dataset must not be built.")
+
+
+def get_mocked_mnist_pipeline_config(repository_component_type_key: str = "MOCKED_REPOSITORY") -> Dict[str, Any]:
+    """Returns the config of the mocked MNIST dataset iterators, which the tests extend by the components under test.
+    The repository component type has to be registered with one of the mocked repository constructables."""
+    return {
+        "dataset_repository": {"component_type_key": repository_component_type_key, "variant_key": "DEFAULT"},
+        "dataset_iterators": {"component_type_key": "DATASET_ITERATORS", "variant_key": "DEFAULT",
+                              "requirements": [{"name": "repository", "component_name": "dataset_repository"}],
+                              "config": {"dataset_identifier": "mnist", "split_configs": [{"split": "train"}, {"split": "test"}]}}
+    }
+
+
 class MockedCollator(Collator):
     target_publication_key: str = None
 
@@ -0,0 +1,50 @@
+import torch
+from ml_gym.batching.batch import DatasetBatch
+from ml_gym.data_handling.postprocessors.collator_stages import LabelMapperCollatorStage, OneHotEncodedTargetCollatorStage, \
+    FilteredLabelsCollatorStage
+from ml_gym.data_handling.postprocessors.postprocessor import LabelMapperPostProcessor, OneHotEncodedTargetPostProcessor
+
+
+class TestCollatorStages:
+
+    @staticmethod
+    def get_samples():
+        return [(torch.ones(2) * i, i % 5, i % 4) for i in range(20)]
+
+    @staticmethod
+    def collate(samples) -> DatasetBatch:
+        return DatasetBatch(samples=torch.stack([sample[0] for sample in samples]),
+                            targets={"target": torch.stack([torch.as_tensor(sample[1]) for sample in samples])},
+                            tags=torch.as_tensor([sample[2] for sample in samples]))
+
+    def test_label_mapping(self):
+        mappings = [{"previous_labels": [0, 1], "new_label": 2}, {"previous_labels": [2], "new_label": 4}]
+        post_processor = LabelMapperPostProcessor(mappings=mappings, target_position=1, tag_position=2)
+        expected_batch = TestCollatorStages.collate([post_processor.postprocess(sample) for sample in TestCollatorStages.get_samples()])
+        batch = LabelMapperCollatorStage(mappings=mappings, target_keys=["target"])(TestCollatorStages.collate(TestCollatorStages.get_samples()))
+        assert torch.equal(batch.targets["target"], expected_batch.targets["target"])
+        assert torch.equal(batch.tags, expected_batch.tags)
+
+    def test_label_mapping_promotes_labels(self):
+        mappings = [{"previous_labels": [0, 1], "new_label": 2.5}]
+        post_processor = LabelMapperPostProcessor(mappings=mappings, target_position=1, tag_position=2)
+        expected_batch = TestCollatorStages.collate([post_processor.postprocess(sample) for sample in TestCollatorStages.get_samples()])
+        batch = LabelMapperCollatorStage(mappings=mappings, target_keys=["target"])(TestCollatorStages.collate(TestCollatorStages.get_samples()))
+        assert batch.targets["target"].is_floating_point()
+        assert torch.equal(batch.targets["target"], expected_batch.targets["target"].to(batch.targets["target"].dtype))
+        assert torch.equal(batch.tags, expected_batch.tags.to(batch.tags.dtype))
+
+    def test_one_hot_encoding(self):
+        post_processor = OneHotEncodedTargetPostProcessor(target_vector_size=5, target_position=1)
+        expected_batch = TestCollatorStages.collate([post_processor.postprocess(sample) for sample in TestCollatorStages.get_samples()])
+        batch = OneHotEncodedTargetCollatorStage(target_vector_size=5, target_keys=["target"])(
+            TestCollatorStages.collate(TestCollatorStages.get_samples()))
+        assert torch.equal(batch.targets["target"], expected_batch.targets["target"])
+
+    def test_label_filtering(self):
+        batch = FilteredLabelsCollatorStage(filtered_labels=[1, 3], target_key="target")(
+            TestCollatorStages.collate(TestCollatorStages.get_samples()))
+        expected_batch = TestCollatorStages.collate([sample for sample in TestCollatorStages.get_samples() if sample[1] in [1, 3]])
+        assert torch.equal(batch.samples, expected_batch.samples)
+        assert torch.equal(batch.targets["target"], expected_batch.targets["target"])
+        assert torch.equal(batch.tags, expected_batch.tags)
@@ -30,6 +30,44 @@ class TestCategoricalEncoder:
         assert np.sum(transformed_sample) == 1
         assert encoder.get_output_size() == len(torch.bincount(values))
 
+    def test_vectorized_transform(self, encoder, values):
+        encoder.fit(values)
+        transformed_values = encoder.transform(values.numpy())
+        assert np.array_equal(transformed_values, np.eye(3)[values.numpy()])
+
+    @pytest.mark.parametrize("unseen_value_strategy, vocabulary_size", [("other", 4), ("hash", 3 + 16)])
+    def test_unseen_values(self, values, unseen_value_strategy, vocabulary_size):
+        encoder = CategoricalEncoder(unseen_value_strategy=unseen_value_strategy)
+        encoder.fit(values)
+        transformed_values = encoder.transform(np.array([0, 3, 7, 3]))
+        assert encoder.get_output_size() == vocabulary_size
+        assert transformed_values.shape == (4, vocabulary_size)
+        assert np.array_equal(transformed_values.sum(axis=1), np.ones(4))
+        assert transformed_values[0][0] == 1
+        # unseen values are mapped to the additional categories
+        assert np.argmax(transformed_values[1]) >= 3 and np.argmax(transformed_values[2]) >= 3
+        assert np.array_equal(transformed_values[1], transformed_values[3])
+
+    @pytest.mark.parametrize("unseen_value_strategy, codes", [("other", [0, 0]), ("hash", None)])
+    def test_empty_vocabulary(self, unseen_value_strategy, codes):
+        encoder = CategoricalEncoder(unseen_value_strategy=unseen_value_strategy)
+        encoder.fit(np.array([], dtype=np.int64))
+        transformed_codes = encoder.get_codes(np.array([3, 7]))
+        assert transformed_codes.min() >= 0 and transformed_codes.max() < encoder.get_vocabulary_size()
+        if codes is not None:
+            assert np.array_equal(transformed_codes, codes)
+        encoder = CategoricalEncoder()
+        encoder.fit(np.array([], dtype=np.int64))
+        with pytest.raises(ValueError):
+            encoder.get_codes(np.array([3]))
+
+    def test_output_codes(self, values):
+        encoder = CategoricalEncoder(unseen_value_strategy="other", output_codes=True)
+        encoder.fit(values)
+        assert encoder.get_output_size() == 1
+        assert encoder.get_vocabulary_size() == 4
+        assert np.array_equal(encoder.transform(np.array([2, 0, 5])), np.array([[2], [0], [3]]))
+
 
 class TestContinuousEncoder:
     @pytest.fixture
@@ -55,3 +93,10 @@ class TestContinuousEncoder:
         # StandardScaler does (x - mean )/ std
         assert (sample_value - np.mean(values)) / np.std(values) == encoder.transform(np.array([sample_value]))[0][0]
         assert encoder.get_output_size() == 1
+
+    def test_fit_columns(self):
+        values = np.random.default_rng(0).normal(size=(100, 3)) * np.array([1, 10, 0])
+        for i, column_encoder in enumerate(ContinuousEncoder.fit_columns(values)):
+            encoder = ContinuousEncoder()
+            encoder.fit(values[:, i])
+            assert np.allclose(column_encoder.transform(values[:, i]), encoder.transform(values[:, i]))
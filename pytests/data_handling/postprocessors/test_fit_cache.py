@@ -0,0 +1,68 @@
+import os
+import time
+from typing import Any, Dict
+import pytest
+import torch.multiprocessing as mp
+from data_stack.dataset.iterator import InformedDatasetIterator
+from data_stack.dataset.meta import IteratorMeta, DatasetMeta
+from ml_gym.data_handling.postprocessors.factory import ModelGymInformedIteratorFactory
+from ml_gym.data_handling.postprocessors.fit_cache import FitCache
+from ml_gym.data_handling.postprocessors.postprocessor import FeatureEncoderPostProcessor
+from pytests.data_handling.postprocessors.mocked_class import MockedIterator
+
+
+def slow_fit(folder: str) -> Dict[str, Any]:
+    with open(os.path.join(folder, "fits.txt"), "a") as fd:
+        fd.write("fit\n")
+    time.sleep(0.5)
+    return {"mean": 1.0}
+
+
+def get_or_fit(folder: str, result_queue):
+    result_queue.put(FitCache(folder).get_or_fit("key", lambda: slow_fit(folder)))
+
+
+class TestFitCache:
+
+    @pytest.fixture
+    def iterators(self):
+        iterator_meta = IteratorMeta(sample_pos=0, target_pos=1, tag_pos=2)
+        dataset_meta = DatasetMeta(identifier="identifier", dataset_name="dataset_name", dataset_tag="dataset_tag",
+                                   iterator_meta=iterator_meta)
+        return {"train": InformedDatasetIterator(MockedIterator(), dataset_meta)}
+
+    def test_get_or_fit(self, tmp_path):
+        fit_cache = FitCache(str(tmp_path))
+        assert fit_cache.get_or_fit("key", lambda: {"mean": 1.0}) == {"mean": 1.0}
+        assert fit_cache.get_or_fit("key", lambda: pytest.fail("The cached state must not be fitted again.")) == {"mean": 1.0}
+        assert FitCache.get_key("a", [1, 2], {"b": 1}) == FitCache.get_key("a", [1, 2], {"b": 1}) != FitCache.get_key("a", [1, 3])
+
+    def test_concurrent_fit(self, tmp_path):
+        context = mp.get_context("spawn")
+        result_queue = context.Queue()
+        processes = [context.Process(target=get_or_fit, args=(str(tmp_path), result_queue)) for _ in range(3)]
+        for process in processes:
+            process.start()
+        results = [result_queue.get(timeout=60) for _ in processes]
+        for process in processes:
+            process.join()
+        assert results == [{"mean": 1.0}] * 3
+        with open(os.path.join(str(tmp_path), "fits.txt")) as fd:
+            assert fd.read() == "fit\n"
+
+    def test_feature_encoded_iterators(self, iterators, tmp_path, monkeypatch):
+        feature_encoding_configs = [{"feature_type": "categorical", "feature_names": [0, 2], "train_split": "train"},
+                                    {"feature_type": "continuous", "feature_names": [3], "train_split": "train"}]
+        fit_cache = FitCache(str(tmp_path))
+        encoded_iterators = ModelGymInformedIteratorFactory.get_feature_encoded_iterators(
+            "encoded", iterators, feature_encoding_configs, fit_cache=fit_cache, iterators_key="iterators")
+
+        monkeypatch.setattr(FeatureEncoderPostProcessor, "fit", lambda *args: pytest.fail("The encoders must be loaded."))
+        cached_iterators = ModelGymInformedIteratorFactory.get_feature_encoded_iterators(
+            "encoded", iterators, feature_encoding_configs, fit_cache=fit_cache, iterators_key="iterators")
+        for i in [0, len(iterators["train"]) - 1]:
+            assert (encoded_iterators["train"][i][0] == cached_iterators["train"][i][0]).all()
+        # other upstream iterators are fitted
+        with pytest.raises(pytest.fail.Exception):
+            ModelGymInformedIteratorFactory.get_feature_encoded_iterators(
+                "encoded", iterators, feature_encoding_configs, fit_cache=fit_cache, iterators_key="other_iterators")
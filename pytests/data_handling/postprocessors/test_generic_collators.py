@@ -0,0 +1,77 @@
+import copy
+import torch
+from ml_gym.batching.batch import DatasetBatch
+from ml_gym.blueprints.constructables import DataCollatorConstructable
+from ml_gym.data_handling.postprocessors.postprocessor import LabelMapperPostProcessor
+from ml_gym.data_handling.postprocessors.generic_collators import TensorCollator, TupleCollator, DictCollator, RaggedCollator
+
+
+class TestGenericCollators:
+
+    @staticmethod
+    def get_samples(sample_fun):
+        return [(sample_fun(i), i % 5, i % 4) for i in range(8)]
+
+    @staticmethod
+    def assert_labels(batch: DatasetBatch):
+        assert torch.equal(batch.targets["target"], torch.arange(8) % 5)
+        assert torch.equal(batch.tags, torch.arange(8) % 4)
+
+    def test_tensor_collator(self):
+        batch = TensorCollator(target_publication_key="target")(TestGenericCollators.get_samples(lambda i: torch.ones(2, 3) * i))
+        assert torch.equal(batch.samples, torch.arange(8).float().reshape(8, 1, 1).expand(8, 2, 3))
+        TestGenericCollators.assert_labels(batch)
+
+    def test_label_mapped_samples(self):
+        samples = [(torch.ones(3) * i, torch.tensor(i % 4), torch.tensor(i)) for i in range(8)]
+        samples = LabelMapperPostProcessor(mappings=[{"previous_labels": [2, 3], "new_label": 1}]).postprocess_items(samples)
+        batch = TensorCollator(target_publication_key="target")(samples)
+        assert torch.equal(batch.targets["target"], torch.LongTensor([0, 1, 1, 1, 0, 1, 1, 1]))
+        samples = [LabelMapperPostProcessor(mappings=[{"previous_labels": [1], "new_label": 2}]).postprocess(sample)
+                   for sample in [(torch.ones(3), torch.tensor(0), torch.tensor(0)), (torch.ones(3), torch.tensor(1), torch.tensor(1))]]
+        batch = TensorCollator(target_publication_key="target")(samples)
+        assert torch.equal(batch.targets["target"], torch.LongTensor([0, 2]))
+
+    def test_tuple_collator(self):
+        samples = TestGenericCollators.get_samples(lambda i: (torch.ones(2) * i, torch.tensor(i)))
+        batch = TupleCollator(target_publication_key="target", sample_publication_keys=["features", "ids"])(samples)
+        assert torch.equal(batch.samples["features"], torch.arange(8).float().unsqueeze(1).expand(8, 2))
+        assert torch.equal(batch.samples["ids"], torch.arange(8))
+        TestGenericCollators.assert_labels(batch)
+
+    def test_dict_collator(self):
+        samples = TestGenericCollators.get_samples(lambda i: {"features": torch.ones(2) * i, "ids": torch.tensor(i)})
+        batch = DictCollator(target_publication_key="target")(samples)
+        assert set(batch.samples.keys()) == {"features", "ids"}
+        assert torch.equal(batch.samples["ids"], torch.arange(8))
+        assert len(batch) == 8
+        TestGenericCollators.assert_labels(batch)
+
+    def test_ragged_collator(self):
+        samples = TestGenericCollators.get_samples(lambda i: torch.ones(i, 2))
+        batch = RaggedCollator(target_publication_key="target", padding_value=-1)(samples)
+        assert batch.samples["samples"].shape == (8, 7, 2)
+        assert torch.equal(batch.samples["lengths"], torch.arange(8))
+        for i in range(8):
+            assert (batch.samples["samples"][i, :i] == 1).all() and (batch.samples["samples"][i, i:] == -1).all()
+        TestGenericCollators.assert_labels(batch)
+
+    def test_single_transfer_to_device(self):
+        collator = TensorCollator(target_publication_key="target", device=torch.device("meta"), pin_memory=True, non_blocking=True)
+        batch = collator(TestGenericCollators.get_samples(lambda i: torch.ones(2) * i))
+        assert batch.samples.device == torch.device("meta")
+        assert batch.targets["target"].device == torch.device("meta")
+        assert batch.tags.device == torch.device("meta")
+        # pinned buffers are only used for CUDA devices
+        assert not collator.uses_buffers and len(collator._buffers) == 0
+
+    def test_dict_samples_batch(self):
+        batch = DictCollator(target_publication_key="target")(TestGenericCollators.get_samples(lambda i: {"features": torch.ones(2) * i}))
+        combined_batch = DatasetBatch.combine([batch, copy.deepcopy(batch)])
+        assert combined_batch.samples["features"].shape == (16, 2)
+        combined_batch.to_device(torch.device("meta"))
+        assert combined_batch.get_device() == torch.device("meta")
+
+    def test_collator_selection_by_layout(self):
+        collator = DataCollatorConstructable(collator_type="ragged", collator_params={"target_publication_key": "target"}).construct()
+        assert isinstance(collator, RaggedCollator)
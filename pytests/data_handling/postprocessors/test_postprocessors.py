@@ -5,7 +5,10 @@ from data_stack.dataset.meta import IteratorMeta, DatasetMeta
 from ml_gym.data_handling.postprocessors.feature_encoder import CategoricalEncoder, ContinuousEncoder
 from ml_gym.data_handling.postprocessors.postprocessor import OneHotEncodedTargetPostProcessor, \
     LabelMapperPostProcessor, FeatureEncoderPostProcessor
+from ml_gym.data_handling.iterators import MaterializedFeatureEncodedDatasetIterator
 from pytests.data_handling.postprocessors.mocked_class import MockedIterator
+import numpy as np
+import torch
 
 
 class TestFeatureEncoderPostProcessor:
@@ -68,6 +71,38 @@ class TestFeatureEncoderPostProcessor:
         assert postprocess_sample[0][sample[0][3]] == 0
         assert postprocess_sample[0][sample[0][4]] == 0
 
+    @pytest.mark.parametrize('memmap_threshold', [2**30, 0])
+    def test_materialized_encoding(self, iterators, sample_position, memmap_threshold, tmp_path):
+        feature_encoding_configs = [
+            {"feature_type": "categorical", "feature_names": [0, 2], "train_split": "train"},
+            {"feature_type": "continuous", "feature_names": [3], "train_split": "train"},
+        ]
+        feature_encoder_post_processor = FeatureEncoderPostProcessor(sample_position=sample_position,
+                                                                     feature_encoding_configs=feature_encoding_configs)
+        feature_encoder_post_processor.fit(iterators)
+        iterator = MaterializedFeatureEncodedDatasetIterator(iterators["train"], feature_encoder_post_processor, chunk_size=64,
+                                                             memmap_threshold=memmap_threshold, memmap_folder=str(tmp_path))
+        assert len(iterator) == len(iterators["train"])
+        for index in [0, 1, 63, 64, len(iterator) - 1]:
+            sample = iterator[index]
+            expected_sample = feature_encoder_post_processor.postprocess(iterators["train"][index])
+            assert sample[0].dtype == expected_sample[0].dtype == torch.float32
+            assert torch.equal(sample[0], expected_sample[0])
+            assert sample[1:] == expected_sample[1:]
+        assert isinstance(iterator.encoded_samples, np.memmap) == (memmap_threshold == 0)
+        # the batched postprocessing yields the same encodings
+        batched_samples = feature_encoder_post_processor.postprocess_items([iterators["train"][index] for index in range(3)])
+        for index, batched_sample in enumerate(batched_samples):
+            assert batched_sample[0].dtype == torch.float32
+            assert torch.equal(batched_sample[0], iterator[index][0])
+
+        # changing the config and refitting invalidates the materialized encoding
+        encoded_samples = iterator.encoded_samples
+        feature_encoder_post_processor.feature_encoding_configs = feature_encoding_configs[:1]
+        feature_encoder_post_processor.fit(iterators)
+        assert not np.array_equal(iterator.encoded_samples, encoded_samples)
+        assert torch.equal(iterator[0][0], feature_encoder_post_processor.postprocess(iterators["train"][0])[0])
+
 
 class TestOneHotEncodedTargetPostProcessor:
 
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+import torch
+from data_stack.dataset.factory import InformedDatasetFactory
+from data_stack.dataset.iterator import InformedDatasetIteratorIF, SequenceDatasetIterator
+from data_stack.dataset.meta import MetaFactory
+from ml_gym.data_handling.dataset_loader import DatasetLoader, SamplerFactory
+from ml_gym.data_handling.iterators import BatchedFetcher
+from ml_gym.data_handling.postprocessors.factory import ModelGymInformedIteratorFactory
+
+
+class TestBatchedFetch:
+
+    @pytest.fixture
+    def iterator(self) -> InformedDatasetIteratorIF:
+        samples = torch.randint(0, 3, (300, 4))
+        targets = np.array([0, 1, 2] * 100)
+        tags = list(range(300))
+        iterator = SequenceDatasetIterator([samples, targets, tags])
+        iterator_meta = MetaFactory.get_iterator_meta(sample_pos=0, target_pos=1, tag_pos=2)
+        meta = MetaFactory.get_dataset_meta(identifier="id", dataset_name="test_dataset", dataset_tag="train", iterator_meta=iterator_meta)
+        iterator = InformedDatasetFactory.get_dataset_iterator(iterator, meta)
+        splits = ModelGymInformedIteratorFactory.get_splitted_iterators("split", {"full": iterator}, seed=1, stratified=False,
+                                                                        split_config={"full": {"a": 0.5, "b": 0.5}})
+        combined = ModelGymInformedIteratorFactory.get_combined_iterators(
+            "combined", {"it": splits}, [{"new_split": "combined", "old_splits": [{"iterators_name": "it", "splits": ["b", "a"]}]}])
+        mapped = ModelGymInformedIteratorFactory.get_mapped_labels_iterator(
+            "mapped", combined["combined"], mappings=[{"previous_labels": [0], "new_label": 1}])
+        feature_encoding_configs = [{"feature_type": "categorical", "feature_names": [0, 2], "train_split": "train"}]
+        encoded = ModelGymInformedIteratorFactory.get_feature_encoded_iterators("encoded", {"train": mapped}, feature_encoding_configs)
+        return ModelGymInformedIteratorFactory.get_one_hot_encoded_target_iterators("one_hot", encoded, target_vector_size=3)["train"]
+
+    @staticmethod
+    def assert_samples_equal(samples, expected_samples):
+        assert len(samples) == len(expected_samples)
+        for sample, expected_sample in zip(samples, expected_samples):
+            assert torch.equal(sample[0], expected_sample[0])
+            assert torch.equal(sample[1], expected_sample[1])
+            assert sample[2] == expected_sample[2]
+
+    def test_get_items(self, iterator: InformedDatasetIteratorIF):
+        indices = [5, 299, 0, 150, 151, 5, 42]
+        TestBatchedFetch.assert_samples_equal(BatchedFetcher.get_items(iterator, indices), [iterator[i] for i in indices])
+
+    def test_data_loader(self, iterator: InformedDatasetIteratorIF):
+        data_loader = DatasetLoader(dataset_iterator=iterator, batch_size=32, sampler=SamplerFactory.get_random_sampler(iterator, seed=1),
+                                    collate_fn=lambda batch: batch)
+        indices = list(SamplerFactory.get_random_sampler(iterator, seed=1))
+        batches = list(data_loader)
+        assert data_loader.dataset.dataset_meta == iterator.dataset_meta
+        TestBatchedFetch.assert_samples_equal([sample for batch in batches for sample in batch], [iterator[i] for i in indices])
@@ -2,9 +2,26 @@ import pytest
 from data_stack.dataset.iterator import InformedDatasetIteratorIF, SequenceDatasetIterator
 from data_stack.dataset.factory import InformedDatasetFactory
 from data_stack.dataset.meta import MetaFactory
-from ml_gym.data_handling.dataset_loader import SamplerFactory, DatasetLoaderFactory
+from ml_gym.data_handling.dataset_loader import SamplerFactory, DatasetLoaderFactory, DatasetLoader
+from ml_gym.data_handling.bucketing import SampleLengthIndexFactory
+from ml_gym.data_handling.iterators import PostProcessedDatasetIterator
+from ml_gym.data_handling.postprocessors.factory import ModelGymInformedIteratorFactory
+from ml_gym.data_handling.postprocessors.generic_collators import TensorCollator
+from ml_gym.data_handling.postprocessors.postprocessor import PostProcessorIf
+from ml_gym.batching.batch import DatasetBatch
+from pytests.test_env.linear_net_blueprint import MockedDataCollator, MockedDatasetFactory
 import torch
 from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+
+class LambdaPostProcessor(PostProcessorIf):
+
+    def __init__(self):
+        self.fun = lambda sample: sample
+
+    def postprocess(self, sample: Tuple[Any]) -> Tuple[Any]:
+        return self.fun(sample)
 
 
 class TestSamplerFactory:
@@ -31,6 +48,15 @@ class TestSamplerFactory:
                                             iterator_meta=iterator_meta)
         return InformedDatasetFactory.get_dataset_iterator(iterator, meta)
 
+    @pytest.fixture
+    def tensor_iterator(self) -> InformedDatasetIteratorIF:
+        dataset_iterator, iterator_meta = MockedDatasetFactory().get_dataset_iterator({"split": "train"})
+        meta = MetaFactory.get_dataset_meta(identifier="test dataset id",
+                                            dataset_name="test_dataset",
+                                            dataset_tag="train",
+                                            iterator_meta=iterator_meta)
+        return InformedDatasetFactory.get_dataset_iterator(dataset_iterator, meta)
+
     def test_weighted_random_sampler(self, iterator_train: InformedDatasetIteratorIF):
         sampler = SamplerFactory.get_weighted_sampler(iterator_train, label_pos=0)
         sample_weights = sampler.weights
@@ -74,3 +100,145 @@ class TestSamplerFactory:
         assert Counter(weighted_samples) == {3: 212, 2: 201, 1: 187}
         
 
+
+    @pytest.mark.parametrize("num_workers", [1, 2])
+    def test_batches_identical_for_any_worker_count(self, tensor_iterator: InformedDatasetIteratorIF, num_workers: int):
+        collator = MockedDataCollator(target_publication_key="target")
+
+        def get_batches(num_workers: int) -> List[DatasetBatch]:
+            data_loaders = DatasetLoaderFactory.get_splitted_data_loaders(dataset_splits={"train": tensor_iterator},
+                                                                          batch_size=32,
+                                                                          collate_fn=collator,
+                                                                          sampling_strategies={"train": {"strategy": "RANDOM", "seed": 10}},
+                                                                          num_workers=num_workers,
+                                                                          seed=1)
+            if num_workers > 0:
+                data_loaders["train"].multiprocessing_context = "spawn"
+            return list(data_loaders["train"])
+
+        batches = get_batches(num_workers=0)
+        multi_process_batches = get_batches(num_workers=num_workers)
+        assert len(batches) == len(multi_process_batches)
+        for batch, multi_process_batch in zip(batches, multi_process_batches):
+            assert torch.equal(batch.samples, multi_process_batch.samples)
+            assert torch.equal(batch.targets["target"], multi_process_batch.targets["target"])
+
+    @pytest.fixture
+    def postprocessed_iterator(self) -> InformedDatasetIteratorIF:
+        generator = torch.Generator().manual_seed(0)
+        samples = torch.randn(200, 3, generator=generator)
+        targets = torch.randint(0, 4, (200,), generator=generator)
+        iterator = SequenceDatasetIterator([samples, targets, targets])
+        iterator_meta = MetaFactory.get_iterator_meta(sample_pos=0, target_pos=1, tag_pos=2)
+        meta = MetaFactory.get_dataset_meta(identifier="test dataset id", dataset_name="test_dataset", dataset_tag="train",
+                                            iterator_meta=iterator_meta)
+        iterator = InformedDatasetFactory.get_dataset_iterator(iterator, meta)
+        iterator = ModelGymInformedIteratorFactory.get_mapped_labels_iterator("mapped", iterator,
+                                                                              [{"previous_labels": [2, 3], "new_label": 1}])
+        feature_encoding_configs = [{"feature_type": "continuous", "train_split": "train", "feature_names": [0, 2]}]
+        return ModelGymInformedIteratorFactory.get_feature_encoded_iterators("encoded", {"train": iterator}, feature_encoding_configs,
+                                                                             materialize=True)["train"]
+
+    def test_postprocessed_chain_with_spawned_workers(self, postprocessed_iterator: InformedDatasetIteratorIF):
+        def get_batches(num_workers: int) -> List[DatasetBatch]:
+            data_loader = DatasetLoaderFactory.get_splitted_data_loaders(dataset_splits={"train": postprocessed_iterator},
+                                                                         batch_size=32,
+                                                                         collate_fn=TensorCollator(target_publication_key="target"),
+                                                                         num_workers=num_workers,
+                                                                         seed=1)["train"]
+            if num_workers > 0:
+                data_loader.multiprocessing_context = "spawn"
+            return list(data_loader)
+
+        batches = get_batches(num_workers=0)
+        multi_process_batches = get_batches(num_workers=2)
+        assert len(batches) == len(multi_process_batches)
+        for batch, multi_process_batch in zip(batches, multi_process_batches):
+            assert torch.equal(batch.samples, multi_process_batch.samples)
+            assert torch.equal(batch.targets["target"], multi_process_batch.targets["target"])
+            assert batch.targets["target"].max() <= 1
+
+    def test_unpicklable_chain_is_reported(self, tensor_iterator: InformedDatasetIteratorIF):
+        iterator = InformedDatasetFactory.get_dataset_iterator(PostProcessedDatasetIterator(tensor_iterator, LambdaPostProcessor()),
+                                                               tensor_iterator.dataset_meta)
+        data_loader = DatasetLoader(dataset_iterator=iterator, batch_size=32, sampler=SamplerFactory.get_sequential_sampler(iterator),
+                                    collate_fn=MockedDataCollator(target_publication_key="target"), num_workers=2)
+        data_loader.multiprocessing_context = "spawn"
+        with pytest.raises(ValueError, match="LambdaPostProcessor"):
+            iter(data_loader)
+
+    def test_collator_stays_on_cpu_with_workers(self, tensor_iterator: InformedDatasetIteratorIF):
+        collator = MockedDataCollator(target_publication_key="target")
+        data_loader = DatasetLoader(dataset_iterator=tensor_iterator, batch_size=32, sampler=SamplerFactory.get_sequential_sampler(tensor_iterator),
+                                    collate_fn=collator, num_workers=2)
+        data_loader.device = torch.device("meta")
+        assert data_loader.device == torch.device("meta")
+        assert collator.device == torch.device("cpu")
+
+
+class TestBucketingBatchSampler:
+
+    @pytest.fixture
+    def variable_length_iterator(self) -> InformedDatasetIteratorIF:
+        generator = torch.Generator().manual_seed(0)
+        lengths = torch.randint(1, 100, (1000,), generator=generator).tolist()
+        samples = [torch.ones(length) for length in lengths]
+        iterator = SequenceDatasetIterator([samples, list(range(len(samples)))])
+        iterator_meta = MetaFactory.get_iterator_meta(sample_pos=0, target_pos=1, tag_pos=1)
+        meta = MetaFactory.get_dataset_meta(identifier="test dataset id",
+                                            dataset_name="test_dataset",
+                                            dataset_tag="train",
+                                            iterator_meta=iterator_meta)
+        return InformedDatasetFactory.get_dataset_iterator(iterator, meta)
+
+    @staticmethod
+    def collate(batch: List) -> List[int]:
+        return [tag for _, tag in batch]
+
+    @staticmethod
+    def get_data_loader(iterator: InformedDatasetIteratorIF, strategy: Dict, drop_last: bool = False) -> DatasetLoader:
+        return DatasetLoaderFactory.get_splitted_data_loaders(dataset_splits={"train": iterator}, batch_size=16, collate_fn=TestBucketingBatchSampler.collate,
+                                                              drop_last=drop_last, sampling_strategies={"train": strategy})["train"]
+
+    @pytest.mark.parametrize("drop_last", [False, True])
+    def test_bucketing_covers_all_samples(self, variable_length_iterator: InformedDatasetIteratorIF, drop_last: bool):
+        data_loader = self.get_data_loader(variable_length_iterator, {"strategy": "BUCKETING", "seed": 1, "bucket_size_multiplier": 10},
+                                           drop_last=drop_last)
+        batches = list(data_loader)
+        assert len(batches) == len(data_loader)
+        # only the remainder of the last bucket forms a smaller batch
+        assert sum(len(batch) != 16 for batch in batches) == (0 if drop_last else 1)
+        tags = [tag for batch in batches for tag in batch]
+        assert len(tags) == len(set(tags))
+        assert len(tags) == (992 if drop_last else 1000)
+
+    def test_bucketing_reduces_padding(self, variable_length_iterator: InformedDatasetIteratorIF):
+        random_loader = self.get_data_loader(variable_length_iterator, {"strategy": "RANDOM", "seed": 1})
+        bucketing_loader = self.get_data_loader(variable_length_iterator, {"strategy": "BUCKETING", "seed": 1})
+        lengths = SampleLengthIndexFactory.get_length_index(variable_length_iterator, 0)
+
+        def get_padding_ratio(batches: List[List[int]]) -> float:
+            return 1 - sum(lengths[batch].sum() for batch in batches) / sum(len(batch) * lengths[batch].max() for batch in batches)
+
+        assert random_loader.padding_ratio is None
+        bucketing_batches = list(bucketing_loader)
+        assert bucketing_loader.padding_ratio == pytest.approx(get_padding_ratio(bucketing_batches))
+        assert bucketing_loader.padding_ratio < get_padding_ratio(list(random_loader)) / 5
+
+    def test_bucketing_is_seeded(self, variable_length_iterator: InformedDatasetIteratorIF):
+        strategy = {"strategy": "BUCKETING", "seed": 1}
+        batches = list(self.get_data_loader(variable_length_iterator, strategy))
+        assert batches == list(self.get_data_loader(variable_length_iterator, strategy))
+        # the batch order changes between epochs
+        data_loader = self.get_data_loader(variable_length_iterator, strategy)
+        assert list(data_loader) != list(data_loader)
+
+    def test_token_budget(self, variable_length_iterator: InformedDatasetIteratorIF):
+        data_loader = self.get_data_loader(variable_length_iterator, {"strategy": "BUCKETING", "seed": 1, "max_tokens": 512})
+        lengths = SampleLengthIndexFactory.get_length_index(variable_length_iterator, 0)
+        num_batches = len(data_loader)
+        batches = list(data_loader)
+        assert len(batches) == num_batches
+        assert all(len(batch) * lengths[batch].max() <= 512 for batch in batches)
+        assert len(set(len(batch) for batch in batches)) > 1
+        assert sorted(tag for batch in batches for tag in batch) == list(range(1000))
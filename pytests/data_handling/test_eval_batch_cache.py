@@ -0,0 +1,100 @@
+from typing import List
+import pytest
+import torch
+from data_stack.dataset.iterator import InformedDatasetIteratorIF
+from data_stack.dataset.factory import InformedDatasetFactory
+from data_stack.dataset.meta import MetaFactory
+from ml_gym.batching.batch import DatasetBatch
+from ml_gym.data_handling.dataset_loader import DatasetLoader, SamplerFactory
+from ml_gym.data_handling.eval_batch_cache import EvalBatchCache
+from ml_gym.data_handling.iterators import PostProcessedDatasetIterator
+from ml_gym.data_handling.postprocessors.postprocessor import FeatureEncoderPostProcessor
+from pytests.test_env.linear_net_blueprint import MockedDataCollator, MockedDatasetFactory
+
+
+class CountingCollator(MockedDataCollator):
+    num_calls: int = 0
+
+    def __call__(self, batch: List[torch.Tensor]) -> DatasetBatch:
+        self.num_calls += 1
+        return super().__call__(batch)
+
+
+class TestEvalBatchCache:
+
+    @pytest.fixture
+    def iterator(self) -> InformedDatasetIteratorIF:
+        dataset_iterator, iterator_meta = MockedDatasetFactory().get_dataset_iterator({"split": "test"})
+        meta = MetaFactory.get_dataset_meta(identifier="test dataset id", dataset_name="test_dataset", dataset_tag="test",
+                                            iterator_meta=iterator_meta)
+        return InformedDatasetFactory.get_dataset_iterator(dataset_iterator, meta)
+
+    def get_loader(self, iterator: InformedDatasetIteratorIF, batch_size: int = 32) -> DatasetLoader:
+        return DatasetLoader(iterator, batch_size=batch_size, sampler=SamplerFactory.get_sequential_sampler(iterator),
+                             collate_fn=CountingCollator(target_publication_key="target"))
+
+    @staticmethod
+    def consume(batches) -> List[DatasetBatch]:
+        return [batch for batch in batches]
+
+    @pytest.mark.parametrize("location", ["ram", "pinned", "device", "disk"])
+    def test_cache_hit(self, iterator: InformedDatasetIteratorIF, location: str, tmp_path):
+        cache = EvalBatchCache(location=location, folder=str(tmp_path))
+        loader = self.get_loader(iterator)
+        recorded = self.consume(cache.iterate("test", loader, torch.device("cpu")))
+        assert loader.collate_fn.num_calls == len(loader) == len(recorded)
+        assert cache.size_bytes == sum(EvalBatchCache.get_size_bytes(b) for b in recorded)
+
+        cached = cache.iterate("test", loader, torch.device("cpu"))
+        assert len(cached) == len(loader)
+        cached = self.consume(cached)
+        assert loader.collate_fn.num_calls == len(loader)
+        for recorded_batch, cached_batch in zip(recorded, cached):
+            assert torch.equal(recorded_batch.samples, cached_batch.samples)
+            assert torch.equal(recorded_batch.targets["target"], cached_batch.targets["target"])
+        # the files of the disk location are unlinked after mapping them
+        assert list(tmp_path.iterdir()) == []
+
+    def test_invalidation(self, iterator: InformedDatasetIteratorIF):
+        cache = EvalBatchCache()
+        loader = self.get_loader(iterator)
+        self.consume(cache.iterate("test", loader, torch.device("cpu")))
+        other_loader = self.get_loader(iterator, batch_size=16)
+        batches = self.consume(cache.iterate("test", other_loader, torch.device("cpu")))
+        assert other_loader.collate_fn.num_calls == len(batches) == len(other_loader)
+        assert all(b.samples.shape[0] <= 16 for b in self.consume(cache.iterate("test", other_loader, torch.device("cpu"))))
+        assert other_loader.collate_fn.num_calls == len(other_loader)
+
+    def test_budget(self, iterator: InformedDatasetIteratorIF):
+        cache = EvalBatchCache(max_size_bytes=500)
+        loader = self.get_loader(iterator)
+        for _ in range(2):
+            assert len(self.consume(cache.iterate("test", loader, torch.device("cpu")))) == len(loader)
+        assert cache.size_bytes == 0
+        # the split is not recorded again
+        assert cache.iterate("test", loader, torch.device("cpu")) is loader
+
+    def test_random_sampler_not_cached(self, iterator: InformedDatasetIteratorIF):
+        cache = EvalBatchCache()
+        loader = DatasetLoader(iterator, batch_size=32, sampler=SamplerFactory.get_random_sampler(iterator, seed=1),
+                               collate_fn=CountingCollator(target_publication_key="target"))
+        assert cache.iterate("test", loader, torch.device("cpu")) is loader
+
+    def test_recorded_batches_are_copies(self, iterator: InformedDatasetIteratorIF):
+        cache = EvalBatchCache(location="ram")
+        loader = self.get_loader(iterator)
+        recorded = self.consume(cache.iterate("test", loader, torch.device("cpu")))
+        samples = [batch.samples.clone() for batch in recorded]
+        for batch in recorded:
+            batch.samples.zero_()
+        cached = self.consume(cache.iterate("test", loader, torch.device("cpu")))
+        assert all(torch.equal(sample, cached_batch.samples) for sample, cached_batch in zip(samples, cached))
+
+    def test_refitted_postprocessor_invalidates(self, iterator: InformedDatasetIteratorIF):
+        post_processor = FeatureEncoderPostProcessor(sample_position=0, feature_encoding_configs=[])
+        loader = self.get_loader(PostProcessedDatasetIterator(iterator, post_processor))
+        cache = EvalBatchCache()
+        fingerprint = cache.get_fingerprint(loader, torch.device("cpu"))
+        assert cache.get_fingerprint(loader, torch.device("cpu")) == fingerprint
+        post_processor.feature_encoding_configs = []
+        assert cache.get_fingerprint(loader, torch.device("cpu")) != fingerprint
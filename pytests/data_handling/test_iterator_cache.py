@@ -0,0 +1,90 @@
+import os
+import random
+from typing import Any, Dict
+import pytest
+import torch
+from ml_gym.blueprints.component_factory import ComponentFactory
+from ml_gym.data_handling.iterator_cache import IteratorCache
+from pytests.blueprints.constructables.mocked_classes import FailingRepositoryConstructable, MockedRepositoryConstructable, \
+    get_mocked_mnist_pipeline_config
+
+
+class TestIteratorCache:
+
+    @pytest.fixture
+    def config(self) -> Dict[str, Any]:
+        return {
+            **get_mocked_mnist_pipeline_config(),
+            "splitted_iterators": {"component_type_key": "SPLITTED_DATASET_ITERATORS", "variant_key": "RANDOM",
+                                   "requirements": [{"name": "iterators", "component_name": "dataset_iterators", "subscription": ["train", "test"]}],
+                                   "config": {"split_configs": {"train": {"train": 0.7, "val": 0.3}}, "seed": 2}},
+            "mapped_labels": {"component_type_key": "MAPPED_LABELS_ITERATOR", "variant_key": "DEFAULT",
+                              "requirements": [{"name": "iterators", "component_name": "splitted_iterators"}],
+                              "config": {"applicable_splits": ["train", "val"], "mappings": [{"previous_labels": [0, 1], "new_label": 2}]}},
+            "one_hot_targets": {"component_type_key": "ONE_HOT_ENCODED_TARGETS_ITERATOR", "variant_key": "DEFAULT",
+                                "requirements": [{"name": "iterators", "component_name": "mapped_labels"}],
+                                "config": {"applicable_splits": ["train", "val"], "target_vector_size": 10}},
+            "view": {"component_type_key": "ITERATOR_VIEW", "variant_key": "DEFAULT",
+                     "requirements": [{"name": "iterators", "component_name": "one_hot_targets"}],
+                     "config": {"applicable_splits": ["train"], "num_samples": 10}}
+        }
+
+    @staticmethod
+    def build_iterators(config: Dict[str, Any], iterator_cache: IteratorCache, repository_constructable=MockedRepositoryConstructable):
+        component_factory = ComponentFactory(iterator_cache=iterator_cache)
+        component_factory.register_component_type("MOCKED_REPOSITORY", "DEFAULT", repository_constructable)
+        random.seed(0)
+        torch.manual_seed(0)
+        return component_factory.build_components_from_config(config, ["one_hot_targets"])["one_hot_targets"]
+
+    def test_cached_iterators_equal(self, config: Dict[str, Any], tmp_path):
+        iterator_cache = IteratorCache(str(tmp_path))
+        iterators = TestIteratorCache.build_iterators(config, iterator_cache)
+        # only the outermost cacheable component is persisted
+        assert len(os.listdir(str(tmp_path))) == 1
+        cached_iterators = TestIteratorCache.build_iterators(config, iterator_cache, FailingRepositoryConstructable)
+        assert list(cached_iterators.keys()) == list(iterators.keys())
+        for split_name, iterator in iterators.items():
+            cached_iterator = cached_iterators[split_name]
+            assert len(cached_iterator) == len(iterator)
+            assert cached_iterator.dataset_meta.dataset_tag == iterator.dataset_meta.dataset_tag
+            for i in range(len(iterator)):
+                assert all(torch.equal(torch.as_tensor(value), torch.as_tensor(cached_value))
+                           for value, cached_value in zip(iterator[i], cached_iterator[i]))
+
+    def test_changed_config_misses(self, config: Dict[str, Any], tmp_path):
+        iterator_cache = IteratorCache(str(tmp_path))
+        TestIteratorCache.build_iterators(config, iterator_cache)
+        config["splitted_iterators"]["config"]["seed"] = 3
+        TestIteratorCache.build_iterators(config, iterator_cache)
+        assert len(os.listdir(str(tmp_path))) == 2
+
+    def test_least_recently_used_entries_are_evicted(self, config: Dict[str, Any], tmp_path):
+        iterator_cache = IteratorCache(str(tmp_path))
+        TestIteratorCache.build_iterators(config, iterator_cache)
+        entry_size = sum(os.path.getsize(os.path.join(root, file_name)) for root, _, file_names in os.walk(str(tmp_path))
+                         for file_name in file_names)
+        first_entry = os.listdir(str(tmp_path))[0]
+        os.utime(os.path.join(str(tmp_path), first_entry), (0, 0))
+        iterator_cache.max_size_bytes = int(1.5 * entry_size)
+        config["splitted_iterators"]["config"]["seed"] = 3
+        TestIteratorCache.build_iterators(config, iterator_cache)
+        entries = os.listdir(str(tmp_path))
+        assert len(entries) == 1 and entries[0] != first_entry
+
+    def test_rewritten_pipeline_caches_consumed_iterators(self, config: Dict[str, Any], tmp_path):
+        config["data_collator"] = {"component_type_key": "DATA_COLLATOR", "variant_key": "DEFAULT",
+                                   "config": {"collator_type": "tensor", "collator_params": {"target_publication_key": "target"}}}
+        config["data_loaders"] = {"component_type_key": "DATA_LOADER", "variant_key": "FUTURE",
+                                  "requirements": [{"name": "iterators", "component_name": "one_hot_targets", "subscription": ["train"]},
+                                                   {"name": "data_collator", "component_name": "data_collator"}],
+                                  "config": {"batch_size": 50, "sampling_strategies": {"train": {"strategy": "IN_ORDER"}}}}
+        del config["view"]
+        component_factory = ComponentFactory(iterator_cache=IteratorCache(str(tmp_path)))
+        # the label components are rewritten into collator stages, so the data loaders consume the splitted iterators
+        component_representation_graph = component_factory._calc_dependency_graph(config)
+        cache_keys = component_factory._get_iterator_cache_keys(config, component_representation_graph)
+        assert list(cache_keys.keys()) == ["splitted_iterators"]
+        component_factory.register_component_type("MOCKED_REPOSITORY", "DEFAULT", MockedRepositoryConstructable)
+        component_factory.build_components_from_config(config, ["data_loaders"])
+        assert os.listdir(str(tmp_path)) == [cache_keys["splitted_iterators"]]
@@ -0,0 +1,60 @@
+import pytest
+import numpy as np
+import torch
+from data_stack.dataset.iterator import InformedDatasetIteratorIF, SequenceDatasetIterator
+from data_stack.dataset.factory import InformedDatasetFactory
+from data_stack.dataset.meta import MetaFactory
+from ml_gym.data_handling.label_index import LabelIndexFactory
+from ml_gym.data_handling.postprocessors.factory import ModelGymInformedIteratorFactory
+
+
+class TestLabelIndex:
+
+    @pytest.fixture
+    def iterator(self) -> InformedDatasetIteratorIF:
+        samples = torch.randn(600, 3)
+        targets = torch.Tensor([1]*100 + [2]*200 + [3]*300).unsqueeze(1)
+        tags = list(range(600))
+        iterator = SequenceDatasetIterator([samples, targets, tags])
+        iterator_meta = MetaFactory.get_iterator_meta(sample_pos=0, target_pos=1, tag_pos=2)
+        meta = MetaFactory.get_dataset_meta(identifier="id", dataset_name="test_dataset", dataset_tag="train", iterator_meta=iterator_meta)
+        return InformedDatasetFactory.get_dataset_iterator(iterator, meta)
+
+    @staticmethod
+    def scan_labels(iterator: InformedDatasetIteratorIF, label_pos: int) -> np.ndarray:
+        return np.array([float(iterator[i][label_pos]) for i in range(len(iterator))])
+
+    def test_label_index_is_propagated(self, iterator: InformedDatasetIteratorIF):
+        assert np.array_equal(LabelIndexFactory.get_label_index(iterator, 1), TestLabelIndex.scan_labels(iterator, 1))
+
+        shuffled = ModelGymInformedIteratorFactory.get_shuffled_iterator("shuffled", iterator, seed=1)
+        mapped = ModelGymInformedIteratorFactory.get_mapped_labels_iterator(
+            "mapped", shuffled, mappings=[{"previous_labels": [1, 2], "new_label": 0}])
+        filtered = ModelGymInformedIteratorFactory.get_filtered_labels_iterator("filtered", mapped, filtered_labels=[0])
+        combined = ModelGymInformedIteratorFactory.get_combined_iterators(
+            "combined", {"it": {"filtered": filtered, "shuffled": shuffled}},
+            [{"new_split": "combined", "old_splits": [{"iterators_name": "it", "splits": ["filtered", "shuffled"]}]}])["combined"]
+
+        assert len(filtered) == 300
+        for it in [shuffled, mapped, filtered, combined]:
+            assert np.array_equal(LabelIndexFactory.get_label_index(it, 1), TestLabelIndex.scan_labels(it, 1))
+        assert np.array_equal(LabelIndexFactory.get_label_index(combined, 2), TestLabelIndex.scan_labels(combined, 2))
+
+    def test_stratified_split(self, iterator: InformedDatasetIteratorIF):
+        splits = ModelGymInformedIteratorFactory.get_splitted_iterators("split", {"train": iterator}, seed=2, stratified=True,
+                                                                        split_config={"train": {"a": 0.5, "b": 0.5}})
+        assert len(splits["a"]) + len(splits["b"]) == len(iterator)
+        for split in ["a", "b"]:
+            labels = TestLabelIndex.scan_labels(splits[split], 1)
+            assert np.array_equal(np.unique(labels, return_counts=True)[1], [50, 100, 150])
+
+    def test_persisted_label_index(self, iterator: InformedDatasetIteratorIF, tmp_path):
+        path = str(tmp_path / "dataset" / "train_label_index_1.npy")
+        label_index = LabelIndexFactory.get_persisted_label_index(iterator, 1, path)
+        assert np.array_equal(np.load(path), label_index)
+
+        # a new iterator on the same dataset picks up the persisted index
+        np.save(path, np.zeros(len(iterator)))
+        new_iterator = InformedDatasetFactory.get_dataset_iterator(SequenceDatasetIterator([[0]*600, [1]*600]), iterator.dataset_meta)
+        assert np.array_equal(LabelIndexFactory.get_persisted_label_index(new_iterator, 1, path), np.zeros(len(iterator)))
+        assert np.array_equal(LabelIndexFactory.get_label_index(new_iterator, 1), np.zeros(len(iterator)))
@@ -0,0 +1,137 @@
+import os
+import pickle
+import random
+from typing import Any, Dict, List
+import numpy as np
+import pytest
+import torch
+from data_stack.dataset.factory import InformedDatasetFactory
+from data_stack.dataset.iterator import InformedDatasetIteratorIF, SequenceDatasetIterator
+from data_stack.dataset.meta import MetaFactory
+from ml_gym.blueprints.component_factory import ComponentFactory
+from ml_gym.data_handling.iterators import SharedMemoryDatasetIterator
+from ml_gym.data_handling.shared_datasets import SharedDatasetRegistry, SharedDatasetStore
+from pytests.blueprints.constructables.mocked_classes import FailingRepositoryConstructable, MockedRepositoryConstructable, \
+    get_mocked_mnist_pipeline_config
+
+
+class MockedBluePrint:
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.external_injection = None
+
+    @staticmethod
+    def construct_components(config: Dict, component_names: List[str], device: torch.device,
+                             external_injection: Dict[str, Any] = None) -> Dict[str, Any]:
+        component_factory = ComponentFactory()
+        component_factory.register_component_type("MOCKED_REPOSITORY", "DEFAULT", MockedRepositoryConstructable)
+        # the mocked dataset is random
+        random.seed(0)
+        torch.manual_seed(0)
+        return component_factory.build_components_from_config(config, component_names)
+
+
+class TestSharedDatasets:
+
+    @pytest.fixture
+    def iterator(self) -> InformedDatasetIteratorIF:
+        generator = torch.Generator().manual_seed(0)
+        samples = [torch.randn(length, 3, generator=generator) for length in [5, 1, 0, 7]]
+        targets = [1, 0, 3, 2]
+        arrays = [np.arange(i, dtype=np.int16) for i in range(4)]
+        texts = ["a", "bc", "", "def"]
+        iterator_meta = MetaFactory.get_iterator_meta(sample_pos=0, target_pos=1, tag_pos=1)
+        meta = MetaFactory.get_dataset_meta(identifier="test dataset id", dataset_name="test_dataset", dataset_tag="train",
+                                            iterator_meta=iterator_meta)
+        return InformedDatasetFactory.get_dataset_iterator(SequenceDatasetIterator([samples, targets, arrays, texts]), meta)
+
+    @pytest.fixture
+    def config(self) -> Dict[str, Any]:
+        return {
+            **get_mocked_mnist_pipeline_config(),
+            "in_memory_iterators": {"component_type_key": "IN_MEMORY_DATASET_ITERATORS", "variant_key": "DEFAULT",
+                                    "requirements": [{"name": "iterators", "component_name": "dataset_iterators", "subscription": ["train"]}]},
+            "mapped_labels": {"component_type_key": "MAPPED_LABELS_ITERATOR", "variant_key": "DEFAULT",
+                              "requirements": [{"name": "iterators", "component_name": "in_memory_iterators"}],
+                              "config": {"applicable_splits": ["train"], "mappings": [{"previous_labels": [0, 1], "new_label": 2}]}}
+        }
+
+    @staticmethod
+    def assert_samples_equal(sample: tuple, shared_sample: tuple):
+        assert torch.equal(sample[0], shared_sample[0])
+        assert sample[1] == shared_sample[1] and isinstance(shared_sample[1], int)
+        assert np.array_equal(sample[2], shared_sample[2]) and shared_sample[2].dtype == np.int16
+        assert sample[3] == shared_sample[3]
+
+    def test_materialized_samples_equal(self, iterator: InformedDatasetIteratorIF, tmp_path):
+        shared_iterator = SharedMemoryDatasetIterator.materialize(iterator, str(tmp_path))
+        assert len(shared_iterator) == len(iterator)
+        for i in range(len(iterator)):
+            TestSharedDatasets.assert_samples_equal(iterator[i], shared_iterator[i])
+        with pytest.raises(IndexError):
+            shared_iterator[len(iterator)]
+
+    @staticmethod
+    def get_iterator(columns: List[List[Any]]) -> InformedDatasetIteratorIF:
+        iterator_meta = MetaFactory.get_iterator_meta(sample_pos=0, target_pos=1, tag_pos=1)
+        meta = MetaFactory.get_dataset_meta(identifier="test dataset id", dataset_name="test_dataset", dataset_tag="train",
+                                            iterator_meta=iterator_meta)
+        return InformedDatasetFactory.get_dataset_iterator(SequenceDatasetIterator(columns), meta)
+
+    def test_column_types(self, tmp_path):
+        # the scalar dtype is inferred over all samples and the objects are unpickled per sample
+        iterator = TestSharedDatasets.get_iterator([[1, 2, 3.5], [torch.ones(2, dtype=torch.bfloat16)] * 3, [None, {"a": 1}, "b"]])
+        shared_iterator = SharedMemoryDatasetIterator.materialize(iterator, str(tmp_path))
+        assert [shared_iterator[i][0] for i in range(3)] == [1.0, 2.0, 3.5]
+        assert shared_iterator[1][1].dtype == torch.bfloat16
+        assert [shared_iterator[i][2] for i in range(3)] == [None, {"a": 1}, "b"]
+        assert not any(file_name.endswith(".pkl") and file_name != "columns.pkl" for file_name in os.listdir(str(tmp_path)))
+
+    def test_mismatching_column_fails(self, tmp_path):
+        iterator = TestSharedDatasets.get_iterator([[torch.ones(2), torch.ones(2, dtype=torch.float64)]])
+        with pytest.raises(ValueError):
+            SharedMemoryDatasetIterator.materialize(iterator, str(tmp_path))
+
+    def test_iterator_is_pickled_by_path(self, iterator: InformedDatasetIteratorIF, tmp_path):
+        shared_iterator = SharedMemoryDatasetIterator.materialize(iterator, str(tmp_path))
+        unpickled_iterator = pickle.loads(pickle.dumps(shared_iterator))
+        assert len(pickle.dumps(shared_iterator)) < 200
+        for i in range(len(iterator)):
+            TestSharedDatasets.assert_samples_equal(iterator[i], unpickled_iterator[i])
+
+    def test_store_cleanup(self, iterator: InformedDatasetIteratorIF, tmp_path):
+        # folder of a parent process that is not alive anymore
+        stale_folder = os.path.join(str(tmp_path), f"{SharedDatasetStore.folder_prefix}{2**31 - 1}_abc")
+        os.makedirs(stale_folder)
+        store = SharedDatasetStore(str(tmp_path))
+        assert not os.path.exists(stale_folder)
+        handle = store.materialize("key", {"train": iterator})
+        assert len(handle.attach()["train"]) == len(iterator)
+        store.cleanup()
+        assert not os.path.exists(store.path)
+
+    def test_shareable_component_names(self, config: Dict[str, Any]):
+        # only the outermost dataset component is materialized
+        assert SharedDatasetRegistry.get_outermost_component_names(config, SharedDatasetRegistry.component_type_keys) == ["in_memory_iterators"]
+
+    def test_component_factory_attaches_to_shared_datasets(self, config: Dict[str, Any], tmp_path):
+        store = SharedDatasetStore(str(tmp_path))
+        handles = store.materialize_blueprints([MockedBluePrint(config)])
+        assert [handle.component_key for handle in handles] == [SharedDatasetRegistry.get_component_key(config, "in_memory_iterators")]
+        expected_iterators = MockedBluePrint.construct_components(config, ["mapped_labels"], torch.device("cpu"))["mapped_labels"]
+        try:
+            SharedDatasetRegistry.register(handles)
+            component_factory = ComponentFactory()
+            component_factory.register_component_type("MOCKED_REPOSITORY", "DEFAULT", FailingRepositoryConstructable)
+            iterators = component_factory.build_components_from_config(config, ["mapped_labels"])["mapped_labels"]
+        finally:
+            SharedDatasetRegistry.clear()
+        iterator = iterators["train"]
+        while hasattr(iterator, "_dataset_iterator"):
+            iterator = iterator._dataset_iterator
+        assert isinstance(iterator, SharedMemoryDatasetIterator)
+        assert len(iterators["train"]) == len(expected_iterators["train"])
+        for i in [0, 1, len(iterators["train"]) - 1]:
+            assert torch.equal(iterators["train"][i][0], expected_iterators["train"][i][0])
+            assert iterators["train"][i][1:] == expected_iterators["train"][i][1:]
+        store.cleanup()
@@ -0,0 +1,150 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List
+import numpy as np
+import pytest
+import torch
+from ml_gym.batching.batch import DatasetBatch
+from ml_gym.blueprints.component_factory import ComponentFactory
+from ml_gym.data_handling.dataset_loader import DatasetLoader
+from ml_gym.data_handling.postprocessors.collator import Collator
+from ml_gym.data_handling.streaming import ShardedIterableDataset
+from ml_gym.gym.evaluator import EvalComponent
+from ml_gym.gym.inference_component import InferenceComponent
+from ml_gym.gym.trainer import Trainer
+from ml_gym.loss_functions.loss_functions import CrossEntropyLoss
+from ml_gym.models.nn.net import NNModel
+
+
+@dataclass
+class TabularCollator(Collator):
+    target_publication_key: str = None
+
+    def __call__(self, batch: List[torch.Tensor]) -> DatasetBatch:
+        samples = torch.stack([item[0] for item in batch])
+        targets = torch.stack([item[1] for item in batch])
+        tags = torch.stack([item[2] for item in batch])
+        return DatasetBatch(samples=samples, targets={self.target_publication_key: targets}, tags=tags)
+
+
+class TabularNet(NNModel):
+
+    def __init__(self):
+        super().__init__(seed=0)
+        self.layer = torch.nn.Linear(4, 3)
+
+    def forward_impl(self, inputs: torch.Tensor) -> Dict[str, torch.Tensor]:
+        return {"logits": self.layer(inputs)}
+
+    def forward(self, inputs: torch.Tensor) -> Dict[str, torch.Tensor]:
+        return self.forward_impl(inputs)
+
+
+class TestStreaming:
+    num_shards = 5
+    shard_size = 40
+
+    @pytest.fixture
+    def shard_folder(self, tmp_path) -> str:
+        rng = np.random.default_rng(0)
+        for split_name in ["train", "val"]:
+            (tmp_path / split_name).mkdir()
+            for shard_id in range(TestStreaming.num_shards):
+                tags = np.arange(shard_id * TestStreaming.shard_size, (shard_id + 1) * TestStreaming.shard_size)
+                np.savez(tmp_path / split_name / f"shard_{shard_id:03d}.npz", samples=rng.normal(size=(len(tags), 4)).astype(np.float32),
+                         targets=tags % 3, tags=tags)
+        return str(tmp_path)
+
+    @staticmethod
+    def get_config(shard_folder: str, num_workers: int = 0) -> Dict[str, Any]:
+        return {
+            "dataset_iterators": {"component_type_key": "STREAMING_DATASET_ITERATORS", "variant_key": "DEFAULT",
+                                  "config": {"dataset_identifier": "tabular",
+                                             "split_configs": {"train": {"shard_pattern": f"{shard_folder}/train/*.npz", "shuffle": True,
+                                                                         "shuffle_buffer_size": 16, "seed": 3},
+                                                               "val": {"shard_pattern": f"{shard_folder}/val/*.npz"}}}},
+            "data_collator": {"component_type_key": "DATA_COLLATOR", "variant_key": "DEFAULT",
+                              "config": {"collator_type": TabularCollator, "collator_params": {"target_publication_key": "target"}}},
+            "data_loaders": {"component_type_key": "DATA_LOADER", "variant_key": "FUTURE",
+                             "requirements": [{"name": "iterators", "component_name": "dataset_iterators",
+                                               "subscription": ["train", "val"]},
+                                              {"name": "data_collator", "component_name": "data_collator"}],
+                             "config": {"batch_size": 10, "num_workers": num_workers}}
+        }
+
+    @staticmethod
+    def build_data_loaders(shard_folder: str, num_workers: int = 0) -> Dict[str, DatasetLoader]:
+        config = TestStreaming.get_config(shard_folder, num_workers)
+        return ComponentFactory().build_components_from_config(config, ["data_loaders"])["data_loaders"]
+
+    @staticmethod
+    def get_tags(batches: List[DatasetBatch]) -> List[int]:
+        return torch.cat([batch.tags for batch in batches]).tolist()
+
+    def test_shuffled_epochs(self, shard_folder: str):
+        loader = TestStreaming.build_data_loaders(shard_folder)["train"]
+        assert isinstance(loader.dataset, ShardedIterableDataset) and loader.is_streaming
+        assert len(loader.dataset) == TestStreaming.num_shards * TestStreaming.shard_size and len(loader) == 20
+        num_samples = TestStreaming.num_shards * TestStreaming.shard_size
+        epoch_0, epoch_1 = TestStreaming.get_tags(list(loader)), TestStreaming.get_tags(list(loader))
+        assert sorted(epoch_0) == sorted(epoch_1) == list(range(num_samples))
+        assert epoch_0 != epoch_1 and epoch_0 != list(range(num_samples))
+        assert loader.state_dict() == {"epoch": 2, "num_batches": 0}
+        # the stream is deterministic
+        assert TestStreaming.get_tags(list(TestStreaming.build_data_loaders(shard_folder)["train"])) == epoch_0
+
+    @pytest.mark.parametrize("num_workers", [0, 2])
+    def test_resume(self, shard_folder: str, num_workers: int):
+        loader = TestStreaming.build_data_loaders(shard_folder, num_workers)["train"]
+        expected_tags = TestStreaming.get_tags(list(loader))
+        assert sorted(expected_tags) == list(range(TestStreaming.num_shards * TestStreaming.shard_size))
+
+        loader.load_state_dict({"epoch": 0, "num_batches": 0})
+        consumed = []
+        for batch in loader:
+            consumed.append(batch)
+            if len(consumed) == 7:
+                break
+        state = loader.state_dict()
+        assert state == {"epoch": 0, "num_batches": 7}
+
+        resumed_loader = TestStreaming.build_data_loaders(shard_folder, num_workers)["train"]
+        resumed_loader.load_state_dict(state)
+        assert TestStreaming.get_tags(consumed) + TestStreaming.get_tags(list(resumed_loader)) == expected_tags
+
+    def test_eval_component(self, shard_folder: str):
+        loaders = TestStreaming.build_data_loaders(shard_folder)
+        loss_fun = CrossEntropyLoss(target_subscription_key="target", prediction_subscription_key="logits")
+        eval_component = EvalComponent(InferenceComponent(no_grad=True), defaultdict(list), metrics=[], loss_funs={"ce": loss_fun},
+                                       dataset_loaders={"val": loaders["val"]}, train_split_name="train",
+                                       cpu_target_subscription_keys=["target"], cpu_prediction_subscription_keys=["logits"])
+        model = TabularNet()
+        results = [eval_component.evaluate(model, torch.device("cpu"))[0] for _ in range(2)]
+        assert results[0].losses == results[1].losses
+
+        loaders["val"].dataset.set_epoch(0)
+        batches = list(loaders["val"])
+        assert TestStreaming.get_tags(batches) == list(range(TestStreaming.num_shards * TestStreaming.shard_size))
+        with torch.no_grad():
+            expected_loss = np.mean([torch.nn.functional.cross_entropy(model(b.samples)["logits"], b.targets["target"]).item()
+                                     for b in batches])
+        assert results[0].losses["ce"][0] == pytest.approx(expected_loss, rel=1e-5)
+
+    def test_evaluating_train_split_keeps_position(self, shard_folder: str):
+        loader = TestStreaming.build_data_loaders(shard_folder)["train"]
+        list(loader)
+        eval_component = EvalComponent(InferenceComponent(no_grad=True), defaultdict(list), metrics=[],
+                                       loss_funs={"ce": CrossEntropyLoss(target_subscription_key="target", prediction_subscription_key="logits")},
+                                       dataset_loaders={"train": loader}, train_split_name="train",
+                                       cpu_target_subscription_keys=["target"], cpu_prediction_subscription_keys=["logits"])
+        eval_component.evaluate(TabularNet(), torch.device("cpu"))
+        assert loader.state_dict() == {"epoch": 1, "num_batches": 0}
+
+    def test_trainer_state(self, shard_folder: str):
+        loader = TestStreaming.build_data_loaders(shard_folder)["train"]
+        list(loader)
+        state = Trainer(train_component=None, train_loader=loader).get_state()
+        restored_loader = TestStreaming.build_data_loaders(shard_folder)["train"]
+        Trainer(train_component=None, train_loader=restored_loader).set_state(state)
+        assert restored_loader.state_dict() == {"epoch": 1, "num_batches": 0}
+        assert TestStreaming.get_tags(list(restored_loader)) == TestStreaming.get_tags(list(loader))
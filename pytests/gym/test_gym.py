@@ -1,6 +1,8 @@
 from typing import List, Type, Dict, Any
+from copy import deepcopy
+import os
 import pytest
-from ml_gym.blueprints.blue_prints import BluePrint
+from ml_gym.blueprints.blue_prints import BluePrint, MultiModelBluePrint
 from ml_gym.gym.gym import Gym
 import torch
 from ml_gym.util.logger import QueuedLogging
@@ -60,3 +62,39 @@ class TestGym(LoggingFixture, DeviceFixture, ValidationFixtures):
         assert True  # TODO come up with a better test
 
         QueuedLogging.stop_listener()
+
+    def test_run_with_shared_datasets(self, process_count: int, device_ids: List[int], log_std_to_file: bool, start_logging,
+                                      blueprints: List[Type[BluePrint]], tmp_path):
+        gym = Gym(job_id_prefix="xyz_", process_count=process_count, device_ids=device_ids, log_std_to_file=log_std_to_file,
+                  logger_collection_constructable=MockedMLgymStatusLogger, share_datasets=True, shared_dataset_folder=str(tmp_path))
+        gym.add_blueprints(blueprints)
+        gym.run(parallel=True)
+        # the materialized datasets are removed after the run
+        assert os.listdir(str(tmp_path)) == []
+        QueuedLogging.stop_listener()
+
+    def test_multi_model_blueprint(self, blueprints: List[Type[BluePrint]], device: torch.device):
+        multi_model_blueprints = MultiModelBluePrint.group_blue_prints(blueprints, max_num_models=len(blueprints))
+        # blueprints only differing in their hyperparameters share the data pipeline of their fold
+        assert len(multi_model_blueprints) < len(blueprints)
+        assert sum(len(multi_model_blueprint.blue_prints) for multi_model_blueprint in multi_model_blueprints) == len(blueprints)
+
+        gym_job = multi_model_blueprints[0].construct(device)
+        # the data pipeline is built once and shared by all models
+        shared_loaders = list(gym_job.gym_jobs[0].evaluator.eval_component.dataset_loaders.values())
+        for job in gym_job.gym_jobs:
+            assert all(loader is shared_loader for loader, shared_loader
+                       in zip(job.evaluator.eval_component.dataset_loaders.values(), shared_loaders))
+        initial_params = [deepcopy(list(job.model.parameters())) for job in gym_job.gym_jobs]
+        gym_job.execute(device)
+
+        assert all(job.trainer.train_loader is gym_job.train_loader for job in gym_job.gym_jobs)
+        for job, params in zip(gym_job.gym_jobs, initial_params):
+            assert job.current_epoch > 0
+            assert any((p != p_initial).any() for p, p_initial in zip(job.model.parameters(), params))
+
+    def test_multi_model_blueprint_with_different_data_pipelines(self, blueprints: List[Type[BluePrint]]):
+        blueprint = deepcopy(blueprints[0])
+        blueprint.config["data_loaders"]["config"]["batch_size"] += 1
+        with pytest.raises(ValueError):
+            MultiModelBluePrint([blueprints[0], blueprint])
@@ -2,9 +2,13 @@ from copy import deepcopy
 from typing import List
 import numpy as np
 import pytest
+import torch
 from ml_gym.batching.batch import InferenceResultBatch
-from ml_gym.gym.post_processing import PredictPostProcessingIF, BinarizationPostProcessorImpl, DummyPostProcessorImpl
-from ml_gym.gym.predict_postprocessing_component import PredictPostprocessingComponent
+from ml_gym.gym.post_processing import PredictPostProcessingIF, BinarizationPostProcessorImpl, DummyPostProcessorImpl, \
+    PredictPostProcessing, SoftmaxPostProcessorImpl, ArgmaxPostProcessorImpl, SigmoidalPostProcessorImpl
+from ml_gym.gym.predict_postprocessing_component import PredictPostprocessingComponent, PostProcessingPlanner
+from ml_gym.loss_functions.loss_functions import NLLLoss
+from ml_gym.metrics.metrics import PredictionMetric, BinaryClasswiseExpectedCalibrationErrorMetric
 from pytests.test_env.inference_result_batch_fixtures import InferenceBatchResultFixture
 
 
@@ -36,3 +40,53 @@ class TestPredictPostProcessingComponent(InferenceBatchResultFixture):
         assert (result_batch.predictions[prediction_subscription_key].detach().cpu().numpy() ==
                 np.round(
                     inference_batch_result_copy.predictions[prediction_subscription_key].detach().cpu().numpy())).all()
+
+
+class TestPostProcessingPlanner:
+
+    @pytest.fixture
+    def post_processors(self) -> List[PredictPostProcessingIF]:
+        return [PredictPostProcessing(SoftmaxPostProcessorImpl("logits", "probs")),
+                PredictPostProcessing(ArgmaxPostProcessorImpl("probs", "labels")),
+                PredictPostProcessing(SigmoidalPostProcessorImpl("logits", "sigmoid")),
+                PredictPostProcessing(DummyPostProcessorImpl())]
+
+    @pytest.fixture
+    def result_batch(self) -> InferenceResultBatch:
+        return InferenceResultBatch(targets={"target": torch.randint(0, 5, (16,))}, predictions={"logits": torch.randn(16, 5)},
+                                    tags=torch.arange(16))
+
+    def test_prune_and_fuse(self, post_processors: List[PredictPostProcessingIF], result_batch: InferenceResultBatch):
+        metric = PredictionMetric(tag="acc", identifier="acc", target_subscription_key="target", prediction_subscription_key="labels",
+                                  metric_fun=lambda y_true, y_pred: (y_true == y_pred).float().mean().item())
+        plan = PostProcessingPlanner.plan(post_processors, consumers=[metric], prediction_subscription_keys=["logits"])
+        assert plan.required_keys == {"labels", "logits"}
+        assert len(plan.post_processors) == 1 and len(plan.fused) == 1 and len(plan.pruned) == 4
+        impl = PostProcessingPlanner.get_impl(plan.post_processors[0])
+        assert isinstance(impl, ArgmaxPostProcessorImpl) and impl.prediction_subscription_key == "logits"
+
+        planned_batch = PredictPostprocessingComponent.post_process(deepcopy(result_batch), plan.post_processors)
+        full_batch = PredictPostprocessingComponent.post_process(result_batch, post_processors)
+        assert sorted(planned_batch.predictions.keys()) == ["labels", "logits"]
+        assert torch.equal(planned_batch.get_predictions("labels"), full_batch.get_predictions("labels"))
+
+    def test_subscribed_intermediate_is_kept(self, post_processors: List[PredictPostProcessingIF]):
+        loss = NLLLoss(target_subscription_key="target", prediction_subscription_key="probs")
+        plan = PostProcessingPlanner.plan(post_processors, consumers=[loss], prediction_subscription_keys=["labels"])
+        assert [type(PostProcessingPlanner.get_impl(p)) for p in plan.post_processors] == [SoftmaxPostProcessorImpl,
+                                                                                           ArgmaxPostProcessorImpl]
+
+    def test_nested_consumers(self, post_processors: List[PredictPostProcessingIF]):
+        metric = BinaryClasswiseExpectedCalibrationErrorMetric(tag="ece", identifier="ece", target_subscription_key="target",
+                                                               prediction_subscription_key_0="probs",
+                                                               prediction_subscription_key_1="sigmoid", class_labels=[0, 1])
+        assert PostProcessingPlanner.get_consumer_subscription_keys(metric) == {"probs", "sigmoid"}
+
+    def test_unplannable(self, post_processors: List[PredictPostProcessingIF]):
+        loss = NLLLoss(target_subscription_key="target", prediction_subscription_key="probs")
+        plan = PostProcessingPlanner.plan(post_processors, consumers=[loss], prediction_subscription_keys=["*"])
+        assert plan.required_keys is None and plan.post_processors == post_processors
+        custom_post_processor = PredictPostProcessing(PredictPostProcessing(DummyPostProcessorImpl()))
+        plan = PostProcessingPlanner.plan(post_processors + [custom_post_processor], consumers=[loss],
+                                          prediction_subscription_keys=["probs"])
+        assert plan.required_keys is None
@@ -7,6 +7,9 @@ from ml_gym.batching.batch import InferenceResultBatch
 from ml_gym.loss_functions.loss_functions import LPLoss, CrossEntropyLoss, NLLLoss, BCEWithLogitsLoss, \
     BCELoss  # , LPLossScaled
 import torch.nn as nn
+from ml_gym.batching.batch_filters import BatchFilter
+from ml_gym.loss_functions.loss_scaler import MeanScaler, NoScaler, Scaler
+from ml_gym.loss_functions.multi_term_loss_functions import MultiLoss
 
 
 class TestLPLossFunctions:
@@ -61,6 +64,36 @@ class TestLPLossFunctions:
                           sample_selection_fun=lambda inference_batch_result: mask)
         assert len(loss_fun(inference_result_batch_train)) == sum(mask)
 
+    def test_class_selection_mask(self, inference_result_batch_train):
+        inference_result_batch_train.targets["class"] = torch.IntTensor([0, 1] * (TestLPLossFunctions.batch_size // 2))
+        selection_fun = BatchFilter.get_class_selection_fun(target_subscription_key="class", selected_class=1)
+        mask = selection_fun(inference_result_batch_train)
+        assert isinstance(mask, torch.Tensor) and mask.dtype == torch.bool
+        loss_fun = LPLoss(target_subscription_key=TestLPLossFunctions.target_key,
+                          prediction_subscription_key=TestLPLossFunctions.prediction_key,
+                          average_batch_loss=False,
+                          sample_selection_fun=selection_fun)
+        assert len(loss_fun(inference_result_batch_train)) == TestLPLossFunctions.batch_size // 2
+
+    def test_index_selection(self, inference_result_batch_train):
+        indices = list(range(0, TestLPLossFunctions.batch_size, 2))
+        loss_fun = LPLoss(target_subscription_key=TestLPLossFunctions.target_key,
+                          prediction_subscription_key=TestLPLossFunctions.prediction_key,
+                          average_batch_loss=False,
+                          sample_selection_fun=lambda inference_batch_result: indices)
+        assert len(loss_fun(inference_result_batch_train)) == len(indices)
+
+    def test_class_selection_masks(self):
+        targets = torch.IntTensor([0, 1, 2, 1])
+        masks = BatchFilter.get_class_selection_masks(targets, [1, 2])
+        assert torch.equal(masks, torch.BoolTensor([[False, True, False, True], [False, False, True, False]]))
+
+    def test_selection_tensor_dtypes(self):
+        device = torch.device("cpu")
+        assert BatchFilter.to_selection_tensor([], device).dtype == torch.long
+        assert BatchFilter.to_selection_tensor(np.array([0, 2], dtype=np.int32), device).dtype == torch.long
+        assert BatchFilter.to_selection_tensor([True, False], device).dtype == torch.bool
+
     # @pytest.mark.parametrize("exponent, root", [
     #     (2, 1),  # squared L2 norm
     #     (1, 1)  # L1 loss
@@ -165,3 +198,38 @@ class TestClassificationLossFunctions:
         loss_manually = -1 * (t * torch.log(p) + (1 - t) * torch.log(1 - p))
         mean_loss_manually = torch.mean(loss_manually)
         assert abs(mean_loss_manually - loss) < 0.01
+
+
+class TestMultiLoss:
+    target_key = "target_key"
+    prediction_key = "prediction_key"
+
+    class SquareScaler(Scaler):
+        def scale(self, tensor: torch.Tensor) -> torch.Tensor:
+            return tensor ** 2
+
+        def train(self, loss: torch.Tensor):
+            pass
+
+    @pytest.fixture
+    def inference_result_batch(self) -> InferenceResultBatch:
+        targets = torch.IntTensor([1, 0, 1])
+        predictions = torch.FloatTensor([[1, 2], [3, 0], [0, 1]])
+        return InferenceResultBatch(targets={TestMultiLoss.target_key: targets},
+                                    predictions={TestMultiLoss.prediction_key: predictions},
+                                    tags=None)
+
+    @pytest.mark.parametrize("scalers", [[MeanScaler(), NoScaler()], [SquareScaler(), NoScaler()]])
+    def test_multi_loss(self, inference_result_batch: InferenceResultBatch, scalers):
+        loss_terms = [CrossEntropyLoss(TestMultiLoss.target_key, TestMultiLoss.prediction_key, average_batch_loss=False),
+                      NLLLoss(TestMultiLoss.target_key, TestMultiLoss.prediction_key)]
+        loss_weights = [0.3, 0.7]
+        multi_loss = MultiLoss(tag="multi_loss", scalers=scalers, loss_terms=loss_terms, loss_weights=loss_weights)
+        multi_loss.warm_up(inference_result_batch)
+        multi_loss.finish_warmup()
+
+        loss = multi_loss(inference_result_batch)
+        expected_loss = sum(scaler.scale(loss_term(inference_result_batch)) * loss_weight
+                            for scaler, loss_term, loss_weight in zip(scalers, loss_terms, loss_weights))
+        assert loss.shape == expected_loss.shape
+        assert torch.allclose(loss, expected_loss)
@@ -22,6 +22,18 @@ class TestMeanScaler:
         mean_scaler.mean = 3
         assert mean_scaler.scale(value) == value / 3
 
+    def test_zero_mean(self, value):
+        mean_scaler = MeanScaler()
+        mean_scaler.train(torch.zeros(4))
+        assert mean_scaler.get_scale_factor() == 1 / MeanScaler.eps
+        assert mean_scaler.scale(value) == value / MeanScaler.eps
+
+    def test_negative_mean(self, value):
+        mean_scaler = MeanScaler()
+        mean_scaler.train(torch.Tensor([-1, -2, -3]))
+        assert mean_scaler.get_scale_factor() == -0.5
+        assert mean_scaler.scale(value) == value / -2
+
     def test_state(self):
         state = {"mean": 2}
         mean_scaler = MeanScaler()
@@ -1,9 +1,11 @@
+import os
 from typing import List
 
 import numpy as np
 import pytest
 import torch
-from ml_gym.multiprocessing.job import Job
+from ml_gym.multiprocessing.job import Job, JobCollection, JobSpool, JobStatusUpdate
+from ml_gym.multiprocessing.states import JobStatus, JobType
 
 from pytests.multiprocessing.mocked_func import mocked_sum
 from pytests.test_env.fixtures import DeviceFixture
@@ -46,3 +48,43 @@ class TestJob(JobFixture, DeviceFixture):
     def test_execute(self, job: Job, arr: np.array):
         s = job.execute()
         assert s == np.sum(arr)
+
+
+class TestJobCollection(JobFixture):
+
+    @staticmethod
+    def get_update(job_id: int, status: JobStatus, error: str = None) -> JobStatusUpdate:
+        return JobStatusUpdate(job_id=job_id, status=status, starting_time=1.0, finishing_time=2.0, executing_process_id=3,
+                               device="cpu", error=error)
+
+    def test_apply_update(self, jobs: List[Job], num_jobs: int):
+        job_collection = JobCollection()
+        for job in jobs:
+            job_collection.add_or_update_job(job)
+        job_collection.add_or_update_job(Job(job_id=num_jobs, fun=None, blueprint=None, param_dict=None, job_type=JobType.TERMINATE))
+        assert len(job_collection) == job_collection.job_count == num_jobs
+        assert job_collection.done_count == 0 and not job_collection.done
+
+        job = job_collection.apply_update(TestJobCollection.get_update(0, JobStatus.RUNNING))
+        assert job is jobs[0] and job.status == JobStatus.RUNNING and job.executing_process_id == 3
+        assert job_collection.get_jobs(JobStatus.RUNNING) == [jobs[0]]
+        job = job_collection.apply_update(TestJobCollection.get_update(0, JobStatus.DONE, error="error"))
+        assert job.error == "error" and job.device == torch.device("cpu")
+        assert job_collection.get_jobs(JobStatus.RUNNING) == [] and job_collection.done_count == 1
+
+        for job_id in range(1, num_jobs):
+            job_collection.apply_update(TestJobCollection.get_update(job_id, JobStatus.DONE))
+        assert job_collection.done_count == num_jobs and job_collection.done
+        # the termination jobs are not counted
+        job_collection.apply_update(TestJobCollection.get_update(num_jobs, JobStatus.DONE))
+        assert job_collection.done_count == job_collection.job_count == num_jobs
+
+    def test_job_spool(self, jobs: List[Job], arrays: List[np.array]):
+        job_spool = JobSpool()
+        job_descriptors = [job_spool.put(job) for job in jobs]
+        job_spool.flush()
+        for job_descriptor, arr in zip(reversed(job_descriptors), reversed(arrays)):
+            job = job_descriptor.load()
+            assert job.job_id == job_descriptor.job_id and job.execute() == np.sum(arr)
+        job_spool.cleanup()
+        assert not os.path.exists(job_spool.path)
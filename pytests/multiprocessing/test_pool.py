@@ -1,8 +1,10 @@
+import os
 from typing import List
 import pytest
 import torch
 from ml_gym.multiprocessing.job import Job
 from ml_gym.multiprocessing.pool import Pool
+from ml_gym.multiprocessing.states import JobStatus
 from ml_gym.util.logger import QueuedLogging
 from pytests.multiprocessing.test_job import JobFixture
 from pytests.test_env.fixtures import LoggingFixture, DeviceFixture
@@ -52,6 +54,17 @@ class TestPool(JobFixture, DeviceFixture, LoggingFixture):
         # TODO come up with a better check.
         QueuedLogging.stop_listener()
 
+    def test_run_status_updates(self, pool: Pool, jobs: List[Job]):
+        pool.add_jobs(jobs)
+        job_spool_path = pool.job_spool.path
+        pool.run()
+        assert pool.job_collection.done_count == len(jobs)
+        for job in jobs:
+            assert job.status == JobStatus.DONE and job.error is None
+            assert job.executing_process_id in [0, 1] and 0 < job.starting_time <= job.finishing_time
+        assert pool.job_spool is None and not os.path.exists(job_spool_path)
+        QueuedLogging.stop_listener()
+
     def test_create_or_replace_process(self, pool: Pool, num_processes: int):
         for process_id in range(num_processes):
             # add process
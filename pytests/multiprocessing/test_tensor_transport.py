@@ -0,0 +1,74 @@
+import torch
+from torch.multiprocessing import get_context
+from ml_gym.batching.batch import DatasetBatch, InferenceResultBatch, EvaluationBatchResult
+from ml_gym.multiprocessing.tensor_transport import SharedTensorRing, SharedTensorQueue
+
+
+def sum_predictions(shared_q: SharedTensorQueue, result_q):
+    with shared_q.get() as batch:
+        result_q.put(batch.get_predictions("logits").sum().item())
+    # the producer overwrites the released slot with the second batch
+    with shared_q.get() as batch:
+        result_q.put(batch.get_predictions("logits").sum().item())
+
+
+class TestSharedTensorRing:
+
+    @staticmethod
+    def get_inference_result_batch(value: float) -> InferenceResultBatch:
+        return InferenceResultBatch(targets={"target": torch.arange(4)}, tags=torch.arange(4),
+                                    predictions={"logits": torch.full((4, 3), value), "hidden": {"pooled": torch.ones(4, 2)}})
+
+    def test_pack_unpack_without_copy(self):
+        ring = SharedTensorRing(num_slots=2, slot_size_bytes=2**16)
+        batch = TestSharedTensorRing.get_inference_result_batch(1.5)
+        handle = ring.pack(batch)
+        assert ring.num_free_slots == 1
+        unpacked_batch = ring.unpack(handle)
+        assert torch.equal(unpacked_batch.predictions["hidden"]["pooled"], torch.ones(4, 2))
+        assert torch.equal(unpacked_batch.tags, batch.tags)
+        # the tensors are views into the shared slot
+        assert unpacked_batch.get_predictions("logits").untyped_storage().data_ptr() == ring._buffer.untyped_storage().data_ptr()
+        ring.release(handle)
+        assert ring.num_free_slots == 2
+
+    def test_dataset_batch(self):
+        ring = SharedTensorRing(num_slots=1, slot_size_bytes=2**16)
+        batch = DatasetBatch(samples={"ids": torch.arange(8), "mask": torch.ones(8, dtype=torch.bool)}, targets={"t": torch.zeros(8)})
+        handle = ring.pack(batch, num_consumers=2)
+        unpacked_batch = ring.unpack(handle)
+        assert torch.equal(unpacked_batch.samples["mask"], batch.samples["mask"])
+        ring.release(handle)
+        assert ring.num_free_slots == 0
+        ring.release(handle)
+        assert ring.num_free_slots == 1
+
+    def test_fallbacks_to_pickling(self):
+        ring = SharedTensorRing(num_slots=1, slot_size_bytes=64)
+        evaluation_result = EvaluationBatchResult(losses={"loss": [0.1]}, metrics={}, dataset_name="d", split_name="test")
+        handle = ring.pack(evaluation_result)
+        assert handle.slot == -1 and ring.unpack(handle).losses == {"loss": [0.1]}
+        handle = ring.pack(TestSharedTensorRing.get_inference_result_batch(1.0))
+        assert handle.slot == -1 and ring.num_free_slots == 1
+        assert ring.unpack(handle).get_predictions("logits").shape == (4, 3)
+
+    def test_empty_tensors(self):
+        ring = SharedTensorRing(num_slots=1, slot_size_bytes=2**16)
+        batch = DatasetBatch(samples=torch.empty(0, 3), targets={"t": torch.empty(0)})
+        handle = ring.pack(batch)
+        # the empty tensors do not occupy the slot, but are persisted within it
+        assert handle.slot == 0
+        assert ring.unpack(handle).samples.shape == (0, 3)
+        ring.release(handle)
+
+    def test_transport_between_processes(self):
+        context = get_context("spawn")
+        ring = SharedTensorRing(num_slots=1, slot_size_bytes=2**16, timeout=120, context=context)
+        shared_q = SharedTensorQueue(context.Queue(), ring)
+        result_q = context.Queue()
+        process = context.Process(target=sum_predictions, args=(shared_q, result_q))
+        process.start()
+        shared_q.put(TestSharedTensorRing.get_inference_result_batch(1.0))
+        shared_q.put(TestSharedTensorRing.get_inference_result_batch(2.0))
+        assert [result_q.get(timeout=120), result_q.get(timeout=120)] == [12.0, 24.0]
+        process.join()
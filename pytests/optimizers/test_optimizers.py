@@ -7,6 +7,7 @@ from typing import List, Tuple, Dict, Any
 from torch.optim.sgd import SGD
 from functools import partial
 from copy import deepcopy
+import pickle
 
 
 class TestOptimizerAdapter:
@@ -131,3 +132,66 @@ class TestOptimizerAdapter:
         assert (optimizer.state_dict()["state"][0]["momentum_buffer"] == optimizer_state_dict["state"][0][
             "momentum_buffer"]).all()
         assert optimizer._state_dict is None
+
+    def test_reregister_model_params_keeps_state(self, data_batch, model, optimizer: OptimizerAdapter):
+        optimizer.register_model_params(model_params=dict(model.named_parameters()))
+        x, y = data_batch
+        loss_fn = torch.nn.MSELoss(reduction='sum')
+
+        optimizer.zero_grad()
+        loss = loss_fn(model(x), y)
+        loss.backward()
+        optimizer.step()
+
+        internal_optimizer = optimizer._optimizer
+        momentum_buffers = [state["momentum_buffer"] for state in internal_optimizer.state.values()]
+        optimizer.register_model_params(model_params=dict(model.named_parameters()))
+        # state is kept by reference and not round-tripped
+        assert optimizer._optimizer is internal_optimizer
+        assert all(a is b for a, b in zip(momentum_buffers, [state["momentum_buffer"]
+                                                             for state in optimizer._optimizer.state.values()]))
+
+        # state is rebound to the params of a copied model
+        model_copy = deepcopy(model)
+        optimizer.register_model_params(model_params=dict(model_copy.named_parameters()))
+        for param, momentum_buffer in zip(model_copy.parameters(), momentum_buffers):
+            assert optimizer._optimizer.state[param]["momentum_buffer"] is momentum_buffer
+
+    def test_register_additional_model_params(self, model, optimizer: OptimizerAdapter):
+        optimizer.register_model_params(model_params=dict(model.named_parameters()))
+        model_params = dict(model.named_parameters())
+        model_params["extra"] = Parameter(torch.randn(3))
+        optimizer.register_model_params(model_params=model_params)
+        assert len(optimizer._optimizer.param_groups) == 2
+        assert optimizer._optimizer.param_groups[1]["params"][0] is model_params["extra"]
+
+    def test_failing_rebind_leaves_optimizer_untouched(self, data_batch, model, optimizer: OptimizerAdapter):
+        model_params = dict(model.named_parameters())
+        optimizer.register_model_params(model_params=model_params)
+        model_params["extra"] = Parameter(torch.randn(3))
+        optimizer.register_model_params(model_params=model_params)
+        x, y = data_batch
+        optimizer.zero_grad()
+        torch.nn.MSELoss(reduction='sum')(model(x), y).backward()
+        optimizer.step()
+
+        registered_params = [list(group["params"]) for group in optimizer._optimizer.param_groups]
+        registered_states = dict(optimizer._optimizer.state)
+        # the shape mismatch is only in the second param group
+        new_params = [Parameter(param.detach().clone()) for param in model.parameters()] + [Parameter(torch.randn(4))]
+        with pytest.raises(ValueError):
+            optimizer._rebind_model_params(new_params)
+        with pytest.raises(ValueError):
+            optimizer._rebind_model_params(new_params[:-1])
+        assert [list(group["params"]) for group in optimizer._optimizer.param_groups] == registered_params
+        assert dict(optimizer._optimizer.state) == registered_states
+
+    @pytest.mark.parametrize("serialize_fun", [OptimizerAdapter.serialize_state_dict, pickle.dumps])
+    def test_load_serialized_state_dict(self, optimizer: OptimizerAdapter, model, optimizer_state_dict, serialize_fun):
+        optimizer.load_serialized_state_dict(serialize_fun(optimizer_state_dict))
+        # deserialization is deferred until the model params are registered
+        assert optimizer._optimizer is None and optimizer._serialized_state_dict is not None
+        optimizer.register_model_params(model_params=dict(model.named_parameters()))
+        assert optimizer._serialized_state_dict is None
+        assert (optimizer.state_dict()["state"][0]["momentum_buffer"] == optimizer_state_dict["state"][0][
+            "momentum_buffer"]).all()
@@ -0,0 +1,121 @@
+from ml_gym.optimizers.optimizer import OptimizerAdapter
+from ml_gym.optimizers.state_precision import StatePrecision, Blockwise8BitStateCodec
+import pytest
+import torch
+from torch.nn import Module
+from torch.optim import Adam
+from typing import Tuple
+
+
+class TestStatePrecision:
+
+    @pytest.fixture
+    def data(self) -> Tuple[torch.Tensor, torch.Tensor]:
+        torch.manual_seed(0)
+        x = torch.randn(256, 20)
+        y = x @ torch.randn(20, 1) + 0.1 * torch.randn(256, 1)
+        return x, y
+
+    @staticmethod
+    def get_model() -> Module:
+        torch.manual_seed(1)
+        return torch.nn.Sequential(torch.nn.Linear(20, 64), torch.nn.ReLU(), torch.nn.Linear(64, 1))
+
+    @staticmethod
+    def train(model: Module, optimizer: OptimizerAdapter, data: Tuple[torch.Tensor, torch.Tensor], num_steps: int) -> float:
+        x, y = data
+        loss_fn = torch.nn.MSELoss()
+        for _ in range(num_steps):
+            optimizer.zero_grad()
+            loss = loss_fn(model(x), y)
+            loss.backward()
+            optimizer.step()
+        return loss_fn(model(x), y).item()
+
+    @pytest.mark.parametrize("state_precision", [StatePrecision.BF16, StatePrecision.BLOCKWISE_8BIT])
+    def test_convergence_parity(self, data, state_precision: StatePrecision):
+        model = TestStatePrecision.get_model()
+        optimizer = OptimizerAdapter(Adam, {"lr": 0.01})
+        optimizer.register_model_params(model_params=dict(model.named_parameters()))
+        initial_loss = torch.nn.MSELoss()(model(data[0]), data[1]).item()
+        fp32_loss = TestStatePrecision.train(model, optimizer, data, num_steps=200)
+
+        model = TestStatePrecision.get_model()
+        optimizer = OptimizerAdapter(Adam, {"lr": 0.01}, state_precision=state_precision)
+        optimizer.register_model_params(model_params=dict(model.named_parameters()))
+        low_precision_loss = TestStatePrecision.train(model, optimizer, data, num_steps=200)
+
+        assert fp32_loss < 0.1 * initial_loss
+        assert abs(low_precision_loss - fp32_loss) < 0.1 * fp32_loss + 1e-3
+
+    def test_state_is_stored_compactly(self, data):
+        model = TestStatePrecision.get_model()
+        fp32_optimizer = OptimizerAdapter(Adam, {"lr": 0.01})
+        fp32_optimizer.register_model_params(model_params=dict(model.named_parameters()))
+        TestStatePrecision.train(model, fp32_optimizer, data, num_steps=1)
+
+        model = TestStatePrecision.get_model()
+        optimizer = OptimizerAdapter(Adam, {"lr": 0.01}, state_precision=StatePrecision.BLOCKWISE_8BIT)
+        optimizer.register_model_params(model_params=dict(model.named_parameters()))
+        TestStatePrecision.train(model, optimizer, data, num_steps=1)
+
+        for param_state in optimizer.state_dict()["state"].values():
+            assert param_state["exp_avg"]["codes"].dtype == Blockwise8BitStateCodec.get_code_dtype()
+            assert param_state["exp_avg_sq"]["codes"].dtype == Blockwise8BitStateCodec.get_code_dtype()
+        serialized_size = len(OptimizerAdapter.serialize_state_dict(optimizer.state_dict()))
+        fp32_serialized_size = len(OptimizerAdapter.serialize_state_dict(fp32_optimizer.state_dict()))
+        assert serialized_size < fp32_serialized_size
+
+    @pytest.mark.parametrize("state_precision", [StatePrecision.BF16, StatePrecision.BLOCKWISE_8BIT])
+    def test_checkpoint_recovery(self, data, state_precision: StatePrecision):
+        model = TestStatePrecision.get_model()
+        optimizer = OptimizerAdapter(Adam, {"lr": 0.01}, state_precision=state_precision)
+        optimizer.register_model_params(model_params=dict(model.named_parameters()))
+        TestStatePrecision.train(model, optimizer, data, num_steps=5)
+        serialized_state_dict = OptimizerAdapter.serialize_state_dict(optimizer.state_dict())
+
+        restored_optimizer = OptimizerAdapter(Adam, {"lr": 0.01}, state_precision=state_precision)
+        restored_optimizer.load_serialized_state_dict(serialized_state_dict)
+        restored_optimizer.register_model_params(model_params=dict(model.named_parameters()))
+
+        # the encoded state is restored as is and not cast to the dtype of the params
+        for param_state, restored_param_state in zip(optimizer.state_dict()["state"].values(),
+                                                     restored_optimizer.state_dict()["state"].values()):
+            assert type(param_state["exp_avg"]) == type(restored_param_state["exp_avg"])
+            if isinstance(param_state["exp_avg"], torch.Tensor):
+                assert restored_param_state["exp_avg"].dtype == torch.bfloat16
+                assert torch.equal(param_state["exp_avg"], restored_param_state["exp_avg"])
+            else:
+                assert torch.equal(param_state["exp_avg"]["scales"], restored_param_state["exp_avg"]["scales"])
+        TestStatePrecision.train(model, restored_optimizer, data, num_steps=1)
+
+    def test_state_is_decoded_param_by_param(self, data):
+        model = TestStatePrecision.get_model()
+        optimizer = OptimizerAdapter(Adam, {"lr": 0.01}, state_precision=StatePrecision.BLOCKWISE_8BIT)
+        optimizer.register_model_params(model_params=dict(model.named_parameters()))
+        TestStatePrecision.train(model, optimizer, data, num_steps=1)
+
+        state_codec = optimizer._state_codec
+        decode_state, encode_state = state_codec.decode_state, state_codec.encode_state
+        decoded_bytes = [0]
+
+        def get_decoded_bytes(state, param) -> int:
+            return sum(value.numel() * value.element_size() for value in state.values()
+                       if isinstance(value, torch.Tensor) and value.shape == param.shape)
+
+        def tracked_decode_state(state, param):
+            decode_state(state, param)
+            decoded_bytes.append(decoded_bytes[-1] + get_decoded_bytes(state, param))
+
+        def tracked_encode_state(state, param):
+            decoded_bytes.append(decoded_bytes[-1] - get_decoded_bytes(state, param))
+            encode_state(state, param)
+
+        state_codec.decode_state, state_codec.encode_state = tracked_decode_state, tracked_encode_state
+        TestStatePrecision.train(model, optimizer, data, num_steps=1)
+
+        # Adam keeps two moments of the shape of the param
+        max_param_state_bytes = max(2 * param.numel() * param.element_size() for param in model.parameters())
+        assert len(decoded_bytes) == 2 * len(list(model.parameters())) + 1
+        assert max(decoded_bytes) == max_param_state_bytes
+        assert decoded_bytes[-1] == 0
@@ -1,16 +1,45 @@
 import torch
 from abc import abstractmethod, ABC
-from typing import Dict, List, Any, Callable, Union
+from collections.abc import Mapping, MutableMapping
+from typing import Dict, Iterator, List, Any, Callable, Tuple, Union
 from ml_gym.error_handling.exception import BatchStateError
-import copy
 from functools import partial
 
 
 class TorchDeviceMixin(ABC):
+    """Device moves and detaching are lazy. `to_device` and `detach` only record the transformation, which is applied with a
+    single traversal of the tensors when they are accessed next. Tensors that are already on the target device are not moved.
+    """
+    __slots__ = ("_pending_device", "_pending_non_blocking", "_pending_detach")
+
+    def _reset_pending(self):
+        self._pending_device = None
+        self._pending_non_blocking = False
+        self._pending_detach = False
+
+    def _apply_pending(self):
+        if self._pending_device is None and not self._pending_detach:
+            return
+        device, non_blocking, detach = self._pending_device, self._pending_non_blocking, self._pending_detach
+        self._reset_pending()
+
+        def apply_fun(tensor: torch.Tensor) -> torch.Tensor:
+            tensor = tensor.detach() if detach else tensor
+            return TorchDeviceMixin._tensor_to_device(tensor, device, non_blocking) if device is not None else tensor
+
+        self._apply(apply_fun)
+
+    @abstractmethod
+    def _apply(self, apply_fun: Callable[[torch.Tensor], torch.Tensor]):
+        raise NotImplementedError
+
+    @staticmethod
+    def _tensor_to_device(tensor: torch.Tensor, device: torch.device, non_blocking: bool = False) -> torch.Tensor:
+        return tensor if tensor.device == device else tensor.to(device, non_blocking=non_blocking)
 
     @staticmethod
     def _dict_tensor_to_device(d: Dict[str, Any], device: torch.device) -> Dict[str, Any]:
-        partial_fun = partial(torch.Tensor.to, device=device)
+        partial_fun = partial(TorchDeviceMixin._tensor_to_device, device=device)
         return TorchDeviceMixin.traverse_apply(ds=d, apply_fun=partial_fun)
         # return {k: TorchDeviceMixin._dict_tensor_to_device(v, device) if not isinstance(v, torch.Tensor) else v.to(device) for k, v in d.items()}
 
@@ -33,7 +62,7 @@ class TorchDeviceMixin(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    def to_device(self, device: torch.device):
+    def to_device(self, device: torch.device, non_blocking: bool = False):
         raise NotImplementedError
 
     @abstractmethod
@@ -48,12 +77,19 @@ class TorchDeviceMixin(ABC):
 class Batch(ABC):
     """Abstract class that defines the necessary methods any `Batch` implementation needs to implement.
     """
+    __slots__ = ()
 
     @staticmethod
     def combine(batches: List['Batch']):
         batch_combined = batches[0].__class__.combine_impl(batches)
         return batch_combined
 
+    @staticmethod
+    def _get_first_tensor(tensors: Union[torch.Tensor, Dict]) -> torch.Tensor:
+        while isinstance(tensors, dict):
+            tensors = next(iter(tensors.values()))
+        return tensors
+
     @staticmethod
     def _copy_tensor_dict(d: Dict[Any, torch.Tensor]):
         return {k: v.detach().clone() for k, v in d.items()}
@@ -85,194 +121,407 @@ class Batch(ABC):
 
 
 class DatasetBatch(Batch, TorchDeviceMixin):
-    """A batch of samples and its targets and tags. Used to batch train a model."""
+    """A batch of samples and its targets and tags. Used to batch train a model.
+    The samples are either a tensor or a (nested) dict of tensors, e.g., for multi input models."""
+    __slots__ = ("_samples", "_targets", "_tags")
 
     def __init__(self, samples: Union[torch.Tensor, Dict], targets: Dict[str, torch.Tensor], tags: torch.Tensor = None,
                  samples_require_grad: bool = False):
+        self._reset_pending()
         self._samples = samples
-        self._samples.requires_grad = samples_require_grad
+        self.samples_require_grad = samples_require_grad
         self._targets = targets
         self._tags = tags if tags is not None else torch.Tensor()
 
     @property
     def samples(self) -> Union[torch.Tensor, Dict]:
+        self._apply_pending()
         return self._samples
 
     @property
     def targets(self) -> Dict[str, torch.Tensor]:
+        self._apply_pending()
         return self._targets
 
     @property
     def tags(self) -> torch.Tensor:
+        self._apply_pending()
         return self._tags
 
     @property
     def samples_require_grad(self) -> bool:
-        return self._samples.requires_grad
+        return DatasetBatch._get_first_tensor(self.samples).requires_grad
 
     @samples_require_grad.setter
     def samples_require_grad(self, value: bool):
-        self._samples.requires_grad = value
+        def set_requires_grad(tensor: torch.Tensor) -> torch.Tensor:
+            tensor.requires_grad = value
+            return tensor
+
+        TorchDeviceMixin.traverse_apply(self.samples, set_requires_grad)
+
+    def _apply(self, apply_fun: Callable[[torch.Tensor], torch.Tensor]):
+        self._samples = TorchDeviceMixin.traverse_apply(self._samples, apply_fun)
+        self._targets = {k: apply_fun(v) for k, v in self._targets.items()}
+        self._tags = apply_fun(self._tags)
 
     def detach(self):
-        self._targets = {k: v.detach() for k, v in self._targets.items()}
-        self._tags = self._tags.detach()
-        self._samples = self._samples.detach()
+        self._pending_detach = True
 
-    def to_device(self, device: torch.device):
-        self._samples = self._samples.to(device)
-        self._targets = {k: v.to(device) for k, v in self._targets.items()}
-        self._tags = self._tags.to(device)
+    def to_device(self, device: torch.device, non_blocking: bool = False):
+        self._pending_device = device
+        self._pending_non_blocking = non_blocking
 
     def to_cpu(self):
         self.to_device(device=torch.device("cpu"))
 
+    def pin_memory(self) -> 'DatasetBatch':
+        # called by the torch DataLoader if pin_memory is enabled
+        self._apply_pending()
+        self._samples = TorchDeviceMixin.traverse_apply(self._samples, torch.Tensor.pin_memory)
+        self._targets = TorchDeviceMixin.traverse_apply(self._targets, torch.Tensor.pin_memory)
+        self._tags = self._tags.pin_memory()
+        return self
+
     def get_device(self) -> torch.device:
-        return self._samples.device
+        if self._pending_device is not None:
+            return self._pending_device
+        return DatasetBatch._get_first_tensor(self._samples).device
+
+    @staticmethod
+    def _combine_samples(samples: List[Union[torch.Tensor, Dict]]) -> Union[torch.Tensor, Dict]:
+        return Batch._combine_tensor_dicts(samples) if isinstance(samples[0], dict) else torch.cat(samples)
 
     @staticmethod
     def combine_impl(batches: List['DatasetBatch']) -> 'DatasetBatch':
         tags = torch.cat([batch.tags for batch in batches])
-        samples = torch.cat([batch.samples for batch in batches])
+        samples = DatasetBatch._combine_samples([batch.samples for batch in batches])
         targets = Batch._combine_tensor_dicts([batch.targets for batch in batches])
         return DatasetBatch(targets=targets, samples=samples, tags=tags)
 
     def __len__(self) -> int:
-        return len(self._samples)
+        return len(DatasetBatch._get_first_tensor(self._samples))
 
     def __deepcopy__(self, memo) -> 'DatasetBatch':
-        samples_ = self.samples.detach().clone()
+        samples_ = TorchDeviceMixin.traverse_apply(self.samples, lambda t: t.detach().clone())
         targets_ = self._copy_tensor_dict(self.targets)
         tags_ = self.tags.detach().clone()
         return DatasetBatch(samples=samples_, targets=targets_, tags=tags_)
 
     @staticmethod
     def combine_pair(b_1: 'DatasetBatch', b_2: 'DatasetBatch') -> 'DatasetBatch':
-        b_1 = copy.deepcopy(b_1)
-        b_2 = copy.deepcopy(b_2)
+        # torch.cat allocates new tensors, so the batches are not copied beforehand
         tags = torch.cat([b_1.tags, b_2.tags])
-        samples = torch.cat([b_1.samples, b_2.samples])
+        samples = DatasetBatch._combine_samples([b_1.samples, b_2.samples])
         targets = Batch._combine_tensor_dicts([b_1.targets, b_2.targets])
         return DatasetBatch(targets=targets, samples=samples, tags=tags)
 
 
+class KeyPathView(MutableMapping):
+    """Nested dict view of the tensors of a flat dict, which is keyed by key paths (tuples of keys). The value of a key is
+    either the tensor of the path or the view of the sub tree. Setting and deleting keys writes through to the flat dict.
+    """
+    __slots__ = ("_flat", "_prefix")
+
+    def __init__(self, flat: Dict[Tuple, torch.Tensor], prefix: Tuple = ()):
+        self._flat = flat
+        self._prefix = prefix
+
+    @staticmethod
+    def flatten(tree: Any, prefix: Tuple = ()) -> Dict[Tuple, torch.Tensor]:
+        if isinstance(tree, torch.Tensor):
+            return {prefix: tree}
+        if isinstance(tree, KeyPathView):
+            return {prefix + path: tensor for path, tensor in tree.flat_items()}
+        if isinstance(tree, (dict, Mapping)):
+            flat = {}
+            for key, sub_tree in tree.items():
+                flat.update(KeyPathView.flatten(sub_tree, prefix + (key,)))
+            return flat
+        return {prefix: tree}
+
+    def _get_sub_paths(self, path: Tuple) -> List[Tuple]:
+        return [p for p in self._flat if p[:len(path)] == path]
+
+    def __getitem__(self, key: Any) -> Union[torch.Tensor, 'KeyPathView']:
+        path = self._prefix + (key,)
+        if path in self._flat:
+            return self._flat[path]
+        if self._get_sub_paths(path):
+            return KeyPathView(self._flat, path)
+        raise KeyError(key)
+
+    def __setitem__(self, key: Any, value: Any):
+        path = self._prefix + (key,)
+        if path in self._flat and not isinstance(value, Mapping):
+            self._flat[path] = value
+            return
+        for sub_path in self._get_sub_paths(path):
+            del self._flat[sub_path]
+        self._flat.update(KeyPathView.flatten(value, path))
+
+    def __delitem__(self, key: Any):
+        sub_paths = self._get_sub_paths(self._prefix + (key,))
+        if not sub_paths:
+            raise KeyError(key)
+        for sub_path in sub_paths:
+            del self._flat[sub_path]
+
+    def __iter__(self) -> Iterator:
+        depth = len(self._prefix)
+        return iter(dict.fromkeys(p[depth] for p in self._flat if len(p) > depth and p[:depth] == self._prefix))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def flat_items(self) -> List[Tuple[Tuple, torch.Tensor]]:
+        depth = len(self._prefix)
+        return [(path[depth:], tensor) for path, tensor in self._flat.items() if path[:depth] == self._prefix]
+
+    def to_dict(self) -> Dict[Any, Any]:
+        return {key: value.to_dict() if isinstance(value, KeyPathView) else value for key, value in self.items()}
+
+    def __repr__(self) -> str:
+        return f"KeyPathView({self.to_dict()})"
+
+
 class InferenceResultBatch(Batch, TorchDeviceMixin):
     """ Stores targets and predictions of an entire batch.
+
+    The (nested) predictions are stored flat, keyed by their key paths (see `flat_predictions`), such that moving, filtering
+    and combining them does not recurse through the nesting. `predictions` provides the nested view on them.
     """
+    __slots__ = ("_targets", "_tags", "_predictions")
 
     def __init__(self, targets: Dict[str, torch.Tensor] = None, predictions: Dict[str, torch.Tensor] = None, tags: torch.Tensor = None):
+        self._reset_pending()
         self._targets = targets if targets is not None else {}
         self._tags = tags
-        self._predictions = predictions if predictions is not None else {}
+        self._predictions = KeyPathView.flatten(predictions) if predictions is not None else {}
+
+    @staticmethod
+    def from_flat_predictions(flat_predictions: Dict[Tuple, torch.Tensor], targets: Dict[str, torch.Tensor] = None,
+                              tags: torch.Tensor = None) -> 'InferenceResultBatch':
+        batch = InferenceResultBatch(targets=targets, tags=tags)
+        batch._predictions = flat_predictions
+        return batch
 
     def to_cpu(self):
         self.to_device(device=torch.device("cpu"))
 
     def get_device(self) -> torch.device:
+        if self._pending_device is not None:
+            return self._pending_device
         return self._tags.device
 
-    def to_device(self, device: torch.device):
-        self._predictions = TorchDeviceMixin._dict_tensor_to_device(self._predictions, device)
-        self._targets = {k: v.to(device) for k, v in self._targets.items()}
-        self._tags = self._tags.to(device)
+    def _apply(self, apply_fun: Callable[[torch.Tensor], torch.Tensor]):
+        self._predictions = {path: apply_fun(tensor) for path, tensor in self._predictions.items()}
+        self._targets = {k: apply_fun(v) for k, v in self._targets.items()}
+        self._tags = apply_fun(self._tags) if self._tags is not None else None
+
+    def to_device(self, device: torch.device, non_blocking: bool = False):
+        self._pending_device = device
+        self._pending_non_blocking = non_blocking
 
     def detach(self):
-        self._targets = {k: v.detach() for k, v in self._targets.items()}
-        self._tags = self._tags.detach()
-        self._predictions = TorchDeviceMixin._detach_dict_tensor(self._predictions)
+        self._pending_detach = True
+
+    @property
+    def predictions(self) -> KeyPathView:
+        self._apply_pending()
+        return KeyPathView(self._predictions)
 
     @property
-    def predictions(self) -> Dict[str, torch.Tensor]:
+    def flat_predictions(self) -> Dict[Tuple, torch.Tensor]:
+        self._apply_pending()
         return self._predictions
 
     def add_predictions(self, key: str, predictions: torch.Tensor):
-        self._predictions[key] = predictions
+        self.predictions[key] = predictions
 
-    def get_predictions(self, key: str) -> torch.Tensor:
-        if key not in self._predictions:
+    def get_predictions(self, key: Union[str, Tuple]) -> Union[torch.Tensor, KeyPathView]:
+        """Returns the predictions of a top level key or of a key path (tuple)."""
+        try:
+            return self.flat_predictions[key] if isinstance(key, tuple) else self.predictions[key]
+        except KeyError:
             raise BatchStateError(f"Key {key} not present in predictions!")
-        return self._predictions[key]
 
     def drop_predictions(self, keys: List[str]):
+        predictions = self.predictions
         for key in keys:
-            del self._predictions[key]
+            del predictions[key]
 
     def drop_targets(self, keys: List[str]):
         for key in keys:
             del self._targets[key]
 
     def get_targets(self, key: str) -> torch.Tensor:
-        if key not in self._targets:
+        if key not in self.targets:
             raise BatchStateError(f"Key {key} not present in targets!")
-        return self._targets[key]
+        return self.targets[key]
 
     def add_targets(self, key: str, targets: torch.Tensor):
-        self._targets[key] = targets
+        self.targets[key] = targets
 
     @property
     def targets(self) -> Dict[str, torch.Tensor]:
+        self._apply_pending()
         return self._targets
 
     @property
     def tags(self) -> torch.Tensor:
+        self._apply_pending()
         return self._tags
 
     def __len__(self) -> int:
         return len(self._tags)
 
     def __deepcopy__(self, memo) -> 'InferenceResultBatch':
-        predictions_ = self._copy_tensor_dict(self.predictions)
+        predictions_ = self._copy_tensor_dict(self.flat_predictions)
         targets_ = self._copy_tensor_dict(self.targets)
         tags_ = self.tags.detach().clone()
-        return InferenceResultBatch(predictions=predictions_, targets=targets_, tags=tags_)
-
-    def split_results(self, target_keys: List[str], predictions_keys: List[Union[str, List]], device: torch.device):
-        def _filter_predictions(predictions_keys: List[str], predictions: Dict, filtered_predictions: Dict):
-            p_key = predictions_keys[0]
-            if p_key == "*":
-                p_keys = list(predictions.keys())
-            else:
-                p_keys = [p_key]
-            if len(predictions_keys) == 1:
-                for p_key in p_keys:
-                    filtered_predictions[p_key] = predictions[p_key]
-            else:
-                for p_key in p_keys:
-                    if p_key not in filtered_predictions:
-                        filtered_predictions[p_key] = {}
-                    _filter_predictions(predictions_keys[1:], predictions[p_key], filtered_predictions[p_key])
-
-        predictions_keys_list = [[p_key] if isinstance(p_key, str) else p_key for p_key in predictions_keys]
-        filtered_targets = {key: self._targets[key].to(device) for key in target_keys if key in self._targets}
-
-        filtered_predictions = {}
-        for p_keys in predictions_keys_list:
-            _filter_predictions(p_keys, self.predictions, filtered_predictions)
-
-        filtered_predictions = TorchDeviceMixin._dict_tensor_to_device(filtered_predictions, device)
-        tags = self.tags.to(device)
-        return InferenceResultBatch(targets=filtered_targets, predictions=filtered_predictions, tags=tags)
+        return InferenceResultBatch.from_flat_predictions(predictions_, targets=targets_, tags=tags_)
+
+    def get_prediction_paths(self, predictions_keys: List[Union[str, List]]) -> List[Tuple]:
+        """Resolves the subscription patterns into the key paths of the predictions of this batch. A pattern is a key or a
+        list of keys, one per nesting level, where `*` matches any key. All predictions below the matched keys are selected."""
+        prediction_paths = {}
+        for p_key in predictions_keys:
+            pattern = (p_key,) if isinstance(p_key, str) else tuple(p_key)
+            matched_paths = [path for path in self._predictions
+                             if len(path) >= len(pattern) and all(k == "*" or k == p for k, p in zip(pattern, path))]
+            if not matched_paths and "*" not in pattern:
+                raise BatchStateError(f"Key {p_key} not present in predictions!")
+            prediction_paths.update(dict.fromkeys(matched_paths))
+        return list(prediction_paths)
+
+    def split_results(self, target_keys: List[str], predictions_keys: List[Union[str, List]], device: torch.device = None,
+                      prediction_paths: List[Tuple] = None):
+        """Returns the batch restricted to the targets and predictions of the given keys on `device`. The returned batch
+        references the tensors of this batch, which are neither copied nor moved if `device` is None or the tensors are
+        already on `device`. Pending device moves of this batch are only applied to the selected tensors.
+
+        The `prediction_paths` resolved from `predictions_keys` (see `get_prediction_paths`) can be passed to skip the
+        pattern matching, e.g., when splitting all batches of a split."""
+        if prediction_paths is None:
+            prediction_paths = self.get_prediction_paths(predictions_keys)
+        filtered_targets = {key: self._targets[key] for key in target_keys if key in self._targets}
+        try:
+            filtered_predictions = {path: self._predictions[path] for path in prediction_paths}
+        except KeyError as e:
+            raise BatchStateError(f"Key path {e.args[0]} not present in predictions!") from e
+
+        filtered_batch = InferenceResultBatch.from_flat_predictions(filtered_predictions, targets=filtered_targets, tags=self._tags)
+        filtered_batch._pending_device = self._pending_device
+        filtered_batch._pending_non_blocking = self._pending_non_blocking
+        filtered_batch._pending_detach = self._pending_detach
+        if device is not None:
+            filtered_batch.to_device(device)
+        return filtered_batch
 
     @staticmethod
     def combine_pair(b_1: 'InferenceResultBatch', b_2: 'InferenceResultBatch') -> 'InferenceResultBatch':
-        # tags = torch.cat([b_1.tags, b_2.tags])
-        tags = b_1.tags + b_2.tags
-        predictions = Batch._combine_tensor_dicts([b_1.predictions, b_2.predictions])
-        targets = Batch._combine_tensor_dicts([b_1.targets, b_2.targets])
-        return InferenceResultBatch(targets=targets, predictions=predictions, tags=tags)
+        return InferenceResultBatch.combine_impl([b_1, b_2])
 
     @staticmethod
     def combine_impl(batches: List['InferenceResultBatch']) -> 'InferenceResultBatch':
-        tags = [tag for batch in batches for tag in batch.tags]
-        predictions = Batch._combine_tensor_dicts([batch.predictions for batch in batches])
+        tags = torch.cat([batch.tags for batch in batches])
+        predictions = Batch._combine_tensor_dicts([batch.flat_predictions for batch in batches])
         targets = Batch._combine_tensor_dicts([batch.targets for batch in batches])
-        return InferenceResultBatch(targets=targets, predictions=predictions, tags=tags)
+        return InferenceResultBatch.from_flat_predictions(predictions, targets=targets, tags=tags)
+
+
+class InferenceResultBatchAggregator:
+    """Aggregates the inference result batches of a split into buffers that are preallocated for `num_samples` samples
+    (e.g., `len(dataset_loader.dataset)`), instead of collecting the batches and concatenating them at the end.
+
+    The targets, predictions and tags of each batch are detached and copied in place into the buffers on `device` (the
+    device of the first batch by default). The buffers are allocated with the shapes and dtypes of the first batch and grow
+    if more than `num_samples` samples are added. The result holds the first `len(aggregator)` samples (e.g., with `drop_last`).
+    """
+
+    def __init__(self, num_samples: int, device: torch.device = None):
+        self.device = device
+        self._capacity = num_samples
+        self._num_samples = 0
+        self._targets: Dict[str, torch.Tensor] = None
+        self._predictions: Dict[Tuple, torch.Tensor] = None
+        self._tags: torch.Tensor = None
+
+    def __len__(self) -> int:
+        return self._num_samples
+
+    def _allocate(self, tensors: Union[Dict, torch.Tensor], capacity: int) -> Union[Dict, torch.Tensor]:
+        def allocate(tensor: torch.Tensor) -> torch.Tensor:
+            device = self.device if self.device is not None else tensor.device
+            return torch.empty((capacity,) + tuple(tensor.shape[1:]), dtype=tensor.dtype, device=device)
+
+        return TorchDeviceMixin.traverse_apply(tensors, allocate)
+
+    @staticmethod
+    def _write(buffers: Union[Dict, torch.Tensor], tensors: Union[Dict, torch.Tensor], offset: int, batch_size: int, key: str = None):
+        if isinstance(buffers, dict):
+            if not isinstance(tensors, dict) or buffers.keys() != tensors.keys():
+                raise BatchStateError(f"Keys of the batch differ from the keys of the previous batches for key {key}.")
+            for k in buffers.keys():
+                InferenceResultBatchAggregator._write(buffers[k], tensors[k], offset, batch_size, k)
+        else:
+            if not isinstance(tensors, torch.Tensor) or tensors.dim() == 0 or tensors.shape[0] != batch_size:
+                raise BatchStateError(f"Tensor for key {key} does not match the batch size {batch_size}.")
+            try:
+                buffers[offset:offset + batch_size].copy_(tensors.detach() if tensors.requires_grad else tensors)
+            except RuntimeError as e:
+                raise BatchStateError(f"Error copying the tensor for key {key} into the aggregation buffer.") from e
+
+    def _grow(self, min_capacity: int):
+        capacity = max(2 * self._capacity, min_capacity)
+
+        def grow(buffer: torch.Tensor) -> torch.Tensor:
+            grown_buffer = torch.empty((capacity,) + tuple(buffer.shape[1:]), dtype=buffer.dtype, device=buffer.device)
+            grown_buffer[:self._num_samples].copy_(buffer[:self._num_samples])
+            return grown_buffer
+
+        self._targets, self._predictions = TorchDeviceMixin.traverse_apply([self._targets, self._predictions], grow)
+        if self._tags is not None:
+            self._tags = grow(self._tags)
+        self._capacity = capacity
+
+    def add(self, batch: InferenceResultBatch):
+        predictions = batch.flat_predictions
+        tensors = batch.targets if batch.targets else predictions
+        batch_size = Batch._get_first_tensor(tensors).shape[0] if tensors else len(batch.tags)
+        if self._targets is None:
+            self._targets = self._allocate(batch.targets, self._capacity)
+            self._predictions = self._allocate(predictions, self._capacity)
+            # tags are only aggregated if the batches are tagged (the collators may leave them empty)
+            if batch.tags is not None and len(batch.tags) == batch_size:
+                self._tags = self._allocate(batch.tags, self._capacity)
+        if self._num_samples + batch_size > self._capacity:
+            self._grow(self._num_samples + batch_size)
+        InferenceResultBatchAggregator._write(self._targets, batch.targets, self._num_samples, batch_size)
+        InferenceResultBatchAggregator._write(self._predictions, predictions, self._num_samples, batch_size)
+        if self._tags is not None:
+            InferenceResultBatchAggregator._write(self._tags, batch.tags, self._num_samples, batch_size, "tags")
+        self._num_samples += batch_size
+
+    def get_result(self) -> InferenceResultBatch:
+        if self._targets is None:
+            raise BatchStateError("No inference result batches were added to the aggregator.")
+
+        def truncate(buffer: torch.Tensor) -> torch.Tensor:
+            return buffer[:self._num_samples]
+
+        tags = truncate(self._tags) if self._tags is not None else torch.Tensor()
+        return InferenceResultBatch.from_flat_predictions(TorchDeviceMixin.traverse_apply(self._predictions, truncate),
+                                                          targets=TorchDeviceMixin.traverse_apply(self._targets, truncate), tags=tags)
 
 
 class EvaluationBatchResult(Batch):
     """Data class for storing the results of a single or multiple batches. Also entire epoch results are stored in here.
     """
 
+    __slots__ = ("_losses", "_metrics", "_dataset_name", "_split_name")
+
     def __init__(self, losses: Dict[str, List[float]], metrics: Dict[str, List[float]], dataset_name: str,
                  split_name: str):
         self._losses = losses
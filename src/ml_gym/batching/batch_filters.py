@@ -1,18 +1,41 @@
 from ml_gym.batching.batch import InferenceResultBatch
-from typing import List, Callable
+from typing import Any, Callable, List
 from functools import partial
+import torch
 
 
 class BatchFilter:
+    """Sample selection functions map an `InferenceResultBatch` to a boolean mask or to an index tensor, which is on the
+    device of the batch, such that selecting the samples requires no host synchronization. Selections of user supplied
+    functions that return lists or arrays are converted by `to_selection_tensor`.
+    """
 
     @staticmethod
     def _class_filter_selection_fun(inference_batch_result: InferenceResultBatch, selected_class: int,
-                                    target_subscription_key: str) -> List[bool]:
-        return (inference_batch_result.targets[target_subscription_key] == selected_class).tolist()
+                                    target_subscription_key: str) -> torch.Tensor:
+        # the mask stays on the device of the targets
+        return inference_batch_result.targets[target_subscription_key] == selected_class
 
     @staticmethod
-    def get_class_selection_fun(target_subscription_key: str, selected_class: int = None) -> Callable[[InferenceResultBatch], List[bool]]:
+    def get_class_selection_fun(target_subscription_key: str, selected_class: int = None) -> Callable[[InferenceResultBatch], torch.Tensor]:
         sample_selection_fun = partial(BatchFilter._class_filter_selection_fun,
                                        selected_class=selected_class,
                                        target_subscription_key=target_subscription_key)
         return sample_selection_fun
+
+    @staticmethod
+    def get_class_selection_masks(targets: torch.Tensor, selected_classes: List[int]) -> torch.Tensor:
+        """Returns the boolean masks of all `selected_classes` at once, with shape [num_classes, num_samples]."""
+        classes = torch.as_tensor(selected_classes, dtype=targets.dtype, device=targets.device)
+        return targets.flatten().unsqueeze(0) == classes.unsqueeze(1)
+
+    @staticmethod
+    def to_selection_tensor(selection: Any, device: torch.device) -> torch.Tensor:
+        """Compatibility shim for selection functions returning lists (or arrays) of booleans or indices. Boolean selections
+        are returned as `torch.bool` masks, empty and integer selections as `torch.long` indices."""
+        selection = torch.as_tensor(selection, device=device)
+        if selection.dtype == torch.bool:
+            return selection
+        if selection.numel() > 0 and (selection.is_floating_point() or selection.is_complex()):
+            raise ValueError(f"Sample selections must be boolean masks or indices, got a tensor of dtype {selection.dtype}.")
+        return selection.long()
@@ -0,0 +1,100 @@
+from typing import TYPE_CHECKING, Dict, List
+from ml_gym.data_handling.postprocessors.collator import Collator
+from ml_gym.data_handling.postprocessors.generic_collators import CollatorFactory
+
+if TYPE_CHECKING:
+    # the component factory imports the rewriter
+    from ml_gym.blueprints.component_factory import ComponentRepresentation
+
+
+class BatchPathRewriter:
+    """Rewrites the per sample label postprocessing components (MAPPED_LABELS_ITERATOR, ONE_HOT_ENCODED_TARGETS_ITERATOR) into
+    stages of the data collator, such that the labels are transformed once per batch instead of once per sample and epoch.
+
+    A component is only rewritten if this does not change the batches:
+        - all consumers of the component are data loaders subscribing to splits, the component is applied to
+        - the data loaders do not sample weighted (the weights are calculated from the untransformed labels otherwise)
+        - the collators of these data loaders are used by these data loaders only, are label preserving
+          (see `Collator.label_preserving`) and publish the targets under `target_publication_key`
+    """
+
+    rewritable_component_types = {"MAPPED_LABELS_ITERATOR", "ONE_HOT_ENCODED_TARGETS_ITERATOR"}
+
+    @staticmethod
+    def rewrite(component_representations: Dict[str, "ComponentRepresentation"]) -> Dict[str, "ComponentRepresentation"]:
+        # the rewritten components are kept, but are not part of the data path anymore
+        rewritten_names = set()
+        rewritten = True
+        while rewritten:
+            rewritten = False
+            # the components are rewritten from the data loader upstream, i.e., each stage is prepended to the collator stages
+            active_representations = {name: representation for name, representation in component_representations.items()
+                                      if name not in rewritten_names}
+            for representation in active_representations.values():
+                if BatchPathRewriter._is_rewritable(representation, active_representations):
+                    BatchPathRewriter._rewrite_component(representation, active_representations)
+                    rewritten_names.add(representation.name)
+                    rewritten = True
+                    break
+        return component_representations
+
+    @staticmethod
+    def _get_consumers(component_name: str, component_representations: Dict[str, "ComponentRepresentation"]) \
+            -> List["ComponentRepresentation"]:
+        return [representation for representation in component_representations.values()
+                if any(requirement.component_name == component_name for requirement in representation.requirements.values())]
+
+    @staticmethod
+    def _is_rewritable(representation: "ComponentRepresentation", component_representations: Dict[str, "ComponentRepresentation"]) -> bool:
+        if representation.component_type_key not in BatchPathRewriter.rewritable_component_types:
+            return False
+        if list(representation.requirements.keys()) != ["iterators"]:
+            return False
+        applicable_splits = representation.config.get("applicable_splits", [])
+        data_loaders = BatchPathRewriter._get_consumers(representation.name, component_representations)
+        if len(data_loaders) == 0:
+            return False
+        for data_loader in data_loaders:
+            if data_loader.component_type_key != "DATA_LOADER" or "data_collator" not in data_loader.requirements:
+                return False
+            iterators_requirement = data_loader.requirements["iterators"]
+            if iterators_requirement.component_name != representation.name or not iterators_requirement.subscription or \
+                    not set(iterators_requirement.subscription).issubset(applicable_splits):
+                return False
+            if data_loader.config.get("weigthed_sampling_split_name") is not None or \
+                    any(strategy.get("strategy") == "WEIGHTED_RANDOM" for strategy in data_loader.config.get("sampling_strategies", {}).values()):
+                return False
+            collator = component_representations.get(data_loader.requirements["data_collator"].component_name)
+            if collator is None or collator.component_type_key != "DATA_COLLATOR":
+                return False
+            collator_type = collator.config.get("collator_type")
+            if isinstance(collator_type, str):
+                collator_type = CollatorFactory.get_collator_type(collator_type)
+            if not (isinstance(collator_type, type) and issubclass(collator_type, Collator) and collator_type.label_preserving) or \
+                    "target_publication_key" not in collator.config.get("collator_params", {}):
+                return False
+            if any(consumer not in data_loaders for consumer in BatchPathRewriter._get_consumers(collator.name, component_representations)):
+                return False
+        return True
+
+    @staticmethod
+    def _get_stage_config(representation: "ComponentRepresentation", target_key: str) -> Dict:
+        if representation.component_type_key == "MAPPED_LABELS_ITERATOR":
+            return {"stage_type": "label_mapping", "mappings": representation.config.get("mappings", []), "target_keys": [target_key]}
+        else:
+            return {"stage_type": "one_hot_encoded_targets", "target_vector_size": representation.config.get("target_vector_size", 0),
+                    "target_keys": [target_key]}
+
+    @staticmethod
+    def _rewrite_component(representation: "ComponentRepresentation", component_representations: Dict[str, "ComponentRepresentation"]):
+        upstream_component_name = representation.requirements["iterators"].component_name
+        collator_names = []
+        for data_loader in BatchPathRewriter._get_consumers(representation.name, component_representations):
+            data_loader.requirements["iterators"].component_name = upstream_component_name
+            collator_name = data_loader.requirements["data_collator"].component_name
+            if collator_name not in collator_names:
+                collator_names.append(collator_name)
+        for collator_name in collator_names:
+            collator = component_representations[collator_name]
+            stage_config = BatchPathRewriter._get_stage_config(representation, collator.config["collator_params"]["target_publication_key"])
+            collator.config["batch_stages"] = [stage_config] + collator.config.get("batch_stages", [])
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from ml_gym.gym.jobs import GymJob
+from ml_gym.blueprints.component_factory import SharedComponents
+from ml_gym.gym.jobs import GymJob, MultiModelGymJob
 from typing import List, Type, Dict, Any
 from ml_gym.modes import RunMode
 from ml_gym.persistency.logging import MLgymStatusLoggerCollectionConstructable
@@ -30,13 +31,13 @@ class BluePrint(ABC):
         self.gs_api_client_constructable = gs_api_client_constructable
 
     @abstractmethod
-    def construct(self, device: torch.device = None) -> GymJob:
+    def construct(self, device: torch.device = None, shared_components: SharedComponents = None) -> GymJob:
         raise NotImplementedError
 
     @staticmethod
     @abstractmethod
     def construct_components(config: Dict, component_names: List[str], device: torch.device,
-                             external_injection: Dict[str, Any] = None) -> List[Any]:
+                             external_injection: Dict[str, Any] = None, shared_components: SharedComponents = None) -> List[Any]:
         return NotImplementedError
 
     @staticmethod
@@ -61,3 +62,71 @@ class BluePrint(ABC):
                                       logger_collection_constructable=logger_collection_constructable,
                                       gs_api_client_constructable=gs_api_client_constructable)
         return blue_print
+
+
+class MultiModelBluePrint(BluePrint):
+    """ Blueprint for a `MultiModelGymJob` that trains the models of several blueprints on a shared data pipeline.
+    The blueprints must have identical data pipeline configs, i.e., the DATA_LOADER components and all their requirements.
+    """
+    data_loader_component_type_key = "DATA_LOADER"
+
+    def __init__(self, blue_prints: List[BluePrint]):
+        data_pipeline_configs = [MultiModelBluePrint.get_data_pipeline_config(blue_print.config) for blue_print in blue_prints]
+        if any(data_pipeline_config != data_pipeline_configs[0] for data_pipeline_config in data_pipeline_configs):
+            raise ValueError("Blueprints of a multi model job must have identical data pipeline configs.")
+        first_blue_print = blue_prints[0]
+        super().__init__(run_mode=first_blue_print.run_mode,
+                         num_epochs=max(blue_print.num_epochs for blue_print in blue_prints),
+                         config={blue_print.experiment_id: blue_print.config for blue_print in blue_prints},
+                         grid_search_id=first_blue_print.grid_search_id,
+                         gs_api_client_constructable=first_blue_print.gs_api_client_constructable,
+                         experiment_id=",".join(str(blue_print.experiment_id) for blue_print in blue_prints),
+                         external_injection=first_blue_print.external_injection,
+                         logger_collection_constructable=first_blue_print.logger_collection_constructable,
+                         warm_start_epoch=first_blue_print.warm_start_epoch)
+        self.blue_prints = blue_prints
+
+    def construct(self, device: torch.device = None, shared_components: SharedComponents = None) -> MultiModelGymJob:
+        # the data pipeline is built by the first blueprint and the same components are passed to the others
+        if shared_components is None:
+            shared_components = SharedComponents(MultiModelBluePrint.get_data_pipeline_config(self.blue_prints[0].config).keys())
+        gym_jobs = [blue_print.construct(device, shared_components=shared_components) for blue_print in self.blue_prints]
+        return MultiModelGymJob(gym_jobs=gym_jobs)
+
+    @staticmethod
+    def construct_components(config: Dict, component_names: List[str], device: torch.device,
+                             external_injection: Dict[str, Any] = None, shared_components: SharedComponents = None) -> List[Any]:
+        raise NotImplementedError("Components are constructed by the wrapped blueprints.")
+
+    @staticmethod
+    def get_data_pipeline_config(config: Dict[str, Any]) -> Dict[str, Any]:
+        """ Returns the configs of the DATA_LOADER components and of all the components they require.
+        """
+        component_names = [name for name, component_config in config.items()
+                           if isinstance(component_config, dict)
+                           and component_config.get("component_type_key") == MultiModelBluePrint.data_loader_component_type_key]
+        data_pipeline_config = {}
+        while component_names:
+            component_name = component_names.pop()
+            if component_name in data_pipeline_config:
+                continue
+            data_pipeline_config[component_name] = config[component_name]
+            component_names.extend(requirement["component_name"] for requirement in config[component_name].get("requirements", []))
+        return data_pipeline_config
+
+    @staticmethod
+    def group_blue_prints(blue_prints: List[BluePrint], max_num_models: int) -> List["MultiModelBluePrint"]:
+        """ Groups the blueprints by their data pipeline configs such that each group trains up to `max_num_models` models.
+        """
+        groups: List[List[BluePrint]] = []
+        group_data_pipeline_configs: List[Dict[str, Any]] = []
+        for blue_print in blue_prints:
+            data_pipeline_config = MultiModelBluePrint.get_data_pipeline_config(blue_print.config)
+            for group, group_data_pipeline_config in zip(groups, group_data_pipeline_configs):
+                if len(group) < max_num_models and group_data_pipeline_config == data_pipeline_config:
+                    group.append(blue_print)
+                    break
+            else:
+                groups.append([blue_print])
+                group_data_pipeline_configs.append(data_pipeline_config)
+        return [MultiModelBluePrint(group) for group in groups]
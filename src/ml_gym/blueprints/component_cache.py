@@ -0,0 +1,153 @@
+import copy
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import FunctionType, ModuleType
+from typing import Any, Callable, Dict, List
+import numpy as np
+import torch
+from ml_gym.util.logger import ConsoleLogger, LogLevel
+
+
+@dataclass
+class ComponentCacheEntry:
+    component: Any
+    size_bytes: int
+    construction_seconds: float
+
+
+@dataclass
+class ComponentCacheStats:
+    num_hits: int = 0
+    num_misses: int = 0
+    saved_seconds: float = 0
+    size_bytes: int = 0
+    num_entries: int = 0
+
+
+class ComponentCache:
+    """Process wide cache of the data pipeline components, such that consecutive jobs run by the same process (e.g., a `Pool`
+    worker running several jobs) reuse the dataset repository, iterator and split components instead of building them again.
+    Only components of the `component_type_keys` are cached, the stateful components (e.g., models, optimizers, data loaders
+    and trainers) are always built fresh.
+
+    The entries are keyed by the hash of the config of the component and its requirements (see `SharedDatasetRegistry`).
+    Components whose pipeline config contains injectables are not cached and the constructables registered under the component
+    type keys must not differ between the jobs of a process. The cache is disabled until `configure` sets
+    `max_size_bytes`. If the entries exceed it, the least recently used entries are evicted. The entry sizes are estimated
+    from the tensors, arrays and objects reachable from the components. Data shared by several entries (e.g., the samples of
+    an iterator and of its splits) is counted per entry, so the estimate is an upper bound.
+    """
+
+    default_component_type_keys = {"DATASET_REPOSITORY", "DATASET_ITERATORS", "SPLITTED_DATASET_ITERATORS",
+                                   "COMBINED_DATASET_ITERATORS", "IN_MEMORY_DATASET_ITERATORS", "SHUFFLED_DATASET_ITERATORS",
+                                   "FILTERED_LABELS_ITERATOR", "ONE_HOT_ENCODED_TARGETS_ITERATOR", "ITERATOR_VIEW",
+                                   "MAPPED_LABELS_ITERATOR", "FEATURE_ENCODED_ITERATORS"}
+    max_size_bytes: int = 0
+    component_type_keys = default_component_type_keys
+    stats = ComponentCacheStats()
+    _entries: Dict[str, ComponentCacheEntry] = OrderedDict()
+    _logger = ConsoleLogger("logger_component_cache")
+
+    @staticmethod
+    def configure(max_size_bytes: int, component_type_keys: List[str] = None):
+        """Enables the cache (disables it for `max_size_bytes` 0). The entries of previous jobs are kept."""
+        ComponentCache.max_size_bytes = max_size_bytes
+        ComponentCache.component_type_keys = set(component_type_keys) if component_type_keys is not None \
+            else ComponentCache.default_component_type_keys
+        ComponentCache._evict()
+
+    @staticmethod
+    def clear():
+        ComponentCache._entries.clear()
+        ComponentCache.stats = ComponentCacheStats()
+
+    @staticmethod
+    def is_cacheable(component_type_key: str) -> bool:
+        return ComponentCache.max_size_bytes > 0 and component_type_key in ComponentCache.component_type_keys
+
+    @staticmethod
+    def get_size_bytes(component: Any) -> int:
+        """Estimates the memory held by the component, counting tensor storages and arrays shared within it once."""
+        size_bytes = 0
+        visited = set()
+        objs = [component]
+        while objs:
+            obj = objs.pop()
+            if id(obj) in visited or isinstance(obj, (type, ModuleType, FunctionType)):
+                continue
+            visited.add(id(obj))
+            if isinstance(obj, torch.Tensor):
+                storage = obj.untyped_storage()
+                if ("storage", storage.data_ptr()) not in visited:
+                    visited.add(("storage", storage.data_ptr()))
+                    size_bytes += storage.nbytes()
+            elif isinstance(obj, np.ndarray):
+                owner = obj
+                while isinstance(owner.base, np.ndarray):
+                    owner = owner.base
+                if ("array", id(owner)) not in visited:
+                    visited.add(("array", id(owner)))
+                    # arrays of buffers not owned by numpy (e.g., memory maps) are counted by their own size
+                    size_bytes += owner.nbytes if owner.base is None else obj.nbytes
+            else:
+                size_bytes += sys.getsizeof(obj)
+                if isinstance(obj, dict):
+                    objs.extend(obj.keys())
+                    objs.extend(obj.values())
+                elif isinstance(obj, (list, tuple, set, frozenset)):
+                    objs.extend(obj)
+                if hasattr(obj, "__dict__"):
+                    objs.append(vars(obj))
+                for slot in getattr(type(obj), "__slots__", ()):
+                    if isinstance(slot, str) and hasattr(obj, slot):
+                        objs.append(getattr(obj, slot))
+        return size_bytes
+
+    @staticmethod
+    def get(key: str, component_name: str) -> Any:
+        """Returns the cached component or None. Dicts of iterators are copied, so consumers may modify the returned dict."""
+        entry = ComponentCache._entries.get(key)
+        if entry is None:
+            ComponentCache.stats.num_misses += 1
+            return None
+        ComponentCache._entries.move_to_end(key)
+        ComponentCache.stats.num_hits += 1
+        ComponentCache.stats.saved_seconds += entry.construction_seconds
+        ComponentCache._logger.log(LogLevel.INFO, f"Component cache hit for component {component_name} ({key}), saved "
+                                                  f"{entry.construction_seconds:.2f} s "
+                                                  f"({ComponentCache.stats.saved_seconds:.2f} s in total).")
+        return copy.copy(entry.component) if isinstance(entry.component, dict) else entry.component
+
+    @staticmethod
+    def put(key: str, component_name: str, component: Any, construction_seconds: float):
+        size_bytes = ComponentCache.get_size_bytes(component)
+        if size_bytes > ComponentCache.max_size_bytes:
+            ComponentCache._logger.log(LogLevel.INFO, f"Component {component_name} ({size_bytes} bytes) exceeds the component "
+                                                      f"cache size of {ComponentCache.max_size_bytes} bytes and is not cached.")
+            return
+        component = copy.copy(component) if isinstance(component, dict) else component
+        ComponentCache._entries[key] = ComponentCacheEntry(component=component, size_bytes=size_bytes,
+                                                           construction_seconds=construction_seconds)
+        ComponentCache._entries.move_to_end(key)
+        ComponentCache._evict()
+
+    @staticmethod
+    def _evict():
+        size_bytes = sum(entry.size_bytes for entry in ComponentCache._entries.values())
+        while ComponentCache._entries and size_bytes > ComponentCache.max_size_bytes:
+            key, entry = ComponentCache._entries.popitem(last=False)
+            size_bytes -= entry.size_bytes
+            ComponentCache._logger.log(LogLevel.INFO, f"Evicted component cache entry {key} ({entry.size_bytes} bytes).")
+        ComponentCache.stats.size_bytes = size_bytes
+        ComponentCache.stats.num_entries = len(ComponentCache._entries)
+
+    @staticmethod
+    def get_or_construct(key: str, component_name: str, construct_fun: Callable[[], Any]) -> Any:
+        component = ComponentCache.get(key, component_name)
+        if component is None:
+            start = time.perf_counter()
+            component = construct_fun()
+            ComponentCache.put(key, component_name, component, time.perf_counter() - start)
+        return component
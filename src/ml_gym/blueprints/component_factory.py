@@ -1,5 +1,7 @@
 import copy
-from typing import Dict, Any, List, Type, Union
+import hashlib
+import json
+from typing import Callable, Dict, Any, List, Type, Union
 from collections import namedtuple
 from dataclasses import dataclass, field
 from ml_gym.error_handling.exception import ComponentConstructionError, InjectMappingNotFoundError, DependentComponentNotFoundError
@@ -10,7 +12,12 @@ from ml_gym.blueprints.constructables import ComponentConstructable, DatasetIter
     FilteredLabelsIteratorConstructable, FeatureEncodedIteratorConstructable, CombinedDatasetIteratorConstructable, \
     DataCollatorConstructable, PredictionPostProcessingRegistryConstructable, TrainComponentConstructable, EvalComponentConstructable, \
     IteratorViewConstructable, OneHotEncodedTargetsIteratorConstructable, InMemoryDatasetIteratorConstructable, \
-    ShuffledDatasetIteratorConstructable, CheckpointingStrategyConstructable, CheckpointingRegistryConstructable
+    ShuffledDatasetIteratorConstructable, CheckpointingStrategyConstructable, CheckpointingRegistryConstructable, \
+    StreamingDatasetIteratorConstructable
+from ml_gym.blueprints.batch_path_rewriter import BatchPathRewriter
+from ml_gym.blueprints.component_cache import ComponentCache
+from ml_gym.data_handling.shared_datasets import SharedDatasetRegistry
+from ml_gym.data_handling.iterator_cache import IteratorCache
 # from ml_gym.util.logger import LogLevel, ConsoleLogger
 
 
@@ -74,6 +81,25 @@ class RequirementRepresentation:
     subscription: List[int]
 
 
+class SharedComponents:
+    """ Components shared by the component factories of several blueprints, e.g., the data pipeline of a `MultiModelBluePrint`.
+    Each of the `component_names` is built by the first factory and the same instance is returned to the later factories.
+    Therefore, the configs of the shared components (and of their requirements) must be identical for all the blueprints.
+    """
+
+    def __init__(self, component_names: List[str]):
+        self.component_names = set(component_names)
+        self.components: Dict[str, Any] = {}
+
+    def is_shared(self, component_name: str) -> bool:
+        return component_name in self.component_names
+
+    def get_or_construct(self, component_name: str, construct_fun: Callable[[], Any]) -> Any:
+        if component_name not in self.components:
+            self.components[component_name] = construct_fun()
+        return self.components[component_name]
+
+
 class ComponentFactory:
     """
     The component factory builds the machine learning components like dataset iterators, dataset splitters, models, trainers etc.
@@ -102,8 +128,14 @@ class ComponentFactory:
         def register_variant(self, variant_key: str, component_constructable_type: Type[ComponentConstructable]):
             self.constructables[variant_key] = component_constructable_type
 
-    def __init__(self, injector: Injector = None):
+    def __init__(self, injector: Injector = None, rewrite_batch_path: bool = True, iterator_cache: IteratorCache = None,
+                 shared_components: SharedComponents = None):
         self.injector = injector
+        self.rewrite_batch_path = rewrite_batch_path
+        # if set, the outermost iterator producing components of the data pipeline are persisted and loaded by later runs
+        self.iterator_cache = iterator_cache
+        # if set, the shared components are built once and reused by the factories of the other blueprints
+        self.shared_components = shared_components
         ComponentVariant = namedtuple('ComponentVariant', ['component_key',
                                                            'variant_key',
                                                            'component_constructable_type'])
@@ -114,6 +146,7 @@ class ComponentFactory:
             ComponentVariant("SPLITTED_DATASET_ITERATORS", "RANDOM", DatasetIteratorSplitsConstructable),
             ComponentVariant("COMBINED_DATASET_ITERATORS", "DEFAULT", CombinedDatasetIteratorConstructable),
             ComponentVariant("IN_MEMORY_DATASET_ITERATORS", "DEFAULT", InMemoryDatasetIteratorConstructable),
+            ComponentVariant("STREAMING_DATASET_ITERATORS", "DEFAULT", StreamingDatasetIteratorConstructable),
             ComponentVariant("SHUFFLED_DATASET_ITERATORS", "DEFAULT", ShuffledDatasetIteratorConstructable),
             ComponentVariant("FILTERED_LABELS_ITERATOR", "DEFAULT", FilteredLabelsIteratorConstructable),
             ComponentVariant("ONE_HOT_ENCODED_TARGETS_ITERATOR", "DEFAULT", OneHotEncodedTargetsIteratorConstructable),
@@ -185,8 +218,45 @@ class ComponentFactory:
         for component_name, component_dict in component_config.items():
             component_representation = create_component_representation(component_config=component_dict, component_name=component_name)
             component_representations[component_representation.name] = component_representation
+        if self.rewrite_batch_path:
+            component_representations = BatchPathRewriter.rewrite(component_representations)
         return component_representations
 
+    def _get_iterator_cache_keys(self, component_config: Dict, component_representation_graph: Dict[str, ComponentRepresentation]) \
+            -> Dict[str, str]:
+        """Returns the iterator cache keys of the components of the iterator cache's component types that are required by at
+        least one component of another type. The components are determined from the (batch path rewritten) dependency graph,
+        such that the iterators actually consumed by the data loaders are cached, and keyed by the representations of their
+        pipeline. Components whose pipeline config contains injectables are skipped (see `SharedDatasetRegistry`).
+        """
+        component_type_keys = self.iterator_cache.component_type_keys
+        outermost_names = set()
+        for representation in component_representation_graph.values():
+            if representation.component_type_key in component_type_keys:
+                continue
+            for requirement in representation.requirements.values():
+                required_representation = component_representation_graph.get(requirement.component_name)
+                if required_representation is not None and required_representation.component_type_key in component_type_keys:
+                    outermost_names.add(requirement.component_name)
+
+        cache_keys = {}
+        for component_name in outermost_names:
+            pipeline = {}
+            component_names = [component_name]
+            while component_names:
+                name = component_names.pop()
+                if name not in pipeline:
+                    representation = component_representation_graph[name]
+                    pipeline[name] = [representation.component_type_key, representation.variant_key, representation.config,
+                                      {requirement_name: [requirement.component_name, requirement.subscription]
+                                       for requirement_name, requirement in representation.requirements.items()}]
+                    component_names.extend(requirement.component_name for requirement in representation.requirements.values())
+            if SharedDatasetRegistry.has_injectables([component_config[name] for name in pipeline]):
+                continue
+            serialized_pipeline = json.dumps([component_name, pipeline], sort_keys=True, default=str)
+            cache_keys[component_name] = hashlib.sha1(serialized_pipeline.encode("utf-8")).hexdigest()
+        return cache_keys
+
     def build_components_from_config(self, component_config: Dict, names_of_components_to_construct: List[str]) -> Dict:
         """Builds the components and returns a mapping from component name to component.
         Note, that dependencies are always rebuilt and not reused!
@@ -197,12 +267,45 @@ class ComponentFactory:
         Returns:
             Dict: Component dictionary (component name -> Component)
         """
+        def get_component_key(component_name: str) -> str:
+            # components configured via injectables are not identified by their config, as the injected values differ
+            pipeline_config = SharedDatasetRegistry.get_pipeline_config(component_config, component_name)
+            if SharedDatasetRegistry.has_injectables(pipeline_config):
+                return None
+            return SharedDatasetRegistry.get_component_key(component_config, component_name)
+
         def build_component(component_name: str, component_representation_graph: Dict[str, ComponentRepresentation], components: Dict[str, Any]):
             try:
                 component_representation = component_representation_graph[component_name]
             except ValueError as e:
                 raise DependentComponentNotFoundError(f"Could not find component {component_name}.") from e
 
+            # datasets materialized by the parent process are attached to instead of being built (see `SharedDatasetStore`)
+            shared_component = SharedDatasetRegistry.attach(component_config, component_name)
+            if shared_component is not None:
+                return shared_component
+
+            # components shared by the blueprints of a multi model job are built once (see `SharedComponents`)
+            if self.shared_components is not None and self.shared_components.is_shared(component_name):
+                return self.shared_components.get_or_construct(component_name,
+                                                               lambda: construct_component(component_name, component_representation_graph))
+
+            # data pipeline components built by previous jobs of this process are reused (see `ComponentCache`)
+            component_key = get_component_key(component_name) \
+                if ComponentCache.is_cacheable(component_representation.component_type_key) else None
+            if component_key is not None:
+                return ComponentCache.get_or_construct(component_key, component_name,
+                                                       lambda: construct_component(component_name, component_representation_graph))
+            return construct_component(component_name, component_representation_graph)
+
+        def construct_component(component_name: str, component_representation_graph: Dict[str, ComponentRepresentation]):
+            component_representation = component_representation_graph[component_name]
+            cache_key = iterator_cache_keys.get(component_name)
+            if cache_key is not None:
+                cached_component = self.iterator_cache.load(cache_key, component_name)
+                if cached_component is not None:
+                    return cached_component
+
             # build the requirements
             try:
                 requirement_components = {name: build_component(requirement.component_name, component_representation_graph, {})
@@ -211,7 +314,8 @@ class ComponentFactory:
                 raise ComponentConstructionError(f"Error building requirements for component {component_name}.") from dcnf_error
 
             # collect the requirements
-            requirements = {name: Requirement(requirement_components[name], requirement.subscription)
+            requirements = {name: Requirement(requirement_components[name], requirement.subscription,
+                                              get_component_key(requirement.component_name))
                             for name, requirement in component_representation.requirements.items()}
             # build the requested component
             component_variants_registry = self.component_factory_registry[component_representation.component_type_key]
@@ -219,10 +323,14 @@ class ComponentFactory:
                 component = component_variants_registry.construct(component_representation.variant_key, component_representation.name, component_representation.config, requirements)
             except ComponentConstructionError as cc_error:
                 raise ComponentConstructionError(f"Error constructing {component_representation}") from cc_error
+            if cache_key is not None:
+                self.iterator_cache.store(cache_key, component)
             return component
 
         # calculate the dependency graph of components
         component_representation_graph = self._calc_dependency_graph(component_config)
+        iterator_cache_keys = {} if self.iterator_cache is None else \
+            self._get_iterator_cache_keys(component_config, component_representation_graph)
         # build each component
         components: Dict[str, Any] = {}  # maps
         components = {component_name: build_component(component_name, component_representation_graph, {})
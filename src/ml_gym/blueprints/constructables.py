@@ -21,6 +21,12 @@ from ml_gym.metrics.metric_factory import MetricFactory
 from ml_gym.gym.evaluator import Evaluator, EvalComponent
 from ml_gym.data_handling.postprocessors.factory import ModelGymInformedIteratorFactory
 from ml_gym.data_handling.postprocessors.collator import Collator
+from ml_gym.data_handling.postprocessors.collator_stages import StagedCollator, CollatorStageFactory
+from ml_gym.data_handling.postprocessors.generic_collators import CollatorFactory
+from ml_gym.data_handling.label_index import LabelIndexFactory
+from ml_gym.data_handling.eval_batch_cache import EvalBatchCache
+from ml_gym.data_handling.streaming import ShardedIterableDataset
+from ml_gym.data_handling.postprocessors.fit_cache import FitCache
 from ml_gym.gym.post_processing import PredictPostProcessingIF, SoftmaxPostProcessorImpl, \
     ArgmaxPostProcessorImpl, SigmoidalPostProcessorImpl, DummyPostProcessorImpl, PredictPostProcessing, \
     BinarizationPostProcessorImpl, MaxOrMinPostProcessorImpl
@@ -29,6 +35,7 @@ from data_stack.dataset.iterator import InformedDatasetIteratorIF
 from functools import partial
 from ml_gym.loss_functions.loss_factory import LossFactory
 import warnings
+import os
 from ml_gym.checkpointing.checkpoint_factory import CheckpointingStrategyFactory
 from ml_gym.checkpointing.checkpointing import CheckpointingIF
 
@@ -37,6 +44,8 @@ from ml_gym.checkpointing.checkpointing import CheckpointingIF
 class Requirement:
     components: Union[Dict, List, Any] = None
     subscription: List[Union[str, int]] = field(default_factory=list)
+    # hash of the configs of the required component and its requirements, set by the ComponentFactory
+    component_key: str = None
 
     def get_subscription(self) -> Union[Dict, List, Any]:
         if not self.subscription:
@@ -91,6 +100,7 @@ class DatasetRepositoryConstructable(ComponentConstructable):
 class DatasetIteratorConstructable(ComponentConstructable):
     dataset_identifier: str = ""
     split_configs: Dict[str, Any] = field(default_factory=dict)
+    label_index_folder: str = None  # if set, the target and tag indices are persisted in this folder, e.g., the dataset storage path
 
     def _construct_impl(self) -> Dict[str, InformedDatasetIteratorIF]:
         dataset_repository = self.get_requirement("repository")
@@ -103,6 +113,10 @@ class DatasetIteratorConstructable(ComponentConstructable):
                                                         dataset_tag=split_name,
                                                         iterator_meta=iterator_meta)
             dataset_dict[split_name] = ModelGymInformedIteratorFactory.get_dataset_iterator(iterator, dataset_meta)
+            if self.label_index_folder is not None:
+                for label_pos in {iterator_meta.target_pos, iterator_meta.tag_pos}:
+                    path = os.path.join(self.label_index_folder, self.dataset_identifier, f"{split_name}_label_index_{label_pos}.npy")
+                    LabelIndexFactory.get_persisted_label_index(iterator, label_pos, path)
         return dataset_dict
 
 
@@ -131,6 +145,29 @@ class CombinedDatasetIteratorConstructable(ComponentConstructable):
         return combined_iterators_dict
 
 
+@dataclass
+class StreamingDatasetIteratorConstructable(ComponentConstructable):
+    dataset_identifier: str = ""
+    # maps split names to the shard file pattern and the streaming options, e.g.,
+    # {"train": {"shard_pattern": "/data/train/*.npz", "shuffle": True, "shuffle_buffer_size": 10000, "seed": 1}}
+    split_configs: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    columns: List[str] = field(default_factory=lambda: ["samples", "targets", "tags"])
+    sample_pos: int = 0
+    target_pos: int = 1
+    tag_pos: int = 2
+
+    def _construct_impl(self) -> Dict[str, ShardedIterableDataset]:
+        iterator_meta = MetaFactory.get_iterator_meta(sample_pos=self.sample_pos, target_pos=self.target_pos, tag_pos=self.tag_pos)
+        dataset_dict = {}
+        for split_name, split_config in self.split_configs.items():
+            dataset_meta = MetaFactory.get_dataset_meta(identifier=self.component_identifier,
+                                                        dataset_name=self.dataset_identifier,
+                                                        dataset_tag=split_name,
+                                                        iterator_meta=iterator_meta)
+            dataset_dict[split_name] = ShardedIterableDataset.from_pattern(dataset_meta=dataset_meta, columns=self.columns, **split_config)
+        return dataset_dict
+
+
 @dataclass
 class InMemoryDatasetIteratorConstructable(ComponentConstructable):
 
@@ -201,11 +238,19 @@ class MappedLabelsIteratorConstructable(ComponentConstructable):
 class FeatureEncodedIteratorConstructable(ComponentConstructable):
     applicable_splits: List[str] = field(default_factory=list)
     feature_encoding_configs: Dict = field(default_factory=Dict)
+    materialize: bool = False  # encodes each split once instead of per sample access
+    memmap_folder: str = None
+    fit_cache_folder: str = None  # if set, the fitted encoders are shared with other jobs via this folder
 
     def _construct_impl(self) -> Dict[str, DatasetIteratorIF]:
         dataset_iterators_dict = self.get_requirement("iterators")
+        fit_cache = FitCache(self.fit_cache_folder) if self.fit_cache_folder is not None else None
+        iterators_requirement = self.requirements["iterators"]
+        iterators_key = None if iterators_requirement.component_key is None else \
+            FitCache.get_key(iterators_requirement.component_key, iterators_requirement.subscription)
         feature_encoded_iterators = ModelGymInformedIteratorFactory.get_feature_encoded_iterators(
-            self.component_identifier, dataset_iterators_dict, self.feature_encoding_configs)
+            self.component_identifier, dataset_iterators_dict, self.feature_encoding_configs, self.materialize, self.memmap_folder,
+            fit_cache, iterators_key)
         return {name: iterator for name, iterator in feature_encoded_iterators.items() if name in self.applicable_splits}
 
 
@@ -224,10 +269,15 @@ class OneHotEncodedTargetsIteratorConstructable(ComponentConstructable):
 @dataclass
 class DataCollatorConstructable(ComponentConstructable):
     collator_params: Dict = field(default_factory=Dict)
-    collator_type: Type[Collator] = None
+    collator_type: Union[Type[Collator], str] = None  # a collator class or the layout of a generic collator, e.g., "tensor"
+    batch_stages: List[Dict] = field(default_factory=list)
 
     def _construct_impl(self) -> Callable:
-        return self.collator_type(**self.collator_params)
+        collator_type = CollatorFactory.get_collator_type(self.collator_type) if isinstance(self.collator_type, str) else self.collator_type
+        collator = collator_type(**self.collator_params)
+        if self.batch_stages:
+            return StagedCollator(collator, [CollatorStageFactory.get_stage(**stage_config) for stage_config in self.batch_stages])
+        return collator
 
 
 @dataclass
@@ -256,6 +306,11 @@ class DataLoadersConstructable(ComponentConstructable):
     batch_size: int = 1
     sampling_strategies: Dict[str, Any] = field(default_factory=dict)
     drop_last: bool = False
+    num_workers: int = 0
+    prefetch_factor: int = None
+    persistent_workers: bool = False
+    pin_memory: bool = False
+    seed: int = None  # seeds the worker processes
 
     def _construct_impl(self) -> DatasetLoader:
         dataset_iterators_dict = self.get_requirement("iterators")
@@ -264,16 +319,25 @@ class DataLoadersConstructable(ComponentConstructable):
                                                               batch_size=self.batch_size,
                                                               collate_fn=collator,
                                                               sampling_strategies=self.sampling_strategies,
-                                                              drop_last=self.drop_last)
+                                                              drop_last=self.drop_last,
+                                                              num_workers=self.num_workers,
+                                                              prefetch_factor=self.prefetch_factor,
+                                                              persistent_workers=self.persistent_workers,
+                                                              pin_memory=self.pin_memory,
+                                                              seed=self.seed)
 
 
 @dataclass
 class OptimizerConstructable(ComponentConstructable):
     optimizer_key: str = ""
     params: Dict[str, Any] = field(default_factory=dict)
+    # FP32, BF16 or BLOCKWISE_8BIT. BLOCKWISE_8BIT stores float8 codes and thus requires torch>=2.1.
+    # BF16 halves and BLOCKWISE_8BIT quarters the state memory, but the state is decoded and re-encoded param by param on
+    # every step, which adds noticeably to the step time (most for BLOCKWISE_8BIT).
+    state_precision: str = "FP32"
 
     def _construct_impl(self) -> OptimizerAdapter:
-        return OptimizerFactory.get_optimizer(self.optimizer_key, self.params)
+        return OptimizerFactory.get_optimizer(self.optimizer_key, self.params, self.state_precision)
 
 
 @dataclass
@@ -281,7 +345,7 @@ class OptimizerBundleConstructable(ComponentConstructable):
 
     optimizers_config: Dict[str, Any] = field(default_factory=list)
     # {
-    #     "o_1": {"optimizer_key": "ADAM", "params": {"lr": 1, "momentum": 0.9}},
+    #     "o_1": {"optimizer_key": "ADAM", "params": {"lr": 1, "momentum": 0.9}, "state_precision": "BF16"},
     #     "o_2": {"optimizer_key": "SGD", "params": {"lr": 2, "momentum": 0.8}}
     # }
 
@@ -467,6 +531,8 @@ class EvalComponentConstructable(ComponentConstructable):
     cpu_prediction_subscription_keys: List[str] = field(default_factory=list)
     metrics_computation_config: List[Dict] = None
     loss_computation_config: List[Dict] = None
+    # e.g., {"location": "pinned", "max_size_bytes": 2**30}, see EvalBatchCache
+    eval_batch_cache_config: Dict = None
 
     def _construct_impl(self) -> Evaluator:
         dataset_loaders: Dict[str, DatasetLoader] = self.get_requirement("data_loaders")
@@ -491,9 +557,10 @@ class EvalComponentConstructable(ComponentConstructable):
                     postprocessors_dict["default"].append(PredictPostProcessing(prediction_post_processing_registry.get_instance(**config)))
 
         inference_component = InferenceComponent(no_grad=True)
+        eval_batch_cache = EvalBatchCache(**self.eval_batch_cache_config) if self.eval_batch_cache_config is not None else None
         eval_component = EvalComponent(inference_component, postprocessors_dict, metric_funs, loss_funs, dataset_loaders, self.train_split_name,
                                        self.show_progress, self.cpu_target_subscription_keys, self.cpu_prediction_subscription_keys,
-                                       self.metrics_computation_config, self.loss_computation_config)
+                                       self.metrics_computation_config, self.loss_computation_config, eval_batch_cache)
         return eval_component
 
 
@@ -0,0 +1,124 @@
+import weakref
+from typing import Any, Dict, Iterator, List
+import numpy as np
+import torch
+from torch.utils.data.sampler import BatchSampler
+from data_stack.dataset.iterator import DatasetIteratorIF, InformedDatasetIterator, SequenceDatasetIterator, DatasetIteratorView, \
+    CombinedDatasetIterator, InMemoryDatasetIterator
+
+
+class SampleLengthIndexFactory:
+    """Provides the lengths of the values at position `length_pos` (i.e., the size of the first dimension, typically the
+    number of tokens or nodes of a sample) of all samples of an iterator as a numpy array. As for the `LabelIndexFactory`, the index
+    is built once per iterator and derived from the underlying iterators for views and combined iterators.
+    Postprocessed iterators are scanned, as postprocessors may change the sample lengths.
+    """
+
+    _length_indices: "weakref.WeakKeyDictionary[DatasetIteratorIF, Dict[int, np.ndarray]]" = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def get_length_index(iterator: DatasetIteratorIF, length_pos: int = 0) -> np.ndarray:
+        iterator_indices = SampleLengthIndexFactory._length_indices.setdefault(iterator, {})
+        if length_pos not in iterator_indices:
+            iterator_indices[length_pos] = SampleLengthIndexFactory._build_length_index(iterator, length_pos)
+        return iterator_indices[length_pos]
+
+    @staticmethod
+    def _build_length_index(iterator: DatasetIteratorIF, length_pos: int) -> np.ndarray:
+        if isinstance(iterator, InformedDatasetIterator):
+            return SampleLengthIndexFactory.get_length_index(iterator._dataset_iterator, length_pos)
+        elif isinstance(iterator, DatasetIteratorView):
+            underlying_index = SampleLengthIndexFactory.get_length_index(iterator.underlying_iterators[0], length_pos)
+            return underlying_index[np.asarray(iterator.indices, dtype=np.int64)]
+        elif isinstance(iterator, CombinedDatasetIterator) and len(iterator.underlying_iterators) > 0:
+            return np.concatenate([SampleLengthIndexFactory.get_length_index(underlying, length_pos)
+                                   for underlying in iterator.underlying_iterators])
+        elif isinstance(iterator, SequenceDatasetIterator):
+            # only the sequence at `length_pos` is read, the other sequences of the samples are not touched
+            return SampleLengthIndexFactory._to_length_array(iterator._dataset_sequences[length_pos])
+        elif isinstance(iterator, InMemoryDatasetIterator):
+            return SampleLengthIndexFactory._to_length_array([sample[length_pos] for sample in iterator._samples])
+        return SampleLengthIndexFactory._to_length_array([iterator[i][length_pos] for i in range(len(iterator))])
+
+    @staticmethod
+    def _to_length_array(values: Any) -> np.ndarray:
+        def get_length(value: Any) -> int:
+            if isinstance(value, (torch.Tensor, np.ndarray)):
+                return value.shape[0] if value.ndim > 0 else 1
+            return len(value)
+
+        if isinstance(values, (torch.Tensor, np.ndarray)):
+            # a stacked tensor has samples of equal length
+            return np.full(len(values), values.shape[1] if values.ndim > 1 else 1, dtype=np.int64)
+        return np.fromiter((get_length(value) for value in values), dtype=np.int64, count=len(values))
+
+
+class BucketingBatchSampler(BatchSampler):
+    """Groups samples of similar length into batches, such that the collator pads less. Each epoch, the samples are shuffled and
+    split into buckets of `batch_size * bucket_size_multiplier` samples. Each bucket is sorted by length and split into batches,
+    and the batch order is shuffled.
+
+    If `max_tokens` is set, the batch size varies instead, such that the padded volume (batch size times the longest sample)
+    of each batch stays within `max_tokens`. Samples longer than `max_tokens` form a batch of their own.
+
+    `padding_ratio` is the share of padding within the padded volume of the batches of the latest epoch.
+    """
+
+    def __init__(self, lengths: np.ndarray, batch_size: int, drop_last: bool = False, bucket_size_multiplier: int = 100,
+                 max_tokens: int = None, seed: int = None):
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.batch_size = batch_size
+        self.drop_last = drop_last
+        self.bucket_size_multiplier = bucket_size_multiplier
+        self.max_tokens = max_tokens
+        self.generator = torch.Generator().manual_seed(seed) if seed is not None else torch.Generator()
+        self.padding_ratio: float = None
+        # the batches of the next epoch are drawn in advance when the number of batches is requested
+        self._next_batches: List[List[int]] = None
+
+    def _split_bucket(self, bucket: np.ndarray) -> List[np.ndarray]:
+        if self.max_tokens is None:
+            batches = [bucket[i:i + self.batch_size] for i in range(0, len(bucket), self.batch_size)]
+            if self.drop_last and len(batches) > 0 and len(batches[-1]) < self.batch_size:
+                batches = batches[:-1]
+            return batches
+        # the bucket is sorted, so the longest sample of a batch is its latest one
+        batches = []
+        start = 0
+        for end in range(1, len(bucket) + 1):
+            if end - start > 1 and (end - start) * self.lengths[bucket[end - 1]] > self.max_tokens:
+                batches.append(bucket[start:end - 1])
+                start = end - 1
+        if start < len(bucket):
+            batches.append(bucket[start:])
+        return batches
+
+    def _draw_batches(self) -> List[List[int]]:
+        permutation = torch.randperm(len(self.lengths), generator=self.generator).numpy()
+        bucket_size = self.batch_size * self.bucket_size_multiplier
+        batches = []
+        for start in range(0, len(permutation), bucket_size):
+            bucket = permutation[start:start + bucket_size]
+            bucket = bucket[np.argsort(self.lengths[bucket], kind="stable")]
+            batches.extend(self._split_bucket(bucket))
+        batch_order = torch.randperm(len(batches), generator=self.generator).tolist()
+        return [batches[i].tolist() for i in batch_order]
+
+    def _calc_padding_ratio(self, batches: List[List[int]]) -> float:
+        padded_volume = sum(len(batch) * self.lengths[batch].max() for batch in batches if len(batch) > 0)
+        sample_volume = sum(self.lengths[batch].sum() for batch in batches)
+        return float(1 - sample_volume / padded_volume) if padded_volume > 0 else 0.
+
+    def __iter__(self) -> Iterator[List[int]]:
+        batches = self._next_batches if self._next_batches is not None else self._draw_batches()
+        self._next_batches = None
+        self.padding_ratio = self._calc_padding_ratio(batches)
+        yield from batches
+
+    def __len__(self) -> int:
+        if self.max_tokens is None:
+            num_full_batches = len(self.lengths) // self.batch_size
+            return num_full_batches if self.drop_last or len(self.lengths) % self.batch_size == 0 else num_full_batches + 1
+        if self._next_batches is None:
+            self._next_batches = self._draw_batches()
+        return len(self._next_batches)
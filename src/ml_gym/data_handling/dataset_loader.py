@@ -1,12 +1,19 @@
 from ml_gym.error_handling.exception import SamplerNotFoundError
 from torch.utils.data import DataLoader
-from torch.utils.data.sampler import RandomSampler, WeightedRandomSampler, Sampler, SequentialSampler
-from typing import Callable, Dict, Any
-from data_stack.dataset.iterator import InformedDatasetIteratorIF
-from collections import Counter
+from torch.utils.data.sampler import RandomSampler, WeightedRandomSampler, Sampler, SequentialSampler, BatchSampler
+from typing import Callable, Dict, Any, Iterator, List, Tuple
+from data_stack.dataset.iterator import InformedDatasetIteratorIF, InformedDatasetIterator
 import torch
 from ml_gym.data_handling.postprocessors.collator import Collator
+from ml_gym.data_handling.label_index import LabelIndexFactory
+from ml_gym.data_handling.bucketing import SampleLengthIndexFactory, BucketingBatchSampler
+from ml_gym.data_handling.iterators import BatchedInformedDatasetIterator
+from ml_gym.data_handling.streaming import ShardedIterableDataset
+from contextlib import contextmanager
 from enum import Enum
+import numpy as np
+import pickle
+import random
 
 
 class DatasetLoaderFactory:
@@ -34,19 +41,29 @@ class DatasetLoaderFactory:
 
     @staticmethod
     def get_splitted_data_loaders(dataset_splits: Dict[str, InformedDatasetIteratorIF], batch_size: int, collate_fn: Callable = None,
-                                  drop_last: bool = False, sampling_strategies: Dict[str, Any] = None) -> Dict[str, "DatasetLoader"]:
+                                  drop_last: bool = False, sampling_strategies: Dict[str, Any] = None, num_workers: int = 0,
+                                  prefetch_factor: int = None, persistent_workers: bool = False, pin_memory: bool = False,
+                                  seed: int = None) -> Dict[str, "DatasetLoader"]:
+        sampling_strategies = {} if sampling_strategies is None else sampling_strategies
         data_loaders = {}
         for split_name, dataset_split in dataset_splits.items():
-            if split_name in sampling_strategies:
-                config = sampling_strategies[split_name]
-                strategy = SamplerFactory.SamplingStrategies[sampling_strategies[split_name]["strategy"]]
-                config.pop("strategy")
+            if isinstance(dataset_split, ShardedIterableDataset):
+                # streaming datasets determine the sample order themselves
+                if split_name in sampling_strategies:
+                    raise SamplerNotFoundError(f"Split {split_name} is streamed and does not support sampling strategies. "
+                                               "Configure the shuffling of the streaming dataset instead.")
+                sampler = None
+            elif split_name in sampling_strategies:
+                config = dict(sampling_strategies[split_name])
+                strategy = SamplerFactory.SamplingStrategies[config.pop("strategy")]
                 if strategy == SamplerFactory.SamplingStrategies.WEIGHTED_RANDOM:
                     sampler = SamplerFactory.get_weighted_sampler(dataset_split, **config)
                 elif strategy == SamplerFactory.SamplingStrategies.RANDOM:
                     sampler = SamplerFactory.get_random_sampler(dataset_split, **config)
                 elif strategy == SamplerFactory.SamplingStrategies.IN_ORDER:
                     sampler = SamplerFactory.get_sequential_sampler(dataset_split)
+                elif strategy == SamplerFactory.SamplingStrategies.BUCKETING:
+                    sampler = SamplerFactory.get_bucketing_batch_sampler(dataset_split, batch_size=batch_size, drop_last=drop_last, **config)
                 else:
                     raise SamplerNotFoundError(f"Could not find sampler with key {strategy}")
             else:
@@ -55,7 +72,12 @@ class DatasetLoaderFactory:
                                                      batch_size=batch_size,
                                                      sampler=sampler,
                                                      collate_fn=collate_fn,
-                                                     drop_last=drop_last)
+                                                     drop_last=drop_last,
+                                                     num_workers=num_workers,
+                                                     prefetch_factor=prefetch_factor,
+                                                     persistent_workers=persistent_workers,
+                                                     pin_memory=pin_memory,
+                                                     seed=seed)
         return data_loaders
 
 
@@ -65,6 +87,7 @@ class SamplerFactory:
         RANDOM = "random"
         WEIGHTED_RANDOM = "weighted_random"
         IN_ORDER = "in_order"
+        BUCKETING = "bucketing"
 
     @staticmethod
     def get_weighted_sampler(dataset: InformedDatasetIteratorIF, label_pos: int = 2, seed: int = 0) -> Sampler:
@@ -78,11 +101,13 @@ class SamplerFactory:
         #     [WeightedRandomSampler]: Instance of WeightedRandomSampler.
         # """
         rnd_generator = torch.Generator().manual_seed(seed) if seed is not None else None
-        # get the class weights
-        target_counts = Counter([int(sample[label_pos]) for sample in dataset])  # uses generator expression
-        target_tuples = [(k, v) for k, v in sorted(target_counts.items(), key=lambda item: item[0])]
-        class_weights = {target_key: 1./target_count for target_key, target_count in target_tuples}
-        sample_weights = [class_weights[sample[label_pos]] for sample in dataset]
+        # get the class weights from the label index instead of iterating over the samples
+        labels = LabelIndexFactory.get_label_index(dataset, label_pos)
+        if np.issubdtype(labels.dtype, np.integer) and len(labels) > 0 and labels.min() >= 0:
+            class_ids, class_counts = labels, np.bincount(labels)
+        else:
+            _, class_ids, class_counts = np.unique(labels, return_inverse=True, return_counts=True)
+        sample_weights = torch.from_numpy(1. / class_counts[class_ids.reshape(-1)])
         sampler = WeightedRandomSampler(weights=sample_weights, num_samples=len(dataset), generator=rnd_generator)
         return sampler
 
@@ -95,11 +120,139 @@ class SamplerFactory:
     def get_sequential_sampler(dataset: InformedDatasetIteratorIF) -> Sampler:
         return SequentialSampler(data_source=dataset)
 
+    @staticmethod
+    def get_bucketing_batch_sampler(dataset: InformedDatasetIteratorIF, batch_size: int, drop_last: bool = False, length_pos: int = 0,
+                                    bucket_size_multiplier: int = 100, max_tokens: int = None, seed: int = 0) -> BatchSampler:
+        lengths = SampleLengthIndexFactory.get_length_index(dataset, length_pos)
+        return BucketingBatchSampler(lengths=lengths, batch_size=batch_size, drop_last=drop_last,
+                                     bucket_size_multiplier=bucket_size_multiplier, max_tokens=max_tokens, seed=seed)
+
+
+def seed_worker(worker_id: int):
+    # torch seeds each worker with base_seed + worker_id, where the base seed is drawn from the loader's generator.
+    # We derive the numpy and python seeds from it, so that postprocessors relying on these libraries are reproducible, as well.
+    worker_seed = torch.initial_seed() % 2**32
+    np.random.seed(worker_seed)
+    random.seed(worker_seed)
+
 
 class DatasetLoader(DataLoader):
+    """Note, with `num_workers` > 0 the iterator chain and the collator are pickled to the worker processes (spawn start method).
+    If this fails, the member that cannot be pickled is reported (see `check_picklable`).
+    The collation then runs on the CPU within the workers and the batches are moved to `device` by the consumers
+    (i.e., `batch.to_device(device)`), as CUDA tensors must not be created within the workers.
+
+    If `sampler` is a `BatchSampler` (e.g., the `BucketingBatchSampler`), it determines the batches and `batch_size` and `drop_last`
+    are ignored.
+
+    Streaming datasets (`ShardedIterableDataset`) are iterated without a sampler. The loader keeps track of their position
+    (see `state_dict`) and advances their epoch after each complete iteration. As the workers receive the epoch and position of
+    the dataset when they are started, `persistent_workers` is not supported for streaming datasets.
+    """
+
     def __init__(self, dataset_iterator: InformedDatasetIteratorIF, batch_size: int, sampler: Sampler,
-                 collate_fn: Collator = None, drop_last: bool = False):
-        super().__init__(dataset=dataset_iterator, sampler=sampler, batch_size=batch_size, collate_fn=collate_fn, drop_last=drop_last)
+                 collate_fn: Collator = None, drop_last: bool = False, num_workers: int = 0, prefetch_factor: int = None,
+                 persistent_workers: bool = False, pin_memory: bool = False, seed: int = None):
+        generator = torch.Generator().manual_seed(seed) if seed is not None else None
+        # all samples of a batch are fetched with a single batched call through the iterator stack
+        if isinstance(dataset_iterator, InformedDatasetIterator) and not hasattr(dataset_iterator, "__getitems__"):
+            dataset_iterator = BatchedInformedDatasetIterator(dataset_iterator)
+        if isinstance(dataset_iterator, ShardedIterableDataset):
+            dataset_iterator.batch_size = batch_size
+            sampler_kwargs = {"batch_size": batch_size, "drop_last": drop_last}
+            persistent_workers = False
+        elif isinstance(sampler, BatchSampler):
+            sampler_kwargs = {"batch_sampler": sampler}
+        else:
+            sampler_kwargs = {"sampler": sampler, "batch_size": batch_size, "drop_last": drop_last}
+        if num_workers > 0:
+            worker_kwargs = {"persistent_workers": persistent_workers, "worker_init_fn": seed_worker}
+            # torch<2.0 rejects a prefetch_factor of None
+            if prefetch_factor is not None:
+                worker_kwargs["prefetch_factor"] = prefetch_factor
+        else:
+            worker_kwargs = {}
+        super().__init__(dataset=dataset_iterator, **sampler_kwargs, collate_fn=collate_fn, num_workers=num_workers,
+                         pin_memory=pin_memory, generator=generator, **worker_kwargs)
+        self._device = getattr(collate_fn, "device", torch.device("cpu"))
+
+    def __iter__(self):
+        try:
+            # with workers, the iterator chain and the collator are pickled when the worker processes are started
+            iterator = super().__iter__()
+        except Exception:
+            if self.num_workers > 0:
+                self.check_picklable()
+            raise
+        if not self.is_streaming:
+            return iterator
+        return self._iter_stream(iterator)
+
+    def check_picklable(self):
+        """Raises a ValueError naming the innermost iterator layer, postprocessor or the collator that cannot be pickled to
+        the worker processes. The members are only checked after starting the workers failed, as pickling the dataset is expensive."""
+        for name, obj in [("collator", self.collate_fn)] + DatasetLoader._get_layers(self.dataset)[::-1]:
+            try:
+                DatasetLoader._pickle(obj)
+            except Exception as e:
+                raise ValueError(f"The {name} {type(obj).__name__} of the data loader cannot be pickled to the worker processes. "
+                                 "Make the member picklable (e.g., no lambdas or open file handles) or set num_workers to 0.") from e
+
+    @staticmethod
+    def _pickle(obj: Any):
+        # the pickled bytes are discarded right away, such that large datasets are not copied
+        class NullWriter:
+            def write(self, data) -> int:
+                return len(data)
+
+        pickle.Pickler(NullWriter(), protocol=pickle.HIGHEST_PROTOCOL).dump(obj)
+
+    @staticmethod
+    def _get_layers(iterator: Any) -> List[Tuple[str, Any]]:
+        layers = [("iterator", iterator)]
+        post_processor = getattr(iterator, "post_processor", None)
+        if post_processor is not None:
+            layers.append(("postprocessor", post_processor))
+        # informed iterators pass on the underlying iterators of their wrapped iterator, which would skip the wrapped iterator
+        if hasattr(iterator, "_dataset_iterator"):
+            underlying_iterators = [iterator._dataset_iterator]
+        else:
+            underlying_iterators = getattr(iterator, "underlying_iterators", None) or []
+        for underlying_iterator in underlying_iterators:
+            layers.extend(DatasetLoader._get_layers(underlying_iterator))
+        return layers
+
+    def _iter_stream(self, iterator: Iterator[Any]):
+        for batch in iterator:
+            self.dataset.num_batches += 1
+            yield batch
+        self.dataset.set_epoch(self.dataset.epoch + 1)
+
+    @property
+    def is_streaming(self) -> bool:
+        return isinstance(self.dataset, ShardedIterableDataset)
+
+    def state_dict(self) -> Dict[str, int]:
+        """Returns the epoch and the number of consumed batches of a streaming dataset, from which the iteration is resumed."""
+        return self.dataset.state_dict() if self.is_streaming else {}
+
+    def load_state_dict(self, state_dict: Dict[str, int]):
+        if self.is_streaming:
+            self.dataset.load_state_dict(state_dict)
+
+    @contextmanager
+    def restarted_stream(self) -> Iterator[None]:
+        """Iterates a streaming dataset from its beginning within the context and restores its position afterwards, such that
+        evaluating the train split does not reset the training progress of the stream."""
+        if not self.is_streaming:
+            yield
+            return
+        state_dict = self.state_dict()
+        self.dataset.set_epoch(0)
+        try:
+            yield
+        finally:
+            self.load_state_dict(state_dict)
 
     @property
     def dataset_name(self) -> str:
@@ -109,11 +262,18 @@ class DatasetLoader(DataLoader):
     def dataset_tag(self) -> str:
         return self.dataset.dataset_meta.dataset_tag
 
+    @property
+    def padding_ratio(self) -> float:
+        # only samplers grouping the samples by length keep track of the padding
+        return getattr(self.batch_sampler, "padding_ratio", None)
+
     @property
     def device(self) -> torch.device:
-        return self.collate_fn.device
+        return self._device
 
     @device.setter
     def device(self, d: torch.device):
-        if self.collate_fn is not None:
+        self._device = d
+        # the worker processes collate on the CPU
+        if self.collate_fn is not None and self.num_workers == 0:
             self.collate_fn.device = d
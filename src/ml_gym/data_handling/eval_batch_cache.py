@@ -0,0 +1,195 @@
+import os
+import tempfile
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+import torch
+from torch.utils.data.sampler import BatchSampler, SequentialSampler
+from ml_gym.batching.batch import DatasetBatch, TorchDeviceMixin
+from ml_gym.data_handling.dataset_loader import DatasetLoader
+from ml_gym.data_handling.postprocessors.postprocessor import FeatureEncoderPostProcessor
+from ml_gym.util.logger import ConsoleLogger, LogLevel
+
+
+@dataclass
+class EvalBatchCacheEntry:
+    fingerprint: Tuple
+    batches: List[Tuple[Any, Dict[str, torch.Tensor], torch.Tensor]]
+    size_bytes: int
+
+
+class _DiskBatchWriter:
+    """Writes the tensors of the recorded batches into a single file and replaces them with their (offset, dtype, shape) within
+    the batch records. The records are resolved into views of the memory mapped file by `load`."""
+
+    alignment = 64
+
+    def __init__(self, folder: str, split_name: str):
+        fd, self.path = tempfile.mkstemp(prefix=f"{split_name}_", suffix=".bin", dir=folder)
+        self.file = os.fdopen(fd, "wb")
+        self.offset = 0
+
+    def write(self, tensor: torch.Tensor) -> Tuple[int, torch.dtype, Tuple[int, ...]]:
+        padding = -self.offset % _DiskBatchWriter.alignment
+        self.file.write(b"\0" * padding)
+        offset = self.offset + padding
+        data = tensor.detach().cpu().contiguous().reshape(-1).view(torch.uint8).numpy()
+        self.file.write(memoryview(data))
+        self.offset = offset + len(data)
+        return offset, tensor.dtype, tuple(tensor.shape)
+
+    def load(self, records: List[Tuple]) -> List[Tuple]:
+        self.file.close()
+        if self.offset == 0:
+            buffer = torch.empty(0, dtype=torch.uint8)
+        else:
+            # private mapping, the cached tensors are never written back to the file
+            buffer = torch.from_file(self.path, shared=False, size=self.offset, dtype=torch.uint8)
+        self.remove()
+
+        def resolve(placeholder: Tuple) -> torch.Tensor:
+            offset, dtype, shape = placeholder
+            num_bytes = torch.Size(shape).numel() * torch.empty((), dtype=dtype).element_size()
+            return buffer[offset:offset + num_bytes].view(dtype).view(shape)
+
+        return [tuple(TorchDeviceMixin.traverse_apply(part, resolve) for part in record) for record in records]
+
+    def remove(self):
+        self.file.close()
+        # the mapping stays valid after unlinking the file, whose pages are released together with the cached tensors
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class _RecordingBatchIterable:
+
+    def __init__(self, cache: "EvalBatchCache", split_name: str, dataset_loader: DatasetLoader, fingerprint: Tuple,
+                 device: torch.device):
+        self.cache = cache
+        self.split_name = split_name
+        self.dataset_loader = dataset_loader
+        self.fingerprint = fingerprint
+        self.device = device
+
+    def __len__(self) -> int:
+        return len(self.dataset_loader)
+
+    def __iter__(self) -> Iterator[DatasetBatch]:
+        records, size_bytes = [], 0
+        budget_bytes = self.cache.max_size_bytes - self.cache.size_bytes
+        writer = _DiskBatchWriter(self.cache.folder, self.split_name) if self.cache.location == EvalBatchCache.Locations.DISK else None
+        try:
+            for batch in self.dataset_loader:
+                if records is not None:
+                    size_bytes += EvalBatchCache.get_size_bytes(batch)
+                    if size_bytes > budget_bytes:
+                        self.cache.logger.log(LogLevel.INFO, f"Split {self.split_name} exceeds the eval batch cache budget "
+                                                             f"({budget_bytes} bytes left) and is not cached.")
+                        self.cache._uncacheable[self.split_name] = self.fingerprint
+                        records = None
+                    else:
+                        records.append(self.cache._record(batch, self.device, writer))
+                yield batch
+            if records is not None:
+                records = writer.load(records) if writer is not None else records
+                self.cache._entries[self.split_name] = EvalBatchCacheEntry(fingerprint=self.fingerprint, batches=records,
+                                                                            size_bytes=size_bytes)
+                self.cache.logger.log(LogLevel.INFO, f"Cached {len(records)} batches ({size_bytes} bytes) of split {self.split_name}.")
+        finally:
+            if writer is not None:
+                writer.remove()
+
+
+class EvalBatchCache:
+    """Caches the collated `DatasetBatch`es of the evaluation splits, such that later evaluations iterate over the cached batches
+    instead of reading, postprocessing and collating the split through its `DatasetLoader` again.
+
+    The batches are recorded during the first evaluation of a split and kept in RAM, in pinned memory, on the evaluation device
+    or within memory mapped files in `folder` (`location`), as long as all cached splits fit into `max_size_bytes`.
+    Only splits iterated in order (i.e., with a `SequentialSampler` or unshuffled streaming datasets) are cached. An entry is
+    invalidated, if the dataset iterator, sampler, collator, batch size, the state of its feature encoders or (for the device
+    location) the device of its split changes.
+    """
+
+    class Locations(Enum):
+        RAM = "ram"
+        PINNED = "pinned"
+        DEVICE = "device"
+        DISK = "disk"
+
+    def __init__(self, location: str = "ram", max_size_bytes: int = 4 * 2**30, folder: str = None):
+        self.location = EvalBatchCache.Locations(location)
+        if self.location == EvalBatchCache.Locations.DISK:
+            if folder is None:
+                raise ValueError("The disk location of the eval batch cache requires a folder.")
+            os.makedirs(folder, exist_ok=True)
+        self.max_size_bytes = max_size_bytes
+        self.folder = folder
+        self.logger = ConsoleLogger("logger_eval_batch_cache")
+        self._entries: Dict[str, EvalBatchCacheEntry] = {}
+        # fingerprints of the splits exceeding the budget, which are not recorded again until their config changes
+        self._uncacheable: Dict[str, Tuple] = {}
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(entry.size_bytes for entry in self._entries.values())
+
+    @staticmethod
+    def get_size_bytes(batch: DatasetBatch) -> int:
+        tensors = []
+        TorchDeviceMixin.traverse_apply([batch.samples, batch.targets, batch.tags], tensors.append)
+        return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+    @staticmethod
+    def is_cacheable(dataset_loader: DatasetLoader) -> bool:
+        if dataset_loader.is_streaming:
+            return not dataset_loader.dataset.shuffle
+        return isinstance(dataset_loader.sampler, SequentialSampler) and type(dataset_loader.batch_sampler) is BatchSampler
+
+    def get_fingerprint(self, dataset_loader: DatasetLoader, device: torch.device) -> Tuple:
+        # the objects are kept alive by the entry, such that replacing them (e.g., by a new iterator) is always detected
+        device_key = str(device) if self.location == EvalBatchCache.Locations.DEVICE else None
+        # refitting or reconfiguring a feature encoder changes the batches without replacing any of the objects
+        state_versions = tuple(layer.state_version for _, layer in DatasetLoader._get_layers(dataset_loader.dataset)
+                               if isinstance(layer, FeatureEncoderPostProcessor))
+        return (dataset_loader.dataset, len(dataset_loader.dataset), dataset_loader.sampler, dataset_loader.collate_fn,
+                dataset_loader.batch_size, dataset_loader.drop_last, device_key, state_versions)
+
+    def _record(self, batch: DatasetBatch, device: torch.device, writer: _DiskBatchWriter = None) -> Tuple:
+        if writer is not None:
+            store_fun = writer.write
+        elif self.location == EvalBatchCache.Locations.PINNED and torch.cuda.is_available():
+            def store_fun(tensor: torch.Tensor) -> torch.Tensor:
+                return tensor.detach().cpu().pin_memory()
+        else:
+            target_device = device if self.location == EvalBatchCache.Locations.DEVICE else torch.device("cpu")
+
+            # tensors already on the target device are cloned, as the consumers of the batch (e.g., collators reusing
+            # their buffers or in-place transforms) may modify them after the batch has been recorded
+            def store_fun(tensor: torch.Tensor) -> torch.Tensor:
+                tensor = tensor.detach()
+                stored_tensor = tensor.to(target_device)
+                return stored_tensor.clone() if stored_tensor is tensor else stored_tensor
+        return tuple(TorchDeviceMixin.traverse_apply(part, store_fun) for part in [batch.samples, batch.targets, batch.tags])
+
+    def invalidate(self, split_name: str = None):
+        split_names = list(self._entries) if split_name is None else [split_name]
+        for name in split_names:
+            self._entries.pop(name, None)
+            self._uncacheable.pop(name, None)
+
+    def iterate(self, split_name: str, dataset_loader: DatasetLoader, device: torch.device) -> Iterable[DatasetBatch]:
+        """Returns the batches of the split, either from the cache or from the `dataset_loader` while recording them."""
+        fingerprint = self.get_fingerprint(dataset_loader, device)
+        entry = self._entries.get(split_name)
+        if entry is not None:
+            if entry.fingerprint == fingerprint:
+                # fresh batch objects, as the device moves of the evaluation replace the tensors of the batches
+                return [DatasetBatch(samples=samples, targets=dict(targets), tags=tags) for samples, targets, tags in entry.batches]
+            self.logger.log(LogLevel.INFO, f"Invalidated the eval batch cache entry of split {split_name}, as its config changed.")
+            self.invalidate(split_name)
+        if not EvalBatchCache.is_cacheable(dataset_loader) or self._uncacheable.get(split_name) == fingerprint:
+            return dataset_loader
+        return _RecordingBatchIterable(self, split_name, dataset_loader, fingerprint, device)
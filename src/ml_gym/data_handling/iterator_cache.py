@@ -0,0 +1,84 @@
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from typing import Dict, List, Tuple
+from data_stack.dataset.iterator import InformedDatasetIteratorIF
+from data_stack.dataset.factory import InformedDatasetFactory
+from ml_gym.data_handling.iterators import SharedMemoryDatasetIterator
+from ml_gym.util.logger import ConsoleLogger, LogLevel
+
+
+class IteratorCache:
+    """Persists the splits of iterator producing components within `folder`, such that later runs (e.g., further grid searches
+    or warm starts) load the samples from memory mapped files instead of recomputing the iterator pipeline.
+
+    The entries are keyed by the hash of the config of the component and its requirements (see `SharedDatasetRegistry`), so
+    the cache folder must not be shared between projects registering different constructables under the same component keys.
+    If the entries exceed `max_size_bytes`, the least recently used entries are evicted.
+    """
+
+    default_component_type_keys = {"SPLITTED_DATASET_ITERATORS", "COMBINED_DATASET_ITERATORS", "FILTERED_LABELS_ITERATOR",
+                                   "MAPPED_LABELS_ITERATOR", "FEATURE_ENCODED_ITERATORS", "ONE_HOT_ENCODED_TARGETS_ITERATOR"}
+    stale_tmp_seconds = 24 * 60 * 60
+
+    def __init__(self, folder: str, max_size_bytes: int = 10 * 2**30, component_type_keys: List[str] = None):
+        self.folder = folder
+        self.max_size_bytes = max_size_bytes
+        self.component_type_keys = set(component_type_keys) if component_type_keys is not None else IteratorCache.default_component_type_keys
+        self.logger = ConsoleLogger("logger_iterator_cache")
+        os.makedirs(folder, exist_ok=True)
+
+    def _get_entry_path(self, key: str) -> str:
+        return os.path.join(self.folder, key)
+
+    def load(self, key: str, component_name: str) -> Dict[str, InformedDatasetIteratorIF]:
+        entry_path = self._get_entry_path(key)
+        try:
+            with open(os.path.join(entry_path, "splits.pkl"), "rb") as fd:
+                split_entries = pickle.load(fd)
+            iterators = {split_name: InformedDatasetFactory.get_dataset_iterator(SharedMemoryDatasetIterator(os.path.join(entry_path, split_id)), meta)
+                         for split_name, (split_id, meta) in split_entries.items()}
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            self.logger.log(LogLevel.INFO, f"Iterator cache miss for component {component_name} ({key}).")
+            return None
+        # the modification time of the entry marks its latest use
+        os.utime(entry_path)
+        self.logger.log(LogLevel.INFO, f"Iterator cache hit for component {component_name} ({key}).")
+        return iterators
+
+    def store(self, key: str, iterators: Dict[str, InformedDatasetIteratorIF]):
+        # the entry is written to a temporary folder and renamed, so concurrent processes never read incomplete entries
+        tmp_path = tempfile.mkdtemp(prefix=f".{key}_", dir=self.folder)
+        try:
+            split_entries = {}
+            for split_id, (split_name, iterator) in enumerate(iterators.items()):
+                SharedMemoryDatasetIterator.materialize(iterator, os.path.join(tmp_path, str(split_id)))
+                split_entries[split_name] = (str(split_id), iterator.dataset_meta)
+            with open(os.path.join(tmp_path, "splits.pkl"), "wb") as fd:
+                pickle.dump(split_entries, fd)
+            os.rename(tmp_path, self._get_entry_path(key))
+        except OSError:
+            # e.g., another process stored the entry in the meantime
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        self.evict()
+
+    def evict(self):
+        entries: List[Tuple[float, int, str]] = []
+        for entry in os.listdir(self.folder):
+            entry_path = self._get_entry_path(entry)
+            if entry.startswith("."):
+                # temporary folders of processes that crashed while storing an entry
+                if time.time() - os.path.getmtime(entry_path) > IteratorCache.stale_tmp_seconds:
+                    shutil.rmtree(entry_path, ignore_errors=True)
+                continue
+            size = sum(os.path.getsize(os.path.join(root, file_name)) for root, _, file_names in os.walk(entry_path) for file_name in file_names)
+            entries.append((os.path.getmtime(entry_path), size, entry))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total_size <= self.max_size_bytes:
+                break
+            shutil.rmtree(self._get_entry_path(entry), ignore_errors=True)
+            total_size -= size
+            self.logger.log(LogLevel.INFO, f"Evicted iterator cache entry {entry} ({size} bytes).")
@@ -1,6 +1,13 @@
-from data_stack.dataset.iterator import DatasetIteratorIF
-from ml_gym.data_handling.postprocessors.postprocessor import PostProcessorIf
-from typing import List
+from data_stack.dataset.iterator import DatasetIteratorIF, InformedDatasetIteratorIF, InformedDatasetIterator, SequenceDatasetIterator, \
+    DatasetIteratorView, CombinedDatasetIterator, InMemoryDatasetIterator
+from ml_gym.data_handling.postprocessors.postprocessor import PostProcessorIf, FeatureEncoderPostProcessor
+from typing import Dict, List, Sequence, Tuple, Any
+import numpy as np
+import os
+import pickle
+import tempfile
+import torch
+import weakref
 
 
 class PostProcessedDatasetIterator(DatasetIteratorIF):
@@ -15,6 +22,275 @@ class PostProcessedDatasetIterator(DatasetIteratorIF):
     def __getitem__(self, index: int):
         return self._post_processor.postprocess(self._dataset_iterator[index])
 
+    def get_items(self, indices: Sequence[int]) -> List[Tuple[Any]]:
+        return self._post_processor.postprocess_items(BatchedFetcher.get_items(self._dataset_iterator, indices))
+
     @property
     def underlying_iterators(self) -> List[DatasetIteratorIF]:
         return [self._dataset_iterator]
+
+    @property
+    def post_processor(self) -> PostProcessorIf:
+        return self._post_processor
+
+
+class MaterializedFeatureEncodedDatasetIterator(PostProcessedDatasetIterator):
+    """Encodes the samples of the whole split once in chunks into a contiguous float32 matrix and serves the encoded samples
+    by index from it. Splits larger than `memmap_threshold` bytes are stored in a memory mapped file within `memmap_folder`.
+    The matrix is rebuilt whenever the encoding config or the fitted encoders of the postprocessor change.
+    """
+
+    def __init__(self, dataset_iterator: DatasetIteratorIF, post_processor: FeatureEncoderPostProcessor, chunk_size: int = 4096,
+                 memmap_threshold: int = 2**30, memmap_folder: str = None):
+        super().__init__(dataset_iterator=dataset_iterator, post_processor=post_processor)
+        self._chunk_size = chunk_size
+        self._memmap_threshold = memmap_threshold
+        self._memmap_folder = memmap_folder
+        self._encoded_samples: np.ndarray = None
+        self._encoded_state_version: int = None
+
+    def __getitem__(self, index: int):
+        encoded_samples = self.encoded_samples
+        sample = list(self._dataset_iterator[index])
+        sample[self._post_processor.sample_position] = torch.tensor(encoded_samples[index])
+        return tuple(sample)
+
+    def get_items(self, indices: Sequence[int]) -> List[Tuple[Any]]:
+        encoded_rows = torch.from_numpy(self.encoded_samples[np.asarray(indices, dtype=np.int64)]).unbind(0)
+        samples = [list(sample) for sample in BatchedFetcher.get_items(self._dataset_iterator, indices)]
+        for sample, encoded_row in zip(samples, encoded_rows):
+            sample[self._post_processor.sample_position] = encoded_row
+        return [tuple(sample) for sample in samples]
+
+    @property
+    def encoded_samples(self) -> np.ndarray:
+        if self._encoded_samples is None or self._encoded_state_version != self._post_processor.state_version:
+            self._encoded_state_version = self._post_processor.state_version
+            self._encoded_samples = self._materialize()
+        return self._encoded_samples
+
+    def _materialize(self) -> np.ndarray:
+        num_samples = len(self._dataset_iterator)
+        sample_position = self._post_processor.sample_position
+        encoded_samples = None
+        for start in range(0, num_samples, self._chunk_size):
+            end = min(start + self._chunk_size, num_samples)
+            sample_inputs = np.stack([np.asarray(self._dataset_iterator[i][sample_position]) for i in range(start, end)])
+            encoded_chunk = self._post_processor.encode_samples(sample_inputs)
+            if encoded_samples is None:
+                encoded_samples = self._allocate((num_samples, encoded_chunk.shape[1]))
+            encoded_samples[start:end] = encoded_chunk
+        return encoded_samples
+
+    def _allocate(self, shape) -> np.ndarray:
+        if np.prod(shape) * np.dtype(np.float32).itemsize <= self._memmap_threshold:
+            return np.empty(shape, dtype=np.float32)
+        fd, path = tempfile.mkstemp(suffix=".npy", dir=self._memmap_folder)
+        os.close(fd)
+        encoded_samples = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=shape)
+        weakref.finalize(self, os.remove, path)
+        return encoded_samples
+
+    def __getstate__(self):
+        # the matrix is materialized before pickling, such that the data loader workers do not encode the split each
+        _ = self.encoded_samples
+        state = self.__dict__.copy()
+        # memory mapped matrices are passed by path (e.g., to the data loader workers) and not copied
+        if isinstance(self._encoded_samples, np.memmap):
+            self._encoded_samples.flush()
+            state["_encoded_samples"] = self._encoded_samples.filename
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if isinstance(self._encoded_samples, str):
+            self._encoded_samples = np.load(self._encoded_samples, mmap_mode="r")
+
+
+class SharedMemoryDatasetIterator(DatasetIteratorIF):
+    """Read-only iterator over samples that were materialized into the files of `folder` (typically in /dev/shm), such that
+    all processes attaching to the folder share the samples via the page cache instead of holding a copy each.
+
+    Each sample position is stored as a column. Numeric values (tensors, arrays and scalars) are concatenated into a flat
+    memory mapped value file with per sample offsets and shapes, so variable sized samples are supported. Any other values
+    (e.g., strings) are pickled per sample into a memory mapped byte file and only unpickled when accessed.
+
+    The kind (and, for tensors and arrays, the dtype) of a column is taken from the first sample and the materialization fails
+    for samples that do not match it. The dtype of scalar columns is inferred over all samples.
+    """
+    # tensor dtypes without a numpy counterpart are pickled per sample, float8 dtypes only exist as of torch 2.1
+    object_tensor_dtypes = {getattr(torch, name) for name in ["bfloat16", "float8_e4m3fn", "float8_e5m2"] if hasattr(torch, name)}
+
+    def __init__(self, folder: str):
+        self._folder = folder
+        self._open()
+
+    def _open(self):
+        with open(os.path.join(self._folder, "columns.pkl"), "rb") as fd:
+            self._length, self._columns = pickle.load(fd)
+        self._column_values = []
+        for position, column in enumerate(self._columns):
+            path = os.path.join(self._folder, f"column_{position}.bin")
+            dtype = np.uint8 if column["kind"] == "object" else column["dtype"]
+            values = np.memmap(path, dtype=dtype, mode="r") if os.path.getsize(path) > 0 else np.empty(0, dtype)
+            offsets = np.load(os.path.join(self._folder, f"column_{position}_offsets.npy"))
+            shapes = np.load(os.path.join(self._folder, f"column_{position}_shapes.npy"))
+            self._column_values.append((values, offsets, shapes))
+
+    @staticmethod
+    def materialize(iterator: DatasetIteratorIF, folder: str) -> "SharedMemoryDatasetIterator":
+        os.makedirs(folder, exist_ok=True)
+        columns, files, scalar_values, offsets, shapes = None, [], [], [], []
+        for index in range(len(iterator)):
+            sample = iterator[index]
+            if columns is None:
+                columns = [SharedMemoryDatasetIterator._get_column(value) for value in sample]
+                files = [open(os.path.join(folder, f"column_{position}.bin"), "wb") for position in range(len(columns))]
+                scalar_values = [[] for _ in columns]
+                offsets = [[0] for _ in columns]
+                shapes = [[] for _ in columns]
+            for position, (column, value) in enumerate(zip(columns, sample)):
+                SharedMemoryDatasetIterator._check_value(column, value, position, index)
+                if column["kind"] == "scalar":
+                    scalar_values[position].append(value)
+                    continue
+                if column["kind"] == "object":
+                    data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+                    size, shape = len(data), ()
+                else:
+                    array = np.asarray(value.detach().cpu().numpy() if isinstance(value, torch.Tensor) else value)
+                    data, size, shape = array.tobytes(), array.size, array.shape
+                files[position].write(data)
+                offsets[position].append(offsets[position][-1] + size)
+                shapes[position].append(shape)
+        for position, column in enumerate(columns or []):
+            if column["kind"] == "scalar":
+                # the dtype is inferred over all samples, e.g., int and float values result in a float column
+                array = np.asarray(scalar_values[position])
+                column["dtype"] = array.dtype
+                value_types = {type(value) for value in scalar_values[position]}
+                column["type"] = value_types.pop() if len(value_types) == 1 else None
+                files[position].write(array.tobytes())
+                offsets[position] = range(len(array) + 1)
+                shapes[position] = [()] * len(array)
+            files[position].close()
+            np.save(os.path.join(folder, f"column_{position}_offsets.npy"), np.asarray(offsets[position], dtype=np.int64))
+            np.save(os.path.join(folder, f"column_{position}_shapes.npy"),
+                    np.asarray(shapes[position], dtype=np.int64).reshape(len(iterator), column["ndim"]))
+        # the column description is written last, i.e., a folder without it is incomplete
+        with open(os.path.join(folder, "columns.pkl"), "wb") as fd:
+            pickle.dump((len(iterator), columns or []), fd)
+        return SharedMemoryDatasetIterator(folder)
+
+    @staticmethod
+    def _get_column(value: Any) -> Dict[str, Any]:
+        if isinstance(value, torch.Tensor) and value.dtype not in SharedMemoryDatasetIterator.object_tensor_dtypes:
+            return {"kind": "tensor", "dtype": value.detach().cpu().numpy().dtype, "ndim": value.dim()}
+        elif isinstance(value, np.ndarray) and value.dtype != object:
+            return {"kind": "ndarray", "dtype": value.dtype, "ndim": value.ndim}
+        elif isinstance(value, (bool, int, float, np.number, np.bool_)):
+            return {"kind": "scalar", "ndim": 0}
+        return {"kind": "object", "ndim": 0}
+
+    @staticmethod
+    def _check_value(column: Dict[str, Any], value: Any, position: int, index: int):
+        if column["kind"] == "object":
+            return
+        value_column = SharedMemoryDatasetIterator._get_column(value)
+        if value_column["kind"] != column["kind"] or value_column.get("dtype", None) != column.get("dtype", None) or \
+                value_column["ndim"] != column["ndim"]:
+            raise ValueError(f"Cannot materialize sample {index}: the value at position {position} ({value_column}) does not match "
+                             f"the column inferred from the first sample ({column}).")
+
+    def _get_value(self, position: int, index: int) -> Any:
+        column = self._columns[position]
+        values, offsets, shapes = self._column_values[position]
+        if column["kind"] == "object":
+            return pickle.loads(values[offsets[index]:offsets[index + 1]].tobytes())
+        # the values are copied out of the read-only mapping
+        array = np.array(values[offsets[index]:offsets[index + 1]]).reshape(shapes[index])
+        if column["kind"] == "tensor":
+            return torch.from_numpy(array)
+        elif column["kind"] == "scalar":
+            return column["type"](array.item()) if column["type"] is not None else array.item()
+        return array
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index: int):
+        if not 0 <= index < self._length:
+            raise IndexError
+        return tuple(self._get_value(position, index) for position in range(len(self._columns)))
+
+    @property
+    def underlying_iterators(self) -> List[DatasetIteratorIF]:
+        return []
+
+    def __getstate__(self):
+        # the samples are attached by path and not copied
+        return {"_folder": self._folder}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._open()
+
+
+class BatchedFetcher:
+    """Fetches the samples for a list of indices with one call per iterator layer instead of one call per sample and layer.
+    Iterators can implement the batched fetch via `get_items(indices)`, for the data_stack iterators it is implemented here.
+    Any other iterator falls back to fetching the samples one by one.
+    """
+
+    @staticmethod
+    def get_items(iterator: DatasetIteratorIF, indices: Sequence[int]) -> List[Tuple[Any]]:
+        if hasattr(iterator, "get_items"):
+            return iterator.get_items(indices)
+        elif isinstance(iterator, InformedDatasetIterator):
+            return BatchedFetcher.get_items(iterator._dataset_iterator, indices)
+        elif isinstance(iterator, DatasetIteratorView):
+            view_indices = iterator.indices
+            return BatchedFetcher.get_items(iterator.underlying_iterators[0], [view_indices[index] for index in indices])
+        elif isinstance(iterator, CombinedDatasetIterator):
+            return BatchedFetcher._get_combined_items(iterator, indices)
+        elif isinstance(iterator, InMemoryDatasetIterator):
+            return [iterator._samples[index] for index in indices]
+        elif isinstance(iterator, SequenceDatasetIterator):
+            columns = [BatchedFetcher._get_sequence_items(sequence, indices) for sequence in iterator._dataset_sequences]
+            return list(zip(*columns))
+        return [iterator[index] for index in indices]
+
+    @staticmethod
+    def _get_sequence_items(sequence: Sequence, indices: Sequence[int]) -> Sequence:
+        if isinstance(sequence, torch.Tensor):
+            return sequence[torch.as_tensor(indices, dtype=torch.long)].unbind(0)
+        elif isinstance(sequence, np.ndarray):
+            return list(sequence[np.asarray(indices, dtype=np.int64)])
+        return [sequence[index] for index in indices]
+
+    @staticmethod
+    def _get_combined_items(iterator: CombinedDatasetIterator, indices: Sequence[int]) -> List[Tuple[Any]]:
+        sub_iterators = iterator.underlying_iterators
+        offsets = np.cumsum([0] + [len(sub_iterator) for sub_iterator in sub_iterators])
+        indices = np.asarray(indices, dtype=np.int64)
+        if len(indices) > 0 and (indices.min() < 0 or indices.max() >= offsets[-1]):
+            raise IndexError
+        iterator_ids = np.searchsorted(offsets, indices, side="right") - 1
+        samples = [None] * len(indices)
+        for iterator_id in np.unique(iterator_ids):
+            positions = np.flatnonzero(iterator_ids == iterator_id)
+            sub_samples = BatchedFetcher.get_items(sub_iterators[iterator_id], (indices[positions] - offsets[iterator_id]).tolist())
+            for position, sample in zip(positions, sub_samples):
+                samples[position] = sample
+        return samples
+
+
+class BatchedInformedDatasetIterator(InformedDatasetIterator):
+    """Exposes the batched fetch of an informed iterator via `__getitems__`, which is used by the torch DataLoader
+    to fetch all samples of a batch at once."""
+
+    def __init__(self, dataset_iterator: InformedDatasetIteratorIF):
+        super().__init__(dataset_iterator=dataset_iterator, dataset_meta=dataset_iterator.dataset_meta)
+
+    def __getitems__(self, indices: Sequence[int]) -> List[Tuple[Any]]:
+        return BatchedFetcher.get_items(self._dataset_iterator, indices)
@@ -0,0 +1,91 @@
+import os
+import weakref
+from typing import Any, Dict
+import numpy as np
+import torch
+from data_stack.dataset.iterator import DatasetIteratorIF, InformedDatasetIterator, SequenceDatasetIterator, DatasetIteratorView, \
+    CombinedDatasetIterator, InMemoryDatasetIterator
+from ml_gym.data_handling.iterators import PostProcessedDatasetIterator
+
+
+class LabelIndexFactory:
+    """Provides the labels (i.e., the values at position `label_pos`, typically the target or the tag) of all samples of an iterator
+    as a numpy array. The index is built once per iterator and label position and is derived from the index of the underlying
+    iterators for views, combined iterators and postprocessed iterators. Only for the raw datasets the labels have to be read,
+    which for sequence based datasets happens on the raw target sequences without accessing the samples.
+    """
+
+    _label_indices: "weakref.WeakKeyDictionary[DatasetIteratorIF, Dict[int, np.ndarray]]" = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def get_label_index(iterator: DatasetIteratorIF, label_pos: int) -> np.ndarray:
+        iterator_indices = LabelIndexFactory._label_indices.setdefault(iterator, {})
+        if label_pos not in iterator_indices:
+            iterator_indices[label_pos] = LabelIndexFactory._build_label_index(iterator, label_pos)
+        return iterator_indices[label_pos]
+
+    @staticmethod
+    def register_label_index(iterator: DatasetIteratorIF, label_pos: int, label_index: np.ndarray):
+        if len(label_index) != len(iterator):
+            raise ValueError(f"Label index of length {len(label_index)} does not match iterator of length {len(iterator)}.")
+        LabelIndexFactory._label_indices.setdefault(iterator, {})[label_pos] = label_index
+
+    @staticmethod
+    def get_persisted_label_index(iterator: DatasetIteratorIF, label_pos: int, path: str) -> np.ndarray:
+        """Loads the label index from `path` if it exists, otherwise builds the index and stores it under `path`."""
+        if os.path.isfile(path):
+            LabelIndexFactory.register_label_index(iterator, label_pos, np.load(path, allow_pickle=False))
+            return LabelIndexFactory.get_label_index(iterator, label_pos)
+        label_index = LabelIndexFactory.get_label_index(iterator, label_pos)
+        if label_index.dtype != object:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "wb") as fd:
+                np.save(fd, label_index, allow_pickle=False)
+        return label_index
+
+    @staticmethod
+    def _build_label_index(iterator: DatasetIteratorIF, label_pos: int) -> np.ndarray:
+        if isinstance(iterator, InformedDatasetIterator):
+            return LabelIndexFactory.get_label_index(iterator._dataset_iterator, label_pos)
+        elif isinstance(iterator, DatasetIteratorView):
+            underlying_index = LabelIndexFactory.get_label_index(iterator.underlying_iterators[0], label_pos)
+            return underlying_index[np.asarray(iterator.indices, dtype=np.int64)]
+        elif isinstance(iterator, CombinedDatasetIterator):
+            underlying_indices = [LabelIndexFactory.get_label_index(underlying, label_pos) for underlying in iterator.underlying_iterators]
+            if len(underlying_indices) > 0:
+                return np.concatenate(underlying_indices)
+        elif isinstance(iterator, PostProcessedDatasetIterator):
+            underlying_index = LabelIndexFactory.get_label_index(iterator.underlying_iterators[0], label_pos)
+            label_index = iterator.post_processor.postprocess_label_index(underlying_index, label_pos)
+            if label_index is not None:
+                return label_index
+        elif isinstance(iterator, SequenceDatasetIterator):
+            label_index = LabelIndexFactory._to_label_array(iterator._dataset_sequences[label_pos])
+            if label_index is not None:
+                return label_index
+        elif isinstance(iterator, InMemoryDatasetIterator):
+            return LabelIndexFactory._scan_labels(iterator._samples, label_pos)
+        # fallback for iterators we cannot look into
+        return LabelIndexFactory._scan_labels(iterator, label_pos)
+
+    @staticmethod
+    def _to_label_array(sequence: Any) -> np.ndarray:
+        if isinstance(sequence, torch.Tensor):
+            labels = sequence.detach().cpu().numpy()
+        elif isinstance(sequence, (np.ndarray, list)):
+            labels = np.asarray(sequence)
+        else:
+            return None
+        # targets such as [[1], [2], ...] are treated as scalar labels, anything else is not a label
+        if labels.ndim == 2 and labels.shape[1] == 1:
+            labels = labels[:, 0]
+        return labels if labels.ndim == 1 and labels.dtype != object else None
+
+    @staticmethod
+    def _scan_labels(iterator: DatasetIteratorIF, label_pos: int) -> np.ndarray:
+        def to_scalar(label: Any) -> Any:
+            if isinstance(label, torch.Tensor) and label.numel() == 1 or isinstance(label, np.ndarray) and label.size == 1:
+                return label.item()
+            return label
+
+        return np.asarray([to_scalar(iterator[i][label_pos]) for i in range(len(iterator))])
@@ -1,11 +1,14 @@
 from dataclasses import dataclass, field
 from abc import abstractmethod
-from typing import List, Callable
+from typing import List, Callable, ClassVar
 import torch
 
 
 @dataclass
 class Collator(Callable):
+    # True, if the collator stacks the targets (published under `target_publication_key`) and the tags of the samples
+    # without transforming them. Only then, label postprocessors can be moved to the collator (see BatchPathRewriter).
+    label_preserving: ClassVar[bool] = False
 
     device: torch.device = field(default_factory=lambda: torch.device("cpu"))
 
@@ -0,0 +1,115 @@
+from abc import ABC, abstractmethod
+from enum import Enum
+from typing import Any, Dict, List
+import torch
+import torch.nn.functional as F
+from ml_gym.batching.batch import DatasetBatch, TorchDeviceMixin
+from ml_gym.data_handling.postprocessors.collator import Collator
+
+
+class CollatorStageIF(ABC):
+    """Transforms a collated batch, i.e., the batch level counterpart of a `PostProcessorIf`."""
+
+    @abstractmethod
+    def __call__(self, batch: DatasetBatch) -> DatasetBatch:
+        raise NotImplementedError
+
+
+class LabelMapperCollatorStage(CollatorStageIF):
+    """Batch level version of the `LabelMapperPostProcessor`. The mappings are applied in sequence to the targets
+    at `target_keys` and, if `map_tags` is set, to the tags."""
+
+    def __init__(self, mappings: List[Dict], target_keys: List[str], map_tags: bool = True):
+        self.mappings = mappings
+        self.target_keys = target_keys
+        self.map_tags = map_tags
+
+    def _map(self, labels: torch.Tensor) -> torch.Tensor:
+        for mapping in self.mappings:
+            mask = torch.isin(labels, torch.as_tensor(mapping["previous_labels"], device=labels.device))
+            if not mask.any():
+                continue
+            # as for the `LabelMapperPostProcessor`, the labels are promoted to the type of the new label (e.g., float labels)
+            new_label = torch.as_tensor(mapping["new_label"], device=labels.device)
+            dtype = torch.promote_types(labels.dtype, new_label.dtype)
+            labels = torch.where(mask, new_label.to(dtype), labels.to(dtype))
+        return labels
+
+    def __call__(self, batch: DatasetBatch) -> DatasetBatch:
+        targets = {key: self._map(target) if key in self.target_keys else target for key, target in batch.targets.items()}
+        tags = self._map(batch.tags) if self.map_tags and batch.tags.numel() > 0 else batch.tags
+        return DatasetBatch(samples=batch.samples, targets=targets, tags=tags, samples_require_grad=batch.samples_require_grad)
+
+
+class OneHotEncodedTargetCollatorStage(CollatorStageIF):
+    """Batch level version of the `OneHotEncodedTargetPostProcessor`."""
+
+    def __init__(self, target_vector_size: int, target_keys: List[str]):
+        self.target_vector_size = target_vector_size
+        self.target_keys = target_keys
+
+    def _one_hot(self, target: torch.Tensor) -> torch.Tensor:
+        return F.one_hot(target.reshape(len(target), -1)[:, 0].long(), num_classes=self.target_vector_size).float()
+
+    def __call__(self, batch: DatasetBatch) -> DatasetBatch:
+        targets = {key: self._one_hot(target) if key in self.target_keys else target for key, target in batch.targets.items()}
+        return DatasetBatch(samples=batch.samples, targets=targets, tags=batch.tags, samples_require_grad=batch.samples_require_grad)
+
+
+class FilteredLabelsCollatorStage(CollatorStageIF):
+    """Removes the samples whose target at `target_key` is not within `filtered_labels` from the batch.
+    Note, in contrast to filtering the iterator, the batches get smaller instead of fewer."""
+
+    def __init__(self, filtered_labels: List[Any], target_key: str):
+        self.filtered_labels = filtered_labels
+        self.target_key = target_key
+
+    def __call__(self, batch: DatasetBatch) -> DatasetBatch:
+        target = batch.targets[self.target_key]
+        mask = torch.isin(target.reshape(len(target), -1)[:, 0], torch.as_tensor(self.filtered_labels, device=target.device))
+        if mask.all():
+            return batch
+        samples = TorchDeviceMixin.traverse_apply(batch.samples, lambda t: t[mask])
+        targets = TorchDeviceMixin.traverse_apply(batch.targets, lambda t: t[mask])
+        tags = batch.tags[mask] if len(batch.tags) == len(mask) else batch.tags
+        return DatasetBatch(samples=samples, targets=targets, tags=tags, samples_require_grad=batch.samples_require_grad)
+
+
+class CollatorStageFactory:
+
+    class StageTypes(Enum):
+        LABEL_MAPPING = "label_mapping"
+        ONE_HOT_ENCODED_TARGETS = "one_hot_encoded_targets"
+        FILTERED_LABELS = "filtered_labels"
+
+    @staticmethod
+    def get_stage(stage_type: str, **params) -> CollatorStageIF:
+        stage_type = CollatorStageFactory.StageTypes(stage_type)
+        if stage_type == CollatorStageFactory.StageTypes.LABEL_MAPPING:
+            return LabelMapperCollatorStage(**params)
+        elif stage_type == CollatorStageFactory.StageTypes.ONE_HOT_ENCODED_TARGETS:
+            return OneHotEncodedTargetCollatorStage(**params)
+        else:
+            return FilteredLabelsCollatorStage(**params)
+
+
+class StagedCollator(Collator):
+    """Applies the `stages` in sequence to the batches returned by `collator`."""
+
+    def __init__(self, collator: Collator, stages: List[CollatorStageIF]):
+        self.collator = collator
+        self.stages = stages
+
+    @property
+    def device(self) -> torch.device:
+        return self.collator.device
+
+    @device.setter
+    def device(self, d: torch.device):
+        self.collator.device = d
+
+    def __call__(self, batch: List[torch.Tensor]) -> DatasetBatch:
+        collated_batch = self.collator(batch)
+        for stage in self.stages:
+            collated_batch = stage(collated_batch)
+        return collated_batch
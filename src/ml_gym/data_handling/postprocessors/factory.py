@@ -1,11 +1,16 @@
 from typing import Any, Dict, List, Callable
 from data_stack.dataset.iterator import DatasetIteratorIF, CombinedDatasetIterator
 from ml_gym.data_handling.postprocessors.postprocessor import LabelMapperPostProcessor, FeatureEncoderPostProcessor, OneHotEncodedTargetPostProcessor
-from ml_gym.data_handling.iterators import PostProcessedDatasetIterator
+from ml_gym.data_handling.iterators import PostProcessedDatasetIterator, MaterializedFeatureEncodedDatasetIterator
+from ml_gym.data_handling.postprocessors.feature_encoder import Encoder
+from ml_gym.data_handling.postprocessors.fit_cache import FitCache
 from data_stack.dataset.meta import MetaFactory
 from data_stack.dataset.factory import InformedDatasetFactory
 from data_stack.dataset.iterator import InformedDatasetIteratorIF
 from data_stack.dataset.splitter import SplitterFactory
+from ml_gym.data_handling.splitter import ModelGymSplitterFactory
+from ml_gym.data_handling.label_index import LabelIndexFactory
+import numpy as np
 
 
 class ModelGymInformedIteratorFactory(InformedDatasetFactory):
@@ -21,7 +26,8 @@ class ModelGymInformedIteratorFactory(InformedDatasetFactory):
     @staticmethod
     def get_filtered_labels_iterator(identifier: str, iterator: InformedDatasetIteratorIF,
                                      filtered_labels: List[Any]) -> InformedDatasetIteratorIF:
-        valid_indices = [i for i in range(len(iterator)) if iterator[i][iterator.dataset_meta.target_pos] in filtered_labels]
+        labels = LabelIndexFactory.get_label_index(iterator, iterator.dataset_meta.target_pos)
+        valid_indices = np.flatnonzero(np.isin(labels, filtered_labels)).tolist()
         meta = MetaFactory.get_dataset_meta_from_existing(iterator.dataset_meta, identifier=identifier)
         return InformedDatasetFactory.get_dataset_iterator_view(iterator, meta, valid_indices)
 
@@ -35,12 +41,30 @@ class ModelGymInformedIteratorFactory(InformedDatasetFactory):
 
     @staticmethod
     def get_feature_encoded_iterators(identifier: str, iterators: Dict[str, InformedDatasetIteratorIF],
-                                      feature_encoding_configs: Dict[str, List[Any]]) -> Dict[str, DatasetIteratorIF]:
+                                      feature_encoding_configs: Dict[str, List[Any]], materialize: bool = False,
+                                      memmap_folder: str = None, fit_cache: FitCache = None,
+                                      iterators_key: str = None) -> Dict[str, DatasetIteratorIF]:
+        """If a `fit_cache` and the `iterators_key` identifying the upstream iterators are given, the fitted encoders are
+        loaded from the cache or fitted once and stored in the cache."""
         sample_position = list(iterators.items())[0][1].dataset_meta.sample_pos
         feature_encoder_post_processor = FeatureEncoderPostProcessor(
             sample_position=sample_position, feature_encoding_configs=feature_encoding_configs)
-        feature_encoder_post_processor.fit(iterators)
-        return {name: InformedDatasetFactory.get_dataset_iterator(PostProcessedDatasetIterator(iterator, feature_encoder_post_processor),
+        if fit_cache is not None and iterators_key is not None:
+            def fit() -> Dict[int, Encoder]:
+                feature_encoder_post_processor.fit(iterators)
+                return feature_encoder_post_processor.encoders
+
+            key = FitCache.get_key("feature_encoder", iterators_key, sample_position, feature_encoding_configs)
+            feature_encoder_post_processor.set_encoders(fit_cache.get_or_fit(key, fit, name=identifier))
+        else:
+            feature_encoder_post_processor.fit(iterators)
+
+        def get_iterator(iterator: DatasetIteratorIF) -> DatasetIteratorIF:
+            if materialize:
+                return MaterializedFeatureEncodedDatasetIterator(iterator, feature_encoder_post_processor, memmap_folder=memmap_folder)
+            return PostProcessedDatasetIterator(iterator, feature_encoder_post_processor)
+
+        return {name: InformedDatasetFactory.get_dataset_iterator(get_iterator(iterator),
                                                                   MetaFactory.get_dataset_meta_from_existing(iterator.dataset_meta,
                                                                                                              identifier=identifier))
                 for name, iterator in iterators.items()}
@@ -85,7 +109,7 @@ class ModelGymInformedIteratorFactory(InformedDatasetFactory):
             names = list(split_config.keys())
             ratios = list(split_config.values())
             if stratified:
-                splitter = SplitterFactory.get_stratified_splitter(ratios=ratios, seed=seed)
+                splitter = ModelGymSplitterFactory.get_stratified_splitter(ratios=ratios, seed=seed, target_pos=iterator.dataset_meta.target_pos)
             else:
                 splitter = SplitterFactory.get_random_splitter(ratios=ratios, seed=seed)
             splitted_iterators = splitter.split(iterator)
@@ -1,6 +1,9 @@
 from abc import ABC, abstractmethod
+import copy
+from enum import Enum
 import numpy as np
-from typing import Dict
+import zlib
+from typing import Dict, List
 from sklearn.preprocessing import StandardScaler
 
 
@@ -17,33 +20,102 @@ class Encoder(ABC):
     def get_output_size(self) -> int:
         raise NotImplementedError
 
+    @classmethod
+    def fit_columns(cls, values: np.ndarray, **params) -> List["Encoder"]:
+        """Fits one encoder per column of `values`. Encoders that can compute the statistics of all columns at once override this."""
+        encoders = []
+        for i in range(values.shape[1]):
+            encoder = cls(**params)
+            encoder.fit(values=values[:, i])
+            encoders.append(encoder)
+        return encoders
+
 
 class CategoricalEncoder(Encoder):
-    def __init__(self):
+    """Encodes categorical values either one-hot or, with `output_codes`, as integer codes (e.g., as input for embeddings).
+    The vocabulary is factorized at fit time, such that transform is a vectorized lookup. Values not seen during fit are
+    handled according to the `unseen_value_strategy`:
+        - RAISE: raises an exception
+        - OTHER: all unseen values are mapped to a single additional "other" category
+        - HASH: unseen values are hashed into `num_hash_buckets` additional categories
+    """
+
+    class UnseenValueStrategy(Enum):
+        RAISE = "raise"
+        OTHER = "other"
+        HASH = "hash"
+
+    max_lookup_size = 2**20
+
+    def __init__(self, unseen_value_strategy: str = "raise", num_hash_buckets: int = 16, output_codes: bool = False):
         super().__init__()
-        self.all_values: set = None
+        self.unseen_value_strategy = CategoricalEncoder.UnseenValueStrategy(unseen_value_strategy)
+        self.num_hash_buckets = num_hash_buckets
+        self.output_codes = output_codes
+        self.all_values: np.ndarray = None
         self.value_to_ix: Dict[str, int] = None
         self.ix_to_value: Dict[int, str] = None
+        self._code_lookup: np.ndarray = None
 
     def fit(self, values: np.ndarray):
-        self.all_values = np.unique(values.flatten())
+        values = np.asarray(values).flatten()
+        if np.issubdtype(values.dtype, np.integer) and len(values) > 0 and values.min() >= 0 and values.max() < self.max_lookup_size:
+            # equivalent to np.unique for small non-negative integers but without sorting
+            self.all_values = np.flatnonzero(np.bincount(values)).astype(values.dtype)
+        else:
+            self.all_values = np.unique(values)
         self.value_to_ix = {str(value): ix for ix, value in enumerate(self.all_values)}
         self.ix_to_value = {ix: str(value) for ix, value in enumerate(self.all_values)}
+        self._code_lookup = None
+        if np.issubdtype(self.all_values.dtype, np.integer) and len(self.all_values) > 0 and \
+                self.all_values[0] >= 0 and self.all_values[-1] < CategoricalEncoder.max_lookup_size:
+            self._code_lookup = np.full(self.all_values[-1] + 1, -1, dtype=np.int64)
+            self._code_lookup[self.all_values] = np.arange(len(self.all_values))
+
+    def get_vocabulary_size(self) -> int:
+        if self.unseen_value_strategy == CategoricalEncoder.UnseenValueStrategy.OTHER:
+            return len(self.all_values) + 1
+        elif self.unseen_value_strategy == CategoricalEncoder.UnseenValueStrategy.HASH:
+            return len(self.all_values) + self.num_hash_buckets
+        return len(self.all_values)
 
-    def transform(self, values: np.ndarray) -> np.ndarray:
-        def to_one_hot(value):
-            encoded = np.zeros(len(self.all_values))
-            encoded[self.value_to_ix[str(value)]] = 1
-            return encoded
-
+    def get_codes(self, values: np.ndarray) -> np.ndarray:
         if self.all_values is None:
             raise Exception("Please call fit() before transform()")
+        values = np.asarray(values).flatten()
+        if self._code_lookup is not None and np.issubdtype(values.dtype, np.integer):
+            # small non-negative integer vocabularies are encoded via a direct lookup table
+            in_range = (values >= 0) & (values < len(self._code_lookup))
+            codes = np.where(in_range, self._code_lookup[np.where(in_range, values, 0)], -1)
+            unseen = codes < 0
+        elif len(self.all_values) == 0:
+            # nothing was seen during fit
+            codes = np.zeros(len(values), dtype=np.int64)
+            unseen = np.ones(len(values), dtype=bool)
+        else:
+            codes = np.searchsorted(self.all_values, values)
+            unseen = self.all_values[np.minimum(codes, len(self.all_values) - 1)] != values
+        if unseen.any():
+            if self.unseen_value_strategy == CategoricalEncoder.UnseenValueStrategy.RAISE:
+                raise ValueError(f"Values {np.unique(values[unseen])} were not seen during fit().")
+            elif self.unseen_value_strategy == CategoricalEncoder.UnseenValueStrategy.OTHER:
+                codes[unseen] = len(self.all_values)
+            else:
+                # stable hash, python's hash() of strings changes between processes
+                codes[unseen] = [len(self.all_values) + zlib.crc32(str(value).encode()) % self.num_hash_buckets
+                                 for value in values[unseen]]
+        return codes
 
-        transformed = np.array([to_one_hot(value) for value in values.flatten()])
+    def transform(self, values: np.ndarray) -> np.ndarray:
+        codes = self.get_codes(values)
+        if self.output_codes:
+            return codes.reshape(-1, 1)
+        transformed = np.zeros((len(codes), self.get_vocabulary_size()))
+        transformed[np.arange(len(codes)), codes] = 1
         return transformed
 
     def get_output_size(self) -> int:
-        return len(self.all_values)
+        return 1 if self.output_codes else self.get_vocabulary_size()
 
 
 class ContinuousEncoder(Encoder):
@@ -55,6 +127,22 @@ class ContinuousEncoder(Encoder):
         self.sklearn_encoder = StandardScaler()
         self.sklearn_encoder.fit(np.expand_dims(values, axis=1))
 
+    @classmethod
+    def fit_columns(cls, values: np.ndarray, **params) -> List["ContinuousEncoder"]:
+        # the statistics of all columns are computed in a single pass and sliced into one scaler per column
+        scaler = StandardScaler().fit(values)
+        encoders = []
+        for i in range(values.shape[1]):
+            column_scaler = copy.copy(scaler)
+            column_scaler.mean_, column_scaler.var_, column_scaler.scale_ = scaler.mean_[i:i+1], scaler.var_[i:i+1], scaler.scale_[i:i+1]
+            if not np.isscalar(scaler.n_samples_seen_):
+                column_scaler.n_samples_seen_ = scaler.n_samples_seen_[i:i+1]
+            column_scaler.n_features_in_ = 1
+            encoder = cls(**params)
+            encoder.sklearn_encoder = column_scaler
+            encoders.append(encoder)
+        return encoders
+
     def transform(self, values: np.ndarray) -> np.ndarray:
         if self.sklearn_encoder is None:
             raise Exception("Please call fit() before transform()")
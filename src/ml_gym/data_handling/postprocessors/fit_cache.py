@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Callable
+from ml_gym.util.logger import ConsoleLogger, LogLevel
+
+
+class FitCache:
+    """Persists the fitted state of postprocessors (e.g., the encoders of the `FeatureEncoderPostProcessor`) within `folder`,
+    such that the jobs of a grid search fit the state once and load it afterwards.
+
+    The entries are keyed by the hash of the postprocessor config and the identity of the upstream iterators, i.e., the hash of
+    the config of the component producing them (see `Requirement.component_key`). Fitting an entry is guarded by a file lock,
+    so concurrent processes wait for the process fitting the entry instead of fitting it as well.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.logger = ConsoleLogger("logger_fit_cache")
+        os.makedirs(folder, exist_ok=True)
+
+    @staticmethod
+    def get_key(*key_parts: Any) -> str:
+        serialized_parts = json.dumps(key_parts, sort_keys=True, default=str)
+        return hashlib.sha1(serialized_parts.encode("utf-8")).hexdigest()
+
+    def _get_entry_path(self, key: str) -> str:
+        return os.path.join(self.folder, f"{key}.pkl")
+
+    def _load(self, key: str) -> Any:
+        try:
+            with open(self._get_entry_path(key), "rb") as fd:
+                return pickle.load(fd)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def _store(self, key: str, value: Any):
+        # the entry is written to a temporary file and renamed, so readers never see incomplete entries
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{key}_", dir=self.folder)
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                pickle.dump(value, tmp_file)
+            os.replace(tmp_path, self._get_entry_path(key))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    @contextmanager
+    def _lock(self, key: str):
+        # the lock is released by the operating system, if the process holding it dies
+        with open(os.path.join(self.folder, f".{key}.lock"), "a") as lock_file:
+            FitCache._acquire(lock_file)
+            try:
+                yield
+            finally:
+                FitCache._release(lock_file)
+
+    @staticmethod
+    def _acquire(lock_file):
+        # the locking modules are platform specific and thus imported lazily
+        if os.name == "nt":
+            import msvcrt
+            lock_file.seek(0)
+            while True:
+                try:
+                    # gives up after 10 attempts, so we keep trying until the lock is released
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    return
+                except OSError:
+                    continue
+        else:
+            import fcntl
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+    @staticmethod
+    def _release(lock_file):
+        if os.name == "nt":
+            import msvcrt
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get_or_fit(self, key: str, fit_fun: Callable[[], Any], name: str = "") -> Any:
+        """Returns the cached state of `key` or fits it via `fit_fun` and stores it."""
+        value = self._load(key)
+        if value is None:
+            with self._lock(key):
+                # another process might have fitted the entry while waiting for the lock
+                value = self._load(key)
+                if value is None:
+                    self.logger.log(LogLevel.INFO, f"Fit cache miss for {name} ({key}).")
+                    value = fit_fun()
+                    self._store(key, value)
+                    return value
+        self.logger.log(LogLevel.INFO, f"Fit cache hit for {name} ({key}).")
+        return value
@@ -0,0 +1,170 @@
+import functools
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Dict, List, Sequence, Tuple, Type
+import torch
+from ml_gym.batching.batch import DatasetBatch
+from ml_gym.data_handling.postprocessors.collator import Collator
+
+
+@dataclass
+class StackingCollator(Collator):
+    """Base class of the generic collators. The samples, targets and tags are stacked on the host and each batch tensor is
+    copied to `device` at once, instead of copying each sample separately.
+
+    If `pin_memory` is set and `device` is a CUDA device, the tensors are stacked into pinned host buffers, which are reused
+    across batches, and with `non_blocking` the copies to the device are asynchronous. Before a buffer is reused, the copy
+    from it is awaited. Within data loader workers the collator stays on the CPU and no buffers are used.
+    """
+    label_preserving = True
+
+    target_publication_key: str = None
+    sample_position: int = 0
+    target_position: int = 1
+    tag_position: int = 2
+    pin_memory: bool = False
+    non_blocking: bool = False
+    _buffers: Dict[str, torch.Tensor] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _buffer_events: Dict[str, Any] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def __getstate__(self):
+        # the pinned buffers and CUDA events are process local and not passed to the data loader workers
+        state = self.__dict__.copy()
+        state["_buffers"] = {}
+        state["_buffer_events"] = {}
+        return state
+
+    @property
+    def uses_buffers(self) -> bool:
+        return self.pin_memory and self.device.type == "cuda"
+
+    def _get_buffer(self, key: str, shape: Tuple[int], dtype: torch.dtype) -> torch.Tensor:
+        # the copy of the previous batch from the buffer must be finished before the buffer is overwritten
+        event = self._buffer_events.pop(key, None)
+        if event is not None:
+            event.synchronize()
+        num_elements = int(torch.Size(shape).numel())
+        buffer = self._buffers.get(key)
+        if buffer is None or buffer.dtype != dtype or len(buffer) < num_elements:
+            buffer = torch.empty(num_elements, dtype=dtype).pin_memory()
+            self._buffers[key] = buffer
+        return buffer[:num_elements].view(shape)
+
+    def _stack(self, key: str, values: Sequence[Any]) -> torch.Tensor:
+        is_tensor = [isinstance(value, torch.Tensor) for value in values]
+        if not any(is_tensor):
+            return torch.as_tensor(values)
+        if not all(is_tensor):
+            # e.g., the label mapper replaces the mapped tensor labels by plain labels
+            tensors = [torch.as_tensor(value) for value in values]
+            dtype = functools.reduce(torch.promote_types, [tensor.dtype for tensor in tensors])
+            values = [tensor.to(dtype) for tensor in tensors]
+        if not self.uses_buffers:
+            return torch.stack(values)
+        out = self._get_buffer(key, (len(values),) + tuple(values[0].shape), values[0].dtype)
+        return torch.stack(values, out=out)
+
+    def _pad(self, key: str, values: Sequence[torch.Tensor], padding_value: float) -> torch.Tensor:
+        shape = (len(values), max(len(value) for value in values)) + tuple(values[0].shape[1:])
+        out = self._get_buffer(key, shape, values[0].dtype) if self.uses_buffers else torch.empty(shape, dtype=values[0].dtype)
+        out.fill_(padding_value)
+        for i, value in enumerate(values):
+            out[i, :len(value)] = value
+        return out
+
+    def _transfer(self, key: str, tensor: torch.Tensor) -> torch.Tensor:
+        if self.device.type == "cpu":
+            return tensor
+        transferred = tensor.to(self.device, non_blocking=self.non_blocking)
+        if key in self._buffers:
+            self._buffer_events[key] = torch.cuda.current_stream(self.device).record_event()
+        return transferred
+
+    def _collate_samples(self, samples: List[Any]) -> Dict[str, torch.Tensor]:
+        """Returns the stacked host tensors of the samples by key, which are published by `_publish_samples`.
+        The buffer keys of the samples are prefixed with `sample_` (see `_get_sample_buffer_key`)."""
+        raise NotImplementedError
+
+    @staticmethod
+    def _get_sample_buffer_key(key: str) -> str:
+        return f"sample_{key}"
+
+    def _publish_samples(self, sample_tensors: Dict[str, torch.Tensor]) -> Any:
+        return sample_tensors
+
+    def __call__(self, batch: List[Tuple[Any]]) -> DatasetBatch:
+        sample_tensors = self._collate_samples([item[self.sample_position] for item in batch])
+        target = self._stack("target", [item[self.target_position] for item in batch])
+        tags = self._stack("tags", [item[self.tag_position] for item in batch]) if self.tag_position < len(batch[0]) else torch.Tensor()
+        sample_tensors = {key: self._transfer(self._get_sample_buffer_key(key), tensor) for key, tensor in sample_tensors.items()}
+        return DatasetBatch(samples=self._publish_samples(sample_tensors),
+                            targets={self.target_publication_key: self._transfer("target", target)},
+                            tags=self._transfer("tags", tags))
+
+
+@dataclass
+class TensorCollator(StackingCollator):
+    """Stacks samples that are tensors of equal shape."""
+
+    def _collate_samples(self, samples: List[torch.Tensor]) -> Dict[str, torch.Tensor]:
+        return {"samples": self._stack(self._get_sample_buffer_key("samples"), samples)}
+
+    def _publish_samples(self, sample_tensors: Dict[str, torch.Tensor]) -> torch.Tensor:
+        return sample_tensors["samples"]
+
+
+@dataclass
+class TupleCollator(StackingCollator):
+    """Stacks samples that are tuples of tensors elementwise. The batch samples are a dict which maps the
+    `sample_publication_keys` (the element indices by default) to the stacked elements."""
+    sample_publication_keys: List[str] = None
+
+    def _collate_samples(self, samples: List[Sequence[torch.Tensor]]) -> Dict[str, torch.Tensor]:
+        keys = self.sample_publication_keys if self.sample_publication_keys is not None else [str(i) for i in range(len(samples[0]))]
+        return {key: self._stack(self._get_sample_buffer_key(key), [sample[i] for sample in samples])
+                for i, key in enumerate(keys)}
+
+
+@dataclass
+class DictCollator(StackingCollator):
+    """Stacks samples that are dicts of tensors keywise."""
+
+    def _collate_samples(self, samples: List[Dict[str, torch.Tensor]]) -> Dict[str, torch.Tensor]:
+        return {key: self._stack(self._get_sample_buffer_key(key), [sample[key] for sample in samples])
+                for key in samples[0].keys()}
+
+
+@dataclass
+class RaggedCollator(StackingCollator):
+    """Pads samples of different lengths (i.e., first dimension) with `padding_value` to the longest sample of the batch.
+    The batch samples are a dict with the padded samples and their lengths."""
+    padding_value: float = 0
+    sample_publication_key: str = "samples"
+    lengths_publication_key: str = "lengths"
+
+    def _collate_samples(self, samples: List[torch.Tensor]) -> Dict[str, torch.Tensor]:
+        padded_samples = self._pad(self._get_sample_buffer_key(self.sample_publication_key), samples, self.padding_value)
+        return {self.sample_publication_key: padded_samples,
+                self.lengths_publication_key: torch.as_tensor([len(sample) for sample in samples])}
+
+
+class CollatorFactory:
+
+    class CollatorTypes(Enum):
+        TENSOR = "tensor"
+        TUPLE = "tuple"
+        DICT = "dict"
+        RAGGED = "ragged"
+
+    collator_types: Dict[CollatorTypes, Type[StackingCollator]] = {CollatorTypes.TENSOR: TensorCollator,
+                                                                   CollatorTypes.TUPLE: TupleCollator,
+                                                                   CollatorTypes.DICT: DictCollator,
+                                                                   CollatorTypes.RAGGED: RaggedCollator}
+
+    @staticmethod
+    def get_collator_type(layout: str) -> Type[StackingCollator]:
+        return CollatorFactory.collator_types[CollatorFactory.CollatorTypes(layout)]
+
+    @staticmethod
+    def get_collator(layout: str, **params) -> StackingCollator:
+        return CollatorFactory.get_collator_type(layout)(**params)
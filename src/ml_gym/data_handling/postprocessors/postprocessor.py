@@ -13,6 +13,16 @@ class PostProcessorIf(ABC):
     def postprocess(self, sample: Tuple[Any]) -> Tuple[Any]:
         raise NotImplementedError
 
+    def postprocess_items(self, samples: List[Tuple[Any]]) -> List[Tuple[Any]]:
+        """Postprocesses a batch of samples. Postprocessors that can work on the whole batch at once override this method."""
+        return [self.postprocess(sample) for sample in samples]
+
+    def postprocess_label_index(self, label_index: np.ndarray, label_pos: int) -> np.ndarray:
+        """Applies the postprocessing to the labels at position `label_pos` of all samples at once.
+        Returns None, if the postprocessed labels cannot be derived from the label index.
+        """
+        return None
+
 
 class FittablePostProcessorIf(PostProcessorIf):
 
@@ -48,10 +58,45 @@ class LabelMapperPostProcessor(PostProcessorIf):
                 sample[self.tag_position] = mapping.new_label
         return tuple(sample)
 
+    def postprocess_items(self, samples: List[Tuple[Any]]) -> List[Tuple[Any]]:
+        sample_lists = [list(sample) for sample in samples]
+        for position in dict.fromkeys([self.target_position, self.tag_position]):
+            labels = np.asarray([sample[position].item() if isinstance(sample[position], torch.Tensor) and sample[position].numel() == 1
+                                 else sample[position] for sample in samples])
+            try:
+                labels = labels.astype(np.result_type(labels, *[np.asarray(mapping.new_label) for mapping in self.mappings]))
+            except TypeError:
+                return super().postprocess_items(samples)
+            if labels.dtype == object or labels.ndim != 1:
+                return super().postprocess_items(samples)
+            for mapping in self.mappings:
+                # the mappings are applied in sequence, i.e., a label mapped by an earlier mapping can be mapped again.
+                for i in np.flatnonzero(np.isin(labels, mapping.previous_labels)):
+                    sample_lists[i][position] = mapping.new_label
+                    labels[i] = mapping.new_label
+        return [tuple(sample_list) for sample_list in sample_lists]
+
+    def postprocess_label_index(self, label_index: np.ndarray, label_pos: int) -> np.ndarray:
+        if label_pos not in [self.target_position, self.tag_position]:
+            return label_index
+        mapped_label_index = label_index.copy() if label_index.dtype != object else label_index.astype(object)
+        for mapping in self.mappings:
+            # the mappings are applied in sequence, i.e., a label mapped by an earlier mapping can be mapped again.
+            mask = np.isin(mapped_label_index, mapping.previous_labels)
+            if mask.any():
+                try:
+                    dtype = np.result_type(mapped_label_index, np.asarray(mapping.new_label))
+                except TypeError:
+                    dtype = object
+                mapped_label_index = mapped_label_index.astype(dtype, copy=False)
+                mapped_label_index[mask] = mapping.new_label
+        return mapped_label_index
+
 
 class FeatureEncoderPostProcessor(FittablePostProcessorIf):
 
     def __init__(self, sample_position: int, feature_encoding_configs: Dict[str, List[Any]], custom_encoders: Dict[str, Encoder] = None, sequential=False):
+        self._state_version = 0
         self.sample_position = sample_position
         self.feature_encoding_configs = feature_encoding_configs
         self.feature_encoder_mapping: Dict[str, Encoder] = {"categorical": CategoricalEncoder, "continuous": ContinuousEncoder}
@@ -60,51 +105,85 @@ class FeatureEncoderPostProcessor(FittablePostProcessorIf):
         self.encoders: Dict[int, Encoder] = {}
         self.sequential = sequential
 
-    def fit(self, iterators: Dict[str, DatasetIteratorIF]):
+    @property
+    def feature_encoding_configs(self) -> List[Dict[str, Any]]:
+        return self._feature_encoding_configs
+
+    @feature_encoding_configs.setter
+    def feature_encoding_configs(self, feature_encoding_configs: List[Dict[str, Any]]):
+        self._feature_encoding_configs = feature_encoding_configs
+        self._state_version += 1
 
-        def fit_sequential(iterators: Dict[str, DatasetIteratorIF]):
-            encoders = {}
-            for config in tqdm.tqdm(self.feature_encoding_configs, desc="Encoding Progress"):
-                encoder_class = self.feature_encoder_mapping[config["feature_type"]]
-                feature_indices = config["feature_names"]
-                iterator = iterators[config["train_split"]]
-                for feature_indice in tqdm.tqdm(feature_indices, desc="Feature type encoding"):
-                    values = np.array([row[self.sample_position][feature_indice] for row in iterator])
-                    encoder = encoder_class()
-                    encoder.fit(values=values)
-                    encoders[feature_indice] = encoder
-            return encoders
-
-        def fit_parallel(iterators: Dict[str, DatasetIteratorIF]):
-            encoders = {}
-            for config in tqdm.tqdm(self.feature_encoding_configs, desc="Encoding Progress"):
-                encoder_class = self.feature_encoder_mapping[config["feature_type"]]
-                feature_indices = config["feature_names"]
-                iterator = iterators[config["train_split"]]
-                subset_encoders = [encoder_class() for feature_indice in feature_indices]
-                values = np.stack([row[self.sample_position][feature_indices] for row in iterator])
-
-                for i in range(len(subset_encoders)):
-                    subset_encoders[i].fit(values=values[:, i])
-                    encoders[feature_indices[i]] = subset_encoders[i]
-            return encoders
+    @property
+    def state_version(self) -> int:
+        """Changes whenever the encoding config or the fitted encoders change. Used to invalidate materialized encodings."""
+        return self._state_version
 
+    def fit(self, iterators: Dict[str, DatasetIteratorIF]):
+        # the statistics of all features of a config are computed at once (see `Encoder.fit_columns`). By default, the sample
+        # inputs of each train split are collected in a single sweep. With `sequential`, the split is swept once per config and
+        # only the features of the config are kept, which trades additional sweeps for memory.
+        train_splits = list(dict.fromkeys(config["train_split"] for config in self.feature_encoding_configs))
+        split_inputs = {} if self.sequential else \
+            {split_name: self._collect_sample_inputs(iterators[split_name]) for split_name in train_splits}
+        encoders = {}
+        for config in tqdm.tqdm(self.feature_encoding_configs, desc="Encoding Progress"):
+            encoder_class = self.feature_encoder_mapping[config["feature_type"]]
+            feature_indices = config["feature_names"]
+            if self.sequential:
+                values = self._collect_sample_inputs(iterators[config["train_split"]], feature_indices)
+            else:
+                values = split_inputs[config["train_split"]][:, feature_indices]
+            encoders.update(zip(feature_indices, encoder_class.fit_columns(values, **config.get("encoder_params", {}))))
+        self.set_encoders(encoders)
+
+    def _collect_sample_inputs(self, iterator: DatasetIteratorIF, feature_indices: List[int] = None) -> np.ndarray:
         if self.sequential:
-            encoders = fit_sequential(iterators)
+            # iterates over the samples instead of accessing them by index
+            sample_inputs = (np.asarray(row[self.sample_position]) for row in iterator)
         else:
-            encoders = fit_parallel(iterators)
+            sample_inputs = (np.asarray(iterator[i][self.sample_position]) for i in range(len(iterator)))
+        if feature_indices is not None:
+            # only the selected features are kept, such that the full sample inputs are never held at once
+            sample_inputs = (sample_input[feature_indices] for sample_input in sample_inputs)
+        return np.stack(list(sample_inputs))
+
+    def set_encoders(self, encoders: Dict[int, Encoder]):
         # order the encoders by their keys, as of python 3.6 insertion order equals iteration order
         self.encoders = {name: encoder for name, encoder in sorted(encoders.items(), key=lambda x: x[0])}
+        self._state_version += 1
 
     def postprocess(self, sample: Tuple[Any]) -> Tuple[Any]:
         if not self.encoders:
             return sample
         sample = list(sample)  # need to make this a list because index assignment is not possible with tuples
         sample_input: torch.Tensor = sample[self.sample_position]
-        sample[self.sample_position] = torch.from_numpy(np.hstack([self.encoders[pos].transform(np.array([val])).flatten()
-                                                                   if pos in self.encoders.keys() else val for pos, val in enumerate(sample_input)]))
+        encoded_input = np.hstack([self.encoders[pos].transform(np.array([val])).flatten()
+                                   if pos in self.encoders.keys() else val for pos, val in enumerate(sample_input)])
+        # float32 as in `encode_samples`
+        sample[self.sample_position] = torch.from_numpy(encoded_input.astype(np.float32, copy=False))
         return tuple(sample)
 
+    def encode_samples(self, sample_inputs: np.ndarray) -> np.ndarray:
+        """Vectorized version of `postprocess` for a matrix of sample inputs of shape (num_samples, num_features).
+        The encoded samples are float32, such that the materialized encodings take half the memory."""
+        columns = [self.encoders[pos].transform(sample_inputs[:, pos]) if pos in self.encoders else sample_inputs[:, pos:pos+1]
+                   for pos in range(sample_inputs.shape[1])]
+        return np.hstack(columns).astype(np.float32, copy=False)
+
+    def postprocess_items(self, samples: List[Tuple[Any]]) -> List[Tuple[Any]]:
+        if not self.encoders or len(samples) == 0:
+            return samples
+        sample_inputs = np.stack([np.asarray(sample[self.sample_position]) for sample in samples])
+        encoded_rows = torch.from_numpy(self.encode_samples(sample_inputs)).unbind(0)
+        samples = [list(sample) for sample in samples]
+        for sample, encoded_row in zip(samples, encoded_rows):
+            sample[self.sample_position] = encoded_row
+        return [tuple(sample) for sample in samples]
+
+    def postprocess_label_index(self, label_index: np.ndarray, label_pos: int) -> np.ndarray:
+        return label_index if label_pos != self.sample_position else None
+
     def get_output_pattern(self):
         rep = ""
         lower = 0
@@ -126,3 +205,14 @@ class OneHotEncodedTargetPostProcessor(PostProcessorIf):
         sample_list = list(sample)
         sample_list[self.target_position] = target_vector
         return tuple(sample_list)
+
+    def postprocess_items(self, samples: List[Tuple[Any]]) -> List[Tuple[Any]]:
+        target_vectors = torch.zeros(len(samples), self.target_vector_size)
+        target_vectors[torch.arange(len(samples)), torch.as_tensor([int(sample[self.target_position]) for sample in samples])] = 1
+        sample_lists = [list(sample) for sample in samples]
+        for sample_list, target_vector in zip(sample_lists, target_vectors.unbind(0)):
+            sample_list[self.target_position] = target_vector
+        return [tuple(sample_list) for sample_list in sample_lists]
+
+    def postprocess_label_index(self, label_index: np.ndarray, label_pos: int) -> np.ndarray:
+        return label_index if label_pos != self.target_position else None
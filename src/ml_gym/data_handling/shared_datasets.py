@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import weakref
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Set
+import torch
+from data_stack.dataset.iterator import InformedDatasetIteratorIF
+from data_stack.dataset.factory import InformedDatasetFactory
+from data_stack.dataset.meta import DatasetMeta
+from ml_gym.data_handling.iterators import SharedMemoryDatasetIterator
+
+if TYPE_CHECKING:
+    # the blueprints import the component factory, which imports this module
+    from ml_gym.blueprints.blue_prints import BluePrint
+
+
+@dataclass
+class SharedDatasetHandle:
+    """Picklable reference to the materialized splits of a dataset component, which is sent to the worker processes."""
+    component_key: str
+    split_folders: Dict[str, str]
+    split_metas: Dict[str, DatasetMeta]
+
+    def attach(self) -> Dict[str, InformedDatasetIteratorIF]:
+        return {split_name: InformedDatasetFactory.get_dataset_iterator(SharedMemoryDatasetIterator(folder), self.split_metas[split_name])
+                for split_name, folder in self.split_folders.items()}
+
+
+class SharedDatasetRegistry:
+    """Process wide registry of the materialized dataset components. When building a component of one of the
+    `component_type_keys`, the `ComponentFactory` attaches to the registered splits instead of building the component
+    (and its requirements) again. The components are identified by the hash of their config and the configs of their requirements.
+    """
+
+    component_type_keys = {"DATASET_ITERATORS", "IN_MEMORY_DATASET_ITERATORS"}
+    _handles: Dict[str, SharedDatasetHandle] = {}
+
+    @staticmethod
+    def register(handles: List[SharedDatasetHandle]):
+        for handle in handles:
+            SharedDatasetRegistry._handles[handle.component_key] = handle
+
+    @staticmethod
+    def clear():
+        SharedDatasetRegistry._handles.clear()
+
+    @staticmethod
+    def get_pipeline_config(component_config: Dict[str, Any], component_name: str) -> Dict[str, Any]:
+        """Returns the configs of the component and of all the components it requires."""
+        pipeline_config = {}
+        component_names = [component_name]
+        while component_names:
+            name = component_names.pop()
+            if name not in pipeline_config:
+                pipeline_config[name] = component_config[name]
+                component_names.extend(requirement["component_name"] for requirement in component_config[name].get("requirements", []))
+        return pipeline_config
+
+    @staticmethod
+    def get_component_key(component_config: Dict[str, Any], component_name: str) -> str:
+        pipeline_config = SharedDatasetRegistry.get_pipeline_config(component_config, component_name)
+        serialized_config = json.dumps([component_name, pipeline_config], sort_keys=True, default=str)
+        return hashlib.sha1(serialized_config.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def get_outermost_component_names(component_config: Dict[str, Any], component_type_keys: Set[str]) -> List[str]:
+        """Returns the names of the components of the `component_type_keys` that are required by at least one component
+        of another type. Components whose pipeline config contains injectables are skipped, as the injected values
+        (e.g., the experiment id) differ between the experiments and are not part of the key."""
+        component_configs = {name: config for name, config in component_config.items()
+                             if isinstance(config, dict) and "component_type_key" in config}
+        outermost_names = set()
+        for config in component_configs.values():
+            if config["component_type_key"] in component_type_keys:
+                continue
+            for requirement in config.get("requirements", []):
+                if component_configs.get(requirement["component_name"], {}).get("component_type_key") in component_type_keys:
+                    outermost_names.add(requirement["component_name"])
+        return [name for name in component_configs if name in outermost_names
+                and not SharedDatasetRegistry.has_injectables(SharedDatasetRegistry.get_pipeline_config(component_config, name))]
+
+    @staticmethod
+    def has_injectables(tree: Any) -> bool:
+        if isinstance(tree, dict):
+            return "injectable" in tree or any(SharedDatasetRegistry.has_injectables(sub_tree) for sub_tree in tree.values())
+        elif isinstance(tree, list):
+            return any(SharedDatasetRegistry.has_injectables(sub_tree) for sub_tree in tree)
+        return False
+
+    @staticmethod
+    def attach(component_config: Dict[str, Any], component_name: str) -> Dict[str, InformedDatasetIteratorIF]:
+        """Returns the shared splits of the component or None, if the component was not materialized."""
+        if not SharedDatasetRegistry._handles or \
+                component_config[component_name].get("component_type_key") not in SharedDatasetRegistry.component_type_keys:
+            return None
+        handle = SharedDatasetRegistry._handles.get(SharedDatasetRegistry.get_component_key(component_config, component_name))
+        return handle.attach() if handle is not None else None
+
+
+class SharedDatasetStore:
+    """Materializes the dataset components of blueprints once within the parent process into `folder` (/dev/shm by default),
+    from where the worker processes attach to them read-only.
+
+    The store folder is owned by the parent process. It is removed by `cleanup()`, when the store is garbage collected or
+    at interpreter exit. Crashing workers leave nothing behind, as they only map the files. Folders of parent processes that
+    are not alive anymore (e.g., killed) are removed when the next store is created within the same folder.
+    """
+
+    folder_prefix = "mlgym_shared_datasets_"
+
+    def __init__(self, folder: str = None):
+        if folder is None:
+            folder = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        os.makedirs(folder, exist_ok=True)
+        SharedDatasetStore._remove_stale_folders(folder)
+        self.path = tempfile.mkdtemp(prefix=f"{SharedDatasetStore.folder_prefix}{os.getpid()}_", dir=folder)
+        self.handles: Dict[str, SharedDatasetHandle] = {}
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.path, True)
+
+    @staticmethod
+    def _remove_stale_folders(folder: str):
+        for entry in os.listdir(folder):
+            if not entry.startswith(SharedDatasetStore.folder_prefix):
+                continue
+            try:
+                pid = int(entry[len(SharedDatasetStore.folder_prefix):].split("_")[0])
+                os.kill(pid, 0)
+            except ValueError:
+                continue
+            except ProcessLookupError:
+                shutil.rmtree(os.path.join(folder, entry), ignore_errors=True)
+            except PermissionError:
+                # the process is alive but owned by another user
+                continue
+
+    def materialize(self, component_key: str, iterators: Dict[str, InformedDatasetIteratorIF]) -> SharedDatasetHandle:
+        if component_key not in self.handles:
+            split_folders = {}
+            for split_id, (split_name, iterator) in enumerate(iterators.items()):
+                split_folders[split_name] = os.path.join(self.path, component_key, str(split_id))
+                SharedMemoryDatasetIterator.materialize(iterator, split_folders[split_name])
+            split_metas = {split_name: iterator.dataset_meta for split_name, iterator in iterators.items()}
+            self.handles[component_key] = SharedDatasetHandle(component_key=component_key, split_folders=split_folders,
+                                                              split_metas=split_metas)
+        return self.handles[component_key]
+
+    def materialize_blueprints(self, blueprints: List["BluePrint"]) -> List[SharedDatasetHandle]:
+        """Materializes the outermost components of the `SharedDatasetRegistry.component_type_keys` of each blueprint,
+        i.e., the components that are required by at least one component of another type."""
+        for blueprint in blueprints:
+            # multi model blueprints build the components of their wrapped blueprints
+            for experiment_blueprint in getattr(blueprint, "blue_prints", [blueprint]):
+                config = experiment_blueprint.config
+                for component_name in SharedDatasetRegistry.get_outermost_component_names(config, SharedDatasetRegistry.component_type_keys):
+                    component_key = SharedDatasetRegistry.get_component_key(config, component_name)
+                    if component_key in self.handles:
+                        continue
+                    components = type(experiment_blueprint).construct_components(config=config, component_names=[component_name],
+                                                                                 device=torch.device("cpu"),
+                                                                                 external_injection=experiment_blueprint.external_injection)
+                    self.materialize(component_key, components[component_name])
+        return list(self.handles.values())
+
+    def cleanup(self):
+        self.handles = {}
+        self._finalizer()
@@ -0,0 +1,38 @@
+from typing import List, Optional
+import numpy as np
+from data_stack.dataset.iterator import DatasetIteratorIF
+from data_stack.dataset.splitter import StratifiedSplitterImpl, Splitter
+from sklearn.model_selection import train_test_split
+from ml_gym.data_handling.label_index import LabelIndexFactory
+
+
+class LabelIndexStratifiedSplitterImpl(StratifiedSplitterImpl):
+    """Stratified splitter that reads the targets from the label index instead of iterating over all samples."""
+
+    def __init__(self, ratios: List[float], seed: Optional[int] = None, target_pos: int = 1):
+        super().__init__(ratios=ratios, seed=seed)
+        self.target_pos = target_pos
+
+    def _determine_split_indices(self, dataset_length: int, ratios: List[float], dataset_iterator: DatasetIteratorIF) \
+            -> List[List[int]]:
+        indices_remaining = np.arange(dataset_length)
+        targets_remaining = LabelIndexFactory.get_label_index(dataset_iterator, self.target_pos)
+
+        split_indices: List[List[int]] = []
+        for split_ratio in ratios[:-1]:
+            indices_split, indices_remaining, _, targets_remaining = train_test_split(indices_remaining,
+                                                                                      targets_remaining,
+                                                                                      train_size=int(dataset_length*split_ratio),
+                                                                                      stratify=targets_remaining,
+                                                                                      random_state=self.seed, shuffle=True)
+            split_indices.append(indices_split.tolist())
+        # any remaining indices are added to the last split
+        split_indices.append(indices_remaining.tolist())
+        return split_indices
+
+
+class ModelGymSplitterFactory:
+
+    @staticmethod
+    def get_stratified_splitter(ratios: List[float], seed: int, target_pos: int = 1) -> Splitter:
+        return Splitter(splitter_impl=LabelIndexStratifiedSplitterImpl(ratios, seed=seed, target_pos=target_pos))
@@ -0,0 +1,137 @@
+import glob
+import os
+from typing import Any, Dict, Iterator, List, Tuple
+import numpy as np
+import torch
+from torch.utils.data import IterableDataset, get_worker_info
+from data_stack.dataset.meta import DatasetMeta
+
+
+class ShardReader:
+    """Reads the `columns` of a shard file into one array per column. Supports npz files (columns are the array names) and
+    parquet files, which require pyarrow."""
+
+    @staticmethod
+    def read_columns(path: str, columns: List[str]) -> List[np.ndarray]:
+        if path.endswith(".npz"):
+            with np.load(path, allow_pickle=False) as shard:
+                return [shard[column] for column in columns]
+        elif path.endswith(".parquet"):
+            try:
+                import pyarrow.parquet as pq
+            except ImportError as e:
+                raise ImportError("Reading parquet shards requires pyarrow.") from e
+            table = pq.read_table(path, columns=columns)
+            arrays = [table.column(column).to_numpy(zero_copy_only=False) for column in columns]
+            # list columns (e.g., feature vectors) are returned as object arrays of arrays
+            return [np.stack(array) if array.dtype == object and len(array) > 0 and isinstance(array[0], np.ndarray) else array
+                    for array in arrays]
+        raise ValueError(f"Unsupported shard format of {path}, expected .npz or .parquet.")
+
+    @staticmethod
+    def get_num_samples(path: str, columns: List[str]) -> int:
+        if path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+            return pq.ParquetFile(path).metadata.num_rows
+        return len(ShardReader.read_columns(path, columns[:1])[0])
+
+
+class ShardedIterableDataset(IterableDataset):
+    """Streams the samples of a dataset that is stored in shard files and does not fit into memory. Only one shard per worker is
+    loaded at a time. The samples are tuples with one entry per column (numeric columns as tensors), like the samples of the
+    map-style iterators.
+
+    If `shuffle` is set, the shard order is permuted per epoch and the samples are shuffled within a bounded buffer of
+    `shuffle_buffer_size` samples. With multiple data loader workers, each worker reads every `num_workers`-th shard of the
+    epoch's shard order. Shuffling is seeded by `seed`, the epoch and the worker id, so the sample stream is deterministic for a
+    fixed number of workers.
+
+    The position within the epoch is kept as the number of batches consumed (see `state_dict`), which is maintained by the
+    `DatasetLoader`. When resuming, each worker skips the samples of its batches that were consumed already. The batches are
+    assigned to the workers assuming that the data loader collects them strictly round robin, which holds until the first
+    worker runs out of samples. Hence, with multiple workers, resuming is only exact for positions before the shortest worker
+    stream ends (e.g., at any position, if the shards are of equal size and their number is a multiple of the workers).
+
+    The length is approximate (the number of samples of the first shard times the number of shards) unless `num_samples`
+    is given and only used for progress reporting and preallocation.
+    """
+
+    def __init__(self, shard_paths: List[str], dataset_meta: DatasetMeta, columns: List[str], shuffle: bool = False,
+                 shuffle_buffer_size: int = 10000, seed: int = 0, num_samples: int = None):
+        super().__init__()
+        if not shard_paths:
+            raise ValueError(f"No shards given for dataset {dataset_meta.dataset_name} ({dataset_meta.dataset_tag}).")
+        self.shard_paths = list(shard_paths)
+        self.dataset_meta = dataset_meta
+        self.columns = columns
+        self.shuffle = shuffle
+        self.shuffle_buffer_size = shuffle_buffer_size
+        self.seed = seed
+        self._num_samples = num_samples
+        self.epoch = 0
+        self.num_batches = 0
+        # set by the DatasetLoader, the resume position is given in batches
+        self.batch_size = 1
+
+    @staticmethod
+    def from_pattern(shard_pattern: str, dataset_meta: DatasetMeta, columns: List[str], **kwargs) -> "ShardedIterableDataset":
+        return ShardedIterableDataset(sorted(glob.glob(os.path.expanduser(shard_pattern))), dataset_meta, columns, **kwargs)
+
+    def __len__(self) -> int:
+        if self._num_samples is None:
+            self._num_samples = ShardReader.get_num_samples(self.shard_paths[0], self.columns) * len(self.shard_paths)
+        return self._num_samples
+
+    def set_epoch(self, epoch: int):
+        self.epoch = epoch
+        self.num_batches = 0
+
+    def state_dict(self) -> Dict[str, int]:
+        return {"epoch": self.epoch, "num_batches": self.num_batches}
+
+    def load_state_dict(self, state_dict: Dict[str, int]):
+        self.epoch = state_dict["epoch"]
+        self.num_batches = state_dict["num_batches"]
+
+    def get_shard_order(self) -> List[int]:
+        order = np.arange(len(self.shard_paths))
+        if self.shuffle:
+            order = np.random.default_rng([self.seed, self.epoch]).permutation(order)
+        return order.tolist()
+
+    @staticmethod
+    def _to_tensor(column: np.ndarray) -> Any:
+        return torch.from_numpy(column) if column.dtype.kind in "biufc" else column.tolist()
+
+    def _iter_shards(self, shard_ids: List[int]) -> Iterator[Tuple]:
+        for shard_id in shard_ids:
+            columns = ShardReader.read_columns(self.shard_paths[shard_id], self.columns)
+            columns = [ShardedIterableDataset._to_tensor(column) for column in columns]
+            yield from zip(*columns)
+
+    def _shuffle(self, samples: Iterator[Tuple], rng: np.random.Generator) -> Iterator[Tuple]:
+        buffer = []
+        for sample in samples:
+            if len(buffer) < self.shuffle_buffer_size:
+                buffer.append(sample)
+                continue
+            i = rng.integers(len(buffer))
+            yield buffer[i]
+            buffer[i] = sample
+        rng.shuffle(buffer)
+        yield from buffer
+
+    def __iter__(self) -> Iterator[Tuple]:
+        worker_info = get_worker_info()
+        worker_id, num_workers = (worker_info.id, worker_info.num_workers) if worker_info is not None else (0, 1)
+        # The data loader collects the batches of the workers round robin, starting with the first worker. When resuming, the
+        # workers take over the shards of the worker whose batch is next and the workers following it. Exhausted workers are
+        # skipped by the data loader, which breaks this mapping (see the class docstring).
+        worker_rank = (worker_id + self.num_batches) % num_workers
+        samples = self._iter_shards(self.get_shard_order()[worker_rank::num_workers])
+        if self.shuffle:
+            samples = self._shuffle(samples, np.random.default_rng([self.seed, self.epoch, worker_rank]))
+        num_skipped = len(range(worker_rank, self.num_batches, num_workers)) * self.batch_size
+        for i, sample in enumerate(samples):
+            if i >= num_skipped:
+                yield sample
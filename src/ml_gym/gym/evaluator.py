@@ -4,17 +4,18 @@ from typing import Any, Callable, Dict, List, Union
 from ml_gym.gym.post_processing import PredictPostProcessingIF
 from ml_gym.persistency.logging import ExperimentStatusLogger
 import torch
-from ml_gym.batching.batch import DatasetBatch, EvaluationBatchResult, InferenceResultBatch
+from ml_gym.batching.batch import DatasetBatch, EvaluationBatchResult, InferenceResultBatch, InferenceResultBatchAggregator
 from ml_gym.data_handling.dataset_loader import DatasetLoader
+from ml_gym.data_handling.eval_batch_cache import EvalBatchCache
 from ml_gym.gym.inference_component import InferenceComponent
 from ml_gym.gym.stateful_components import StatefulComponent
 from ml_gym.metrics.metrics import Metric
 from ml_gym.models.nn.net import NNModel
 from ml_gym.loss_functions.loss_functions import Loss
 import tqdm
-from ml_gym.util.logger import ConsoleLogger
+from ml_gym.util.logger import ConsoleLogger, LogLevel
 import numpy as np
-from ml_gym.gym.predict_postprocessing_component import PredictPostprocessingComponent
+from ml_gym.gym.predict_postprocessing_component import PredictPostprocessingComponent, PostProcessingPlanner, PostProcessingPlan
 from ml_gym.error_handling.exception import BatchStateError, EvaluationError, MetricCalculationError, LossCalculationError
 
 
@@ -58,7 +59,8 @@ class EvalComponent(EvalComponentIF):
     def __init__(self, inference_component: InferenceComponent, post_processors: Dict[str, PredictPostprocessingComponent], metrics: List[Metric],
                  loss_funs: Dict[str, Loss], dataset_loaders: Dict[str, DatasetLoader], train_split_name: str, show_progress: bool = False,
                  cpu_target_subscription_keys: List[str] = None, cpu_prediction_subscription_keys: List[Union[str, List]] = None,
-                 metrics_computation_config: List[Dict] = None, loss_computation_config: List[Dict] = None):
+                 metrics_computation_config: List[Dict] = None, loss_computation_config: List[Dict] = None,
+                 eval_batch_cache: EvalBatchCache = None):
         self.loss_funs = loss_funs
         self.inference_component = inference_component
         # maps split names to postprocessors
@@ -77,6 +79,29 @@ class EvalComponent(EvalComponentIF):
         self.loss_computation_config = None if loss_computation_config is None else {
             m["loss_tag"]: m["applicable_splits"] for m in loss_computation_config}
         self.experiment_status_logger: ExperimentStatusLogger = None
+        # caches the collated batches of the non-training splits across evaluations
+        self.eval_batch_cache = eval_batch_cache
+        # only the postprocessors computing predictions subscribed to on the split are run
+        self.post_processing_plans: Dict[str, PostProcessingPlan] = {}
+        for split_name in self.dataset_loaders:
+            self.post_processing_plans[split_name] = PostProcessingPlanner.plan(
+                post_processors=self.post_processors.get(split_name, []) + self.post_processors.get("default", []),
+                consumers=list(self._get_split_loss_funs(split_name).values()) + self._get_split_metrics(split_name),
+                prediction_subscription_keys=self.cpu_prediction_subscription_keys)
+            self.logger.log(LogLevel.INFO, f"Postprocessing plan of split {split_name}: {self.post_processing_plans[split_name]}")
+
+    def _get_split_loss_funs(self, split_name: str) -> Dict[str, Loss]:
+        if self.loss_computation_config is None:
+            return self.loss_funs
+        loss_tags = [loss_tag for loss_tag, applicable_splits in self.loss_computation_config.items() if split_name in applicable_splits]
+        return {tag: loss_fun for tag, loss_fun in self.loss_funs.items() if tag in loss_tags}
+
+    def _get_split_metrics(self, split_name: str) -> List[Metric]:
+        if self.metrics_computation_config is None:
+            return self.metrics
+        metric_tags = [metric_tag for metric_tag, applicable_splits in self.metrics_computation_config.items()
+                       if split_name in applicable_splits]
+        return [metric for metric in self.metrics if metric.tag in metric_tags]
 
     def evaluate(self, model: NNModel, device: torch.device, epoch_result_callback_fun: Callable = None,
                  batch_processed_callback_fun: Callable = None) -> List[EvaluationBatchResult]:
@@ -86,54 +111,62 @@ class EvalComponent(EvalComponentIF):
                                dataset_loader: DatasetLoader, epoch_result_callback_fun: Callable = None,
                                batch_processed_callback_fun: Callable = None) -> EvaluationBatchResult:
         dataset_loader.device = device
+        batches = dataset_loader
+        if self.eval_batch_cache is not None and split_name != self.train_split_name:
+            batches = self.eval_batch_cache.iterate(split_name, dataset_loader, device)
         dataset_loader_iterator = tqdm.tqdm(
-            dataset_loader, desc=f"Evaluating {dataset_loader.dataset_name} - {split_name}") if self.show_progress else dataset_loader
-        post_processors = self.post_processors[split_name] + self.post_processors["default"]
+            batches, desc=f"Evaluating {dataset_loader.dataset_name} - {split_name}") if self.show_progress else batches
+        if split_name in self.post_processing_plans:
+            post_processors = self.post_processing_plans[split_name].post_processors
+        else:
+            post_processors = self.post_processors[split_name] + self.post_processors["default"]
 
         # calc losses
-        if self.loss_computation_config is not None:
-            loss_tags = [loss_tag for loss_tag, applicable_splits in self.loss_computation_config.items()
-                         if split_name in applicable_splits]
-            split_loss_funs = {tag: loss_fun for tag, loss_fun in self.loss_funs.items() if tag in loss_tags}
-        else:
-            split_loss_funs = self.loss_funs
+        split_loss_funs = self._get_split_loss_funs(split_name)
 
         batch_losses = []
-        inference_result_batches_cpu = []
+        # the filtered results are copied into buffers preallocated for the whole split
+        result_aggregator = InferenceResultBatchAggregator(num_samples=len(dataset_loader.dataset), device=torch.device("cpu"))
+        prediction_paths = None
         num_batches = len(dataset_loader_iterator)
         processed_batches = 0
         update_lag = max(1, int(num_batches/10))
-        for batch in dataset_loader_iterator:
-            inference_result_batch = self.forward_batch(dataset_batch=batch, model=model, device=device, postprocessors=post_processors)
-            batch_loss = self._calculate_loss_scores(inference_result_batch, split_loss_funs)
-            batch_losses.append(batch_loss)
-            irb_filtered = inference_result_batch.split_results(predictions_keys=self.cpu_prediction_subscription_keys,
-                                                                target_keys=self.cpu_target_subscription_keys,
-                                                                device=torch.device("cpu"))
-            inference_result_batches_cpu.append(irb_filtered)
-            processed_batches += 1
-            if batch_processed_callback_fun is not None and (processed_batches % update_lag == 0 or processed_batches == num_batches):
-                splits = [d.dataset_tag for _, d in self.dataset_loaders.items()]
-                batch_processed_callback_fun(status="evaluation",
-                                             num_batches=num_batches,
-                                             current_batch=processed_batches,
-                                             splits=splits,
-                                             current_split=dataset_loader.dataset_tag)
+        # each evaluation streams the whole split from its beginning, while the position of the (train) stream is kept
+        with dataset_loader.restarted_stream():
+            for batch in dataset_loader_iterator:
+                inference_result_batch = self.forward_batch(dataset_batch=batch, model=model, device=device, postprocessors=post_processors)
+                batch_loss = self._calculate_loss_scores(inference_result_batch, split_loss_funs)
+                batch_losses.append(batch_loss)
+                try:
+                    if prediction_paths is None:
+                        # the subscription patterns are resolved into the prediction key paths once, on the first batch
+                        prediction_paths = inference_result_batch.get_prediction_paths(self.cpu_prediction_subscription_keys)
+                    irb_filtered = inference_result_batch.split_results(predictions_keys=self.cpu_prediction_subscription_keys,
+                                                                        target_keys=self.cpu_target_subscription_keys,
+                                                                        prediction_paths=prediction_paths)
+                    result_aggregator.add(irb_filtered)
+                except BatchStateError as e:
+                    raise EvaluationError(f"Error combining inference result batch on split {split_name}.") from e
+                processed_batches += 1
+                if batch_processed_callback_fun is not None and (processed_batches % update_lag == 0 or processed_batches == num_batches):
+                    splits = [d.dataset_tag for _, d in self.dataset_loaders.items()]
+                    batch_processed_callback_fun(status="evaluation",
+                                                 num_batches=num_batches,
+                                                 current_batch=processed_batches,
+                                                 splits=splits,
+                                                 current_split=dataset_loader.dataset_tag)
 
         # calc metrics
         try:
-            prediction_batch = InferenceResultBatch.combine(inference_result_batches_cpu)
+            prediction_batch = result_aggregator.get_result()
         except BatchStateError as e:
             raise EvaluationError(f"Error combining inference result batch on split {split_name}.") from e
 
         # select metrics for split
-        if self.metrics_computation_config is not None:
-            metric_tags = [metric_tag for metric_tag, applicable_splits in self.metrics_computation_config.items()
-                           if split_name in applicable_splits]
-            split_metrics = [metric for metric in self.metrics if metric.tag in metric_tags]
-        else:
-            split_metrics = self.metrics
+        split_metrics = self._get_split_metrics(split_name)
         metric_scores = self._calculate_metric_scores(prediction_batch, split_metrics)
+        if dataset_loader.padding_ratio is not None:
+            metric_scores["padding_ratio"] = [dataset_loader.padding_ratio]
 
         # aggregate losses
         loss_keys = batch_losses[0].keys()
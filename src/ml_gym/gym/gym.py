@@ -2,9 +2,11 @@ from ml_gym.persistency.logging import JobStatusLogger, MLgymStatusLoggerCollect
 import torch
 from typing import List
 from ml_gym.multiprocessing.pool import Pool, Job
-from ml_gym.blueprints.blue_prints import BluePrint
+from ml_gym.blueprints.blue_prints import BluePrint, MultiModelBluePrint
 from ml_gym.gym.jobs import AbstractGymJob
 from ml_gym.util.devices import get_devices
+from ml_gym.blueprints.component_cache import ComponentCache
+from ml_gym.data_handling.shared_datasets import SharedDatasetStore, SharedDatasetRegistry, SharedDatasetHandle
 import tqdm
 
 
@@ -13,11 +15,18 @@ torch.multiprocessing.set_start_method('spawn', force=True)
 
 class Gym:
     def __init__(self, job_id_prefix: str, logger_collection_constructable: MLgymStatusLoggerCollectionConstructable,
-                 process_count: int = 1, device_ids: List[int] = None, log_std_to_file: bool = True):
+                 process_count: int = 1, device_ids: List[int] = None, log_std_to_file: bool = True, share_datasets: bool = False,
+                 shared_dataset_folder: str = None, max_jobs_per_process: int = 1, component_cache_size_bytes: int = 0):
         self.devices = get_devices(device_ids)
+        # if set, the dataset components are materialized once by this process and shared with the worker processes
+        self.share_datasets = share_datasets
+        self.shared_dataset_folder = shared_dataset_folder
+        # if set, the data pipeline components are reused by the consecutive jobs of a process (see `ComponentCache`)
+        self.component_cache_size_bytes = component_cache_size_bytes
         self.job_status_logger = JobStatusLogger(logger_collection_constructable.construct())
         self.log_std_to_file = log_std_to_file
-        self.pool = Pool(num_processes=process_count, devices=self.devices, logger_collection_constructable=logger_collection_constructable)
+        self.pool = Pool(num_processes=process_count, devices=self.devices, max_jobs_per_process=max_jobs_per_process,
+                         logger_collection_constructable=logger_collection_constructable)
         self.jobs: List[Job] = []
         self.job_id_prefix = job_id_prefix
         self.job_counter = 0
@@ -29,18 +38,27 @@ class Gym:
             parallel (bool, optional): When set to True, jobs are run in parallel in the multiprocessing environment. Defaults to True.
         """
         if parallel:
-            for _ in range(len(self.jobs)):
-                job = self.jobs.pop(0)
-                self.pool.add_job(job)
+            shared_dataset_store = SharedDatasetStore(self.shared_dataset_folder) if self.share_datasets else None
+            try:
+                if shared_dataset_store is not None:
+                    shared_datasets = shared_dataset_store.materialize_blueprints([job.blueprint for job in self.jobs])
+                    for job in self.jobs:
+                        job.param_dict["shared_datasets"] = shared_datasets
+                jobs, self.jobs = self.jobs, []
+                self.pool.add_jobs(jobs)
 
-            self.pool.run()
+                self.pool.run()
+            finally:
+                if shared_dataset_store is not None:
+                    shared_dataset_store.cleanup()
         else:
             for _ in tqdm.tqdm(range(len(self.jobs)), desc="Models trained"):
                 job = self.jobs.pop(0)
                 self.work(job, self.devices[0])
 
     def add_blueprint(self, blueprint: BluePrint) -> int:
-        job = Job(job_id=f"{blueprint.grid_search_id}-{self.job_counter}", fun=Gym._run_job, blueprint=blueprint, param_dict={"log_std_to_file": self.log_std_to_file})
+        param_dict = {"log_std_to_file": self.log_std_to_file, "component_cache_size_bytes": self.component_cache_size_bytes}
+        job = Job(job_id=f"{blueprint.grid_search_id}-{self.job_counter}", fun=Gym._run_job, blueprint=blueprint, param_dict=param_dict)
         self.job_counter += 1
         self.jobs.append(job)
         return job.job_id
@@ -48,13 +66,20 @@ class Gym:
     def add_blueprints(self, blueprints: List[BluePrint]):
         for blueprint in blueprints:
             job_id = self.add_blueprint(blueprint)
-            self.job_status_logger.log_experiment_config(grid_search_id=blueprint.grid_search_id,
-                                                         experiment_id=blueprint.experiment_id,
-                                                         job_id=job_id,
-                                                         config=blueprint.config)
+            # a multi model job runs the experiments of all its blueprints
+            experiment_blueprints = blueprint.blue_prints if isinstance(blueprint, MultiModelBluePrint) else [blueprint]
+            for experiment_blueprint in experiment_blueprints:
+                self.job_status_logger.log_experiment_config(grid_search_id=experiment_blueprint.grid_search_id,
+                                                             experiment_id=experiment_blueprint.experiment_id,
+                                                             job_id=job_id,
+                                                             config=experiment_blueprint.config)
 
     @staticmethod
-    def _run_job(blueprint: BluePrint, device: torch.device, log_std_to_file: bool) -> AbstractGymJob:
+    def _run_job(blueprint: BluePrint, device: torch.device, log_std_to_file: bool,
+                 shared_datasets: List[SharedDatasetHandle] = None, component_cache_size_bytes: int = 0) -> AbstractGymJob:
+        if shared_datasets is not None:
+            SharedDatasetRegistry.register(shared_datasets)
+        ComponentCache.configure(component_cache_size_bytes)
         gym_job = AbstractGymJob.from_blue_print(blueprint, device=device)
         return gym_job.execute(device=device)
 
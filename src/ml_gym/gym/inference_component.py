@@ -1,5 +1,5 @@
 from ml_gym.models.nn.net import NNModel
-from ml_gym.batching.batch import InferenceResultBatch, DatasetBatch
+from ml_gym.batching.batch import InferenceResultBatch, DatasetBatch, InferenceResultBatchAggregator
 from typing import List
 import torch
 from ml_gym.gym.predict_postprocessing_component import PredictPostprocessingComponent
@@ -23,5 +23,7 @@ class InferenceComponent:
         return PredictPostprocessingComponent.post_process(result_batch, post_processors=post_processors)
 
     def predict_data_loader(self, model: NNModel, dataset_loader: DatasetLoader) -> InferenceResultBatch:
-        result_batches = [self.predict(model, batch) for batch in tqdm.tqdm(dataset_loader, desc="Batches processed:")]
-        return InferenceResultBatch.combine(result_batches)
+        result_aggregator = InferenceResultBatchAggregator(num_samples=len(dataset_loader.dataset))
+        for batch in tqdm.tqdm(dataset_loader, desc="Batches processed:"):
+            result_aggregator.add(self.predict(model, batch))
+        return result_aggregator.get_result()
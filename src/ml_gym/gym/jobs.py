@@ -2,14 +2,14 @@ from abc import abstractmethod
 from ml_gym.early_stopping.early_stopping_strategies import EarlyStoppingIF
 from ml_gym.models.nn.net import NNModel
 from ml_gym.gym.evaluator import Evaluator
-from ml_gym.gym.trainer import Trainer
+from ml_gym.gym.trainer import Trainer, TrainComponent
 from ml_gym.modes import RunMode
 from ml_gym.optimizers.optimizer import OptimizerAdapter
 import torch
 from ml_gym.gym.stateful_components import StatefulComponent
 from typing import List, Dict, Any
 from ml_gym.util.logger import ConsoleLogger, LogLevel
-from ml_gym.batching.batch import EvaluationBatchResult
+from ml_gym.batching.batch import DatasetBatch, EvaluationBatchResult
 from ml_gym.persistency.logging import ExperimentStatusLogger
 from functools import partial
 from ml_gym.persistency.io import GridSearchAPIClientIF, CheckpointResource
@@ -137,23 +137,32 @@ class GymJob(AbstractGymJob):
         """
         self._execution_method(device)
 
-    def _execute_train(self, device: torch.device):
+    def prepare_training(self):
         self.optimizer.register_model_params(model_params=dict(self.model.named_parameters()))
-
         self.trainer.set_num_epochs(num_epochs=self.num_epochs)
 
-        # initial evaluation
-        evaluation_results = self._evaluation_step(device)
+    def evaluate_and_checkpoint(self, device: torch.device) -> bool:
+        """ Evaluates the model, runs the checkpointing and checks the early stopping criterion.
+
+        Args:
+            device: torch device either CPUs or a specified GPU
 
-        # we store the initial model / last warmup model again
+        Returns: True if the early stopping criterion is fulfilled, False otherwise.
+        """
+        evaluation_results = self._evaluation_step(device)
         checkpointing_instruction = self.checkpointing_strategy.get_model_checkpoint_instruction(num_epochs=self.num_epochs,
                                                                                                  current_epoch=self.current_epoch,
                                                                                                  evaluation_result=evaluation_results)
         self.run_checkpointing(checkpointing_instruction)
+        return self.early_stopping_strategy.is_stopping_criterion_fulfilled(current_epoch=self.current_epoch,
+                                                                            evaluation_results=evaluation_results)
 
+    def _execute_train(self, device: torch.device):
+        self.prepare_training()
+
+        # initial evaluation, we store the initial model / last warmup model again
         # if early stopping criterion is fulfilled we can stop the training progress
-        if self.early_stopping_strategy.is_stopping_criterion_fulfilled(current_epoch=self.current_epoch,
-                                                                        evaluation_results=evaluation_results):
+        if self.evaluate_and_checkpoint(device):
             return
 
         # start the actual training loop
@@ -162,18 +171,12 @@ class GymJob(AbstractGymJob):
         while not self.trainer.is_done():
             self.logger.log(LogLevel.INFO,  f"epoch: {self.current_epoch}")
             self._train_step(device)
-            evaluation_results = self._evaluation_step(device)
-            checkpointing_instruction = self.checkpointing_strategy.get_model_checkpoint_instruction(num_epochs=self.num_epochs,
-                                                                                                     current_epoch=self.current_epoch,
-                                                                                                     evaluation_result=evaluation_results)
-            self.run_checkpointing(checkpointing_instruction)
-            if self.early_stopping_strategy.is_stopping_criterion_fulfilled(current_epoch=self.current_epoch,
-                                                                            evaluation_results=evaluation_results):
+            if self.evaluate_and_checkpoint(device):
                 break
 
             self.current_epoch += 1
 
-    def _execute_warm_start(self, device: torch.device):
+    def restore_checkpoint(self):
         if self.current_epoch > 0:
             model_state = pickle.loads(self.gs_api_client.get_checkpoint_resource(grid_search_id=self.grid_search_id,
                                                                                   experiment_id=self.experiment_id,
@@ -181,11 +184,12 @@ class GymJob(AbstractGymJob):
                                                                                   checkpoint_resource=CheckpointResource.model))
             self.model.load_state_dict(model_state)
 
-            optimizer_state = pickle.loads(self.gs_api_client.get_checkpoint_resource(grid_search_id=self.grid_search_id,
-                                                                                      experiment_id=self.experiment_id,
-                                                                                      checkpoint_id=self.current_epoch,
-                                                                                      checkpoint_resource=CheckpointResource.optimizer))
-            self.optimizer.load_state_dict(optimizer_state)
+            # the optimizer state is deserialized lazily (memory-mapped) once the model params are registered
+            optimizer_state = self.gs_api_client.get_checkpoint_resource(grid_search_id=self.grid_search_id,
+                                                                         experiment_id=self.experiment_id,
+                                                                         checkpoint_id=self.current_epoch,
+                                                                         checkpoint_resource=CheckpointResource.optimizer)
+            self.optimizer.load_serialized_state_dict(optimizer_state)
 
             state_component_state = pickle.loads(self.gs_api_client.get_checkpoint_resource(grid_search_id=self.grid_search_id,
                                                                                             experiment_id=self.experiment_id,
@@ -193,6 +197,8 @@ class GymJob(AbstractGymJob):
                                                                                             checkpoint_resource=CheckpointResource.stateful_components))
             self.set_state(state_component_state)
 
+    def _execute_warm_start(self, device: torch.device):
+        self.restore_checkpoint()
         self._execute_train(device)
 
     def _execute_eval(self, device: torch.device):
@@ -201,6 +207,62 @@ class GymJob(AbstractGymJob):
             self._evaluation_step(device, epoch=epoch)
 
 
+class MultiModelGymJob(AbstractGymJob):
+    """ Trains several models on a shared data pipeline. Each training batch is loaded and collated once and then passed
+    to the `TrainComponent` of every model in turn. Evaluation, checkpointing and early stopping are run separately for each model.
+    """
+
+    def __init__(self, gym_jobs: List[GymJob]):
+        super().__init__(experiment_status_logger=None)
+        self.gym_jobs = gym_jobs
+        # all models are trained on the train loader of the first job
+        self.train_loader = gym_jobs[0].trainer.train_loader
+        for gym_job in gym_jobs[1:]:
+            gym_job.trainer.train_loader = self.train_loader
+
+    def execute(self, device: torch.device):
+        """ Executes the jobs
+
+        Args:
+            device: torch device either CPUs or a specified GPU
+        """
+        active_jobs = []
+        for gym_job in self.gym_jobs:
+            if gym_job.run_mode == RunMode.WARM_START:
+                gym_job.restore_checkpoint()
+            gym_job.prepare_training()
+            if not gym_job.evaluate_and_checkpoint(device):
+                gym_job.current_epoch += 1
+                gym_job.trainer.set_current_epoch(gym_job.current_epoch)
+                active_jobs.append(gym_job)
+
+        active_jobs = [gym_job for gym_job in active_jobs if not gym_job.trainer.is_done()]
+        while active_jobs:
+            self.logger.log(LogLevel.INFO, f"epoch: {[gym_job.current_epoch for gym_job in active_jobs]}")
+            self._train_step(active_jobs, device)
+            active_jobs = [gym_job for gym_job in active_jobs if not gym_job.evaluate_and_checkpoint(device)]
+            for gym_job in active_jobs:
+                gym_job.current_epoch += 1
+            active_jobs = [gym_job for gym_job in active_jobs if not gym_job.trainer.is_done()]
+
+    def _train_step(self, gym_jobs: List[GymJob], device: torch.device):
+        def train_batch(batch: DatasetBatch):
+            for gym_job in gym_jobs:
+                gym_job.trainer.train_component.train_batch(batch, gym_job.model, gym_job.optimizer, device)
+
+        def batch_processed_callback(**kwargs):
+            for gym_job in gym_jobs:
+                self.batch_processed_callback(num_epochs=gym_job.num_epochs, current_epoch=gym_job.current_epoch,
+                                              experiment_status_logger=gym_job._experiment_status_logger, **kwargs)
+
+        self.train_loader.device = device
+        TrainComponent.map_batches(fun=train_batch, loader=self.train_loader,
+                                   progress_info=f"Training {self.train_loader.dataset_name} with {len(gym_jobs)} models",
+                                   callback_fun=batch_processed_callback)
+        for gym_job in gym_jobs:
+            gym_job.trainer.set_current_epoch(gym_job.trainer.current_epoch + 1)
+
+
 class GymJobFactory:
     @staticmethod
     def get_gym_job(grid_search_id: str, experiment_id: int, run_mode: RunMode, num_epochs: int, gs_api_client: GridSearchAPIClientIF,
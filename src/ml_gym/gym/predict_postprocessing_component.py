@@ -1,6 +1,10 @@
-from typing import List
-from ml_gym.gym.post_processing import PredictPostProcessingIF
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Set, Union
+from ml_gym.gym.post_processing import PredictPostProcessingIF, PredictPostProcessing, ArgmaxPostProcessorImpl, \
+    SoftmaxPostProcessorImpl, SigmoidalPostProcessorImpl, DummyPostProcessorImpl
 from ml_gym.batching.batch import InferenceResultBatch
+from ml_gym.loss_functions.loss_functions import Loss
+from ml_gym.metrics.metrics import MetricIF
 
 
 class PredictPostprocessingComponent:
@@ -10,3 +14,138 @@ class PredictPostprocessingComponent:
         for post_processor in post_processors:
             result_batch = post_processor.postprocess(result_batch)
         return result_batch
+
+
+@dataclass
+class PostProcessingPlan:
+    post_processors: List[PredictPostProcessingIF]
+    required_keys: Optional[Set[str]] = None
+    pruned: List[PredictPostProcessingIF] = field(default_factory=list)
+    fused: List[PredictPostProcessingIF] = field(default_factory=list)
+
+    def __str__(self) -> str:
+        if self.required_keys is None:
+            return f"not planned, running all {len(self.post_processors)} postprocessors"
+        describe = PostProcessingPlanner.describe
+        return (f"required predictions {sorted(self.required_keys)}, running {[describe(p) for p in self.post_processors]}, "
+                f"pruned {[describe(p) for p in self.pruned]}, fused {[describe(p) for p in self.fused]}")
+
+
+class PostProcessingPlanner:
+    """Plans the postprocessors of a split, such that only the predictions subscribed to by the losses, metrics and the
+    prediction keys kept on the CPU are computed. Postprocessors, whose publications are not required, are pruned and an
+    argmax over a softmax or sigmoid output is computed directly on the input of the monotonic transformation.
+
+    The planning is conservative: if a subscription cannot be determined (e.g., a wildcard or a custom loss without
+    `prediction_subscription_key`) or a postprocessor does not expose its keys, all postprocessors are run."""
+
+    monotonic_post_processor_types = (SoftmaxPostProcessorImpl, SigmoidalPostProcessorImpl)
+
+    @staticmethod
+    def get_impl(post_processor: PredictPostProcessingIF) -> PredictPostProcessingIF:
+        if isinstance(post_processor, PredictPostProcessing):
+            return post_processor.postprocessing_impl
+        return post_processor
+
+    @staticmethod
+    def describe(post_processor: PredictPostProcessingIF) -> str:
+        impl = PostProcessingPlanner.get_impl(post_processor)
+        return f"{type(impl).__name__}({getattr(impl, 'prediction_subscription_key', None)} -> " \
+               f"{getattr(impl, 'prediction_publication_key', None)})"
+
+    @staticmethod
+    def _get_root_key(key: Union[str, List, tuple]) -> str:
+        return key if isinstance(key, str) else tuple(key)[0]
+
+    @staticmethod
+    def get_consumer_subscription_keys(consumer: Any) -> Optional[Set[str]]:
+        """Returns the root keys of the predictions subscribed to by a loss or metric including its nested losses and
+        metrics (e.g., the loss terms of a `MultiLoss`) or None, if the consumer does not expose any subscription."""
+        keys = set()
+        for name, value in vars(consumer).items():
+            if name.startswith("prediction_subscription_key") and isinstance(value, (str, list, tuple)):
+                keys.add(PostProcessingPlanner._get_root_key(value))
+                continue
+            children = value.values() if isinstance(value, dict) else value if isinstance(value, (list, tuple)) else [value]
+            for child in children:
+                if isinstance(child, (MetricIF, Loss)):
+                    child_keys = PostProcessingPlanner.get_consumer_subscription_keys(child)
+                    if child_keys is None:
+                        return None
+                    keys.update(child_keys)
+        return keys if keys else None
+
+    @staticmethod
+    def get_required_keys(consumers: List[Any], prediction_subscription_keys: List[Union[str, List]]) -> Optional[Set[str]]:
+        required_keys = set()
+        for consumer in consumers:
+            consumer_keys = PostProcessingPlanner.get_consumer_subscription_keys(consumer)
+            if consumer_keys is None:
+                return None
+            required_keys.update(consumer_keys)
+        for key in prediction_subscription_keys if prediction_subscription_keys is not None else []:
+            root_key = PostProcessingPlanner._get_root_key(key)
+            if root_key == "*":
+                return None
+            required_keys.add(root_key)
+        return required_keys
+
+    @staticmethod
+    def _is_plannable(post_processor: PredictPostProcessingIF) -> bool:
+        impl = PostProcessingPlanner.get_impl(post_processor)
+        return isinstance(impl, DummyPostProcessorImpl) or (hasattr(impl, "prediction_subscription_key")
+                                                             and hasattr(impl, "prediction_publication_key"))
+
+    @staticmethod
+    def prune(post_processors: List[PredictPostProcessingIF], required_keys: Set[str]) -> List[PredictPostProcessingIF]:
+        """Walks the postprocessors backwards and keeps those publishing a required key, whose subscription becomes required
+        in turn."""
+        required_keys = set(required_keys)
+        kept = []
+        for post_processor in reversed(post_processors):
+            impl = PostProcessingPlanner.get_impl(post_processor)
+            if isinstance(impl, DummyPostProcessorImpl) or impl.prediction_publication_key not in required_keys:
+                continue
+            required_keys.discard(impl.prediction_publication_key)
+            required_keys.add(PostProcessingPlanner._get_root_key(impl.prediction_subscription_key))
+            kept.append(post_processor)
+        return kept[::-1]
+
+    @staticmethod
+    def fuse(post_processors: List[PredictPostProcessingIF]) -> List[PredictPostProcessingIF]:
+        """Replaces each argmax over the output of a softmax or sigmoid with an argmax over its input, if the input is not
+        overwritten in between. The softmax or sigmoid is pruned afterwards, if its output is not required otherwise."""
+        fused_post_processors = list(post_processors)
+        for j, post_processor in enumerate(post_processors):
+            impl = PostProcessingPlanner.get_impl(post_processor)
+            if not isinstance(impl, ArgmaxPostProcessorImpl):
+                continue
+            publishers = [i for i in range(j) if PostProcessingPlanner.get_impl(
+                post_processors[i]).prediction_publication_key == impl.prediction_subscription_key]
+            if not publishers:
+                continue
+            producer = PostProcessingPlanner.get_impl(post_processors[publishers[-1]])
+            source_key = producer.prediction_subscription_key
+            if not isinstance(producer, PostProcessingPlanner.monotonic_post_processor_types) \
+                    or source_key == impl.prediction_subscription_key:
+                continue
+            if any(PostProcessingPlanner.get_impl(p).prediction_publication_key == source_key
+                   for p in post_processors[publishers[-1] + 1:j]):
+                continue
+            fused_impl = ArgmaxPostProcessorImpl(prediction_subscription_key=source_key,
+                                                 prediction_publication_key=impl.prediction_publication_key)
+            fused_post_processors[j] = PredictPostProcessing(fused_impl)
+        return fused_post_processors
+
+    @staticmethod
+    def plan(post_processors: List[PredictPostProcessingIF], consumers: List[Any],
+             prediction_subscription_keys: List[Union[str, List]]) -> PostProcessingPlan:
+        required_keys = PostProcessingPlanner.get_required_keys(consumers, prediction_subscription_keys)
+        if required_keys is None or not all(PostProcessingPlanner._is_plannable(p) for p in post_processors):
+            return PostProcessingPlan(post_processors=list(post_processors))
+        kept = PostProcessingPlanner.prune(post_processors, required_keys)
+        fused = PostProcessingPlanner.fuse(kept)
+        planned = PostProcessingPlanner.prune(fused, required_keys)
+        return PostProcessingPlan(post_processors=planned, required_keys=required_keys,
+                                  pruned=[p for p in post_processors if p not in planned],
+                                  fused=[p for p in planned if p not in kept])
@@ -120,6 +120,17 @@ class Trainer(TrainerIF):
     def set_current_epoch(self, epoch: int):
         self.current_epoch = epoch
 
+    def get_state(self) -> Dict[str, Any]:
+        state = super().get_state()
+        # the position of a streaming train split, such that a restored job continues the stream instead of replaying it
+        state["train_loader"] = self.train_loader.state_dict()
+        return state
+
+    def set_state(self, state: Dict[str, Any]):
+        super().set_state(state)
+        if "train_loader" in state:
+            self.train_loader.load_state_dict(state["train_loader"])
+
     def train_epoch(self, model: NNModel, optimizer: OptimizerAdapter, device: torch.device,
                     batch_processed_callback_fun: Callable = None) -> NNModel:
         if self.current_epoch > self.num_epochs:
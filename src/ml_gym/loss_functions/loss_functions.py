@@ -3,7 +3,8 @@ import torch
 import torch.nn as nn
 from ml_gym.loss_functions.loss_scaler import MeanScaler
 from ml_gym.batching.batch import InferenceResultBatch
-from typing import List, Callable
+from ml_gym.batching.batch_filters import BatchFilter
+from typing import Callable
 from ml_gym.gym.stateful_components import StatefulComponent
 import torch.nn.functional as F
 from ml_gym.error_handling.exception import InvalidTensorFormatError
@@ -41,7 +42,7 @@ class Loss(ABC):
 
 class LPLoss(Loss):
     def __init__(self, target_subscription_key: str, prediction_subscription_key: str, root: int = 1, exponent: int = 2,
-                 sample_selection_fun: Callable[[InferenceResultBatch], List[bool]] = None,
+                 sample_selection_fun: Callable[[InferenceResultBatch], torch.Tensor] = None,
                  tag: str = "", average_batch_loss: bool = True, avg_per_feature_loss: bool = False):
         super().__init__(tag)
         self.root = root
@@ -60,7 +61,8 @@ class LPLoss(Loss):
             raise InvalidTensorFormatError
 
         if self.sample_selection_fun is not None:
-            sample_selection_mask = self.sample_selection_fun(forward_batch)
+            # boolean mask or indices on the device of the targets, such that no host synchronization is needed
+            sample_selection_mask = BatchFilter.to_selection_tensor(self.sample_selection_fun(forward_batch), t.device)
             t = t[sample_selection_mask]
             p = p[sample_selection_mask]
         loss_values = (torch.sum((p - t).abs() ** self.exponent, dim=1) ** (1 / self.root))
@@ -102,13 +104,14 @@ class CrossEntropyLoss(Loss):
         self.target_subscription_key: str = target_subscription_key
         self.prediction_subscription_key: str = prediction_subscription_key
         self.average_batch_loss = average_batch_loss
+        self.loss_fun = nn.CrossEntropyLoss(reduction="none")
 
     def __call__(self, inference_result_batch: InferenceResultBatch) -> torch.Tensor:
         # the targets tensor has each target in a separate tensor torch.Tensor([[1], [2], ..., [1]).
         # For the CrossEntropyLoss API we need them to be squeezed torch.Tensor([1, 2, ..., 1])
         t = inference_result_batch.get_targets(self.target_subscription_key).long()
         p = inference_result_batch.get_predictions(self.prediction_subscription_key)
-        loss_values = nn.CrossEntropyLoss(reduction="none")(p, t.flatten())
+        loss_values = self.loss_fun(p, t.flatten())
         if self.average_batch_loss:
             loss_values = torch.sum(loss_values)/len(loss_values)
         return loss_values
@@ -124,12 +127,13 @@ class NLLLoss(Loss):
         super().__init__(tag)
         self.target_subscription_key: str = target_subscription_key
         self.prediction_subscription_key: str = prediction_subscription_key
+        self.loss_fun = nn.NLLLoss(reduction="none")
 
     def __call__(self, inference_result_batch: InferenceResultBatch) -> torch.Tensor:
         t = inference_result_batch.get_targets(self.target_subscription_key).long()
         p = inference_result_batch.get_predictions(self.prediction_subscription_key)
         p = F.log_softmax(p, dim=1)
-        loss_values = nn.NLLLoss(reduction="none")(p, t)
+        loss_values = self.loss_fun(p, t)
         return loss_values
 
 
@@ -165,12 +169,13 @@ class BCELoss(Loss):
         self.target_subscription_key: str = target_subscription_key
         self.prediction_subscription_key: str = prediction_subscription_key
         self.average_batch_loss = average_batch_loss
+        self.loss_fun = nn.BCELoss(reduction="none")
 
     def __call__(self, inference_result_batch: InferenceResultBatch) -> torch.Tensor:
         t = inference_result_batch.get_targets(
             self.target_subscription_key).float()  # .flatten()
         p = inference_result_batch.get_predictions(self.prediction_subscription_key)  # .flatten()
-        loss_values = nn.BCELoss(reduction="none")(p, t)
+        loss_values = self.loss_fun(p, t)
         if self.average_batch_loss:
             loss_values = torch.sum(loss_values)/len(loss_values)
         return loss_values
@@ -1,7 +1,7 @@
 from abc import abstractmethod
 import torch
 from ml_gym.gym.stateful_components import StatefulComponent
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 
 class Scaler(StatefulComponent):
@@ -14,8 +14,16 @@ class Scaler(StatefulComponent):
     def scale(self, tensor: torch.Tensor) -> torch.Tensor:
         raise NotImplementedError
 
+    def get_scale_factor(self) -> Optional[float]:
+        """ Returns the factor the scaler multiplies the loss with or None, if the scaling is not a multiplication.
+        """
+        return None
+
 
 class MeanScaler(Scaler):
+    # replaces a mean of magnitude below eps, such that a zero mean loss does not result in a division by zero
+    eps = 1e-12
+
     def __init__(self):
         self._mean = 1
 
@@ -28,7 +36,14 @@ class MeanScaler(Scaler):
         self._mean = value
 
     def scale(self, tensor: torch.Tensor) -> torch.Tensor:
-        return tensor / self._mean
+        return tensor / self._get_safe_mean()
+
+    def get_scale_factor(self) -> Optional[float]:
+        return 1 / self._get_safe_mean()
+
+    def _get_safe_mean(self) -> float:
+        # negative means (e.g., of log likelihood losses) are kept
+        return self._mean if abs(self._mean) > MeanScaler.eps else MeanScaler.eps
 
     def train(self, loss: torch.Tensor):
         self._mean = torch.mean(loss).item()
@@ -50,5 +65,8 @@ class NoScaler(Scaler):
     def scale(self, tensor: torch.Tensor) -> torch.Tensor:
         return tensor
 
+    def get_scale_factor(self) -> Optional[float]:
+        return 1
+
     def train(self, loss: torch.Tensor):
         pass
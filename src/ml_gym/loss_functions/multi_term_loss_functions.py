@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from ml_gym.loss_functions.loss_functions import Loss, LossWarmupMixin
 from ml_gym.loss_functions.loss_scaler import Scaler
 from ml_gym.batching.batch import InferenceResultBatch
@@ -14,23 +14,27 @@ class MultiLoss(LossWarmupMixin, Loss):
         self.scalers = scalers
         self.loss_weights = loss_weights
         self.warmup_losses = []
+        self._loss_factors: torch.Tensor = None
+        self._loss_factors_key = None
 
-    # def warm_up(self, forward_batch: InferenceResultBatch) -> torch.Tensor:
-    #     loss_tensors = self._calc_loss(forward_batch)
-    #     self.warmup_losses.append(loss_tensors)
-    #     for loss_term in self.loss_terms:
-    #         if isinstance(loss_term, LossWarmupMixin):
-    #             loss_term.warm_up(forward_batch)
-    #     return torch.cat(loss_tensors).sum()
+    def warm_up(self, forward_batch: InferenceResultBatch) -> torch.Tensor:
+        loss_tensors = self._calc_loss(forward_batch)
+        self.warmup_losses.append([loss_tensor.detach() for loss_tensor in loss_tensors])
+        for loss_term in self.loss_terms:
+            if isinstance(loss_term, LossWarmupMixin):
+                loss_term.warm_up(forward_batch)
+        return torch.stack(loss_tensors).sum()
 
-    # def finish_warmup(self):
-    #     combined_batch_warmup_losses = [torch.cat(loss_term_loss) for loss_term_loss in zip(*self.warmup_losses)]
-    #     for i in range(len(self.loss_terms)):
-    #         self.scalers[i].train(combined_batch_warmup_losses[i])
+    def finish_warmup(self):
+        combined_batch_warmup_losses = [torch.cat([loss.reshape(-1) for loss in loss_term_losses])
+                                        for loss_term_losses in zip(*self.warmup_losses)]
+        for i in range(len(self.loss_terms)):
+            self.scalers[i].train(combined_batch_warmup_losses[i])
+        self.warmup_losses = []
 
-    #     for loss_term in self.loss_terms:
-    #         if isinstance(loss_term, LossWarmupMixin):
-    #             loss_term.finish_warmup()
+        for loss_term in self.loss_terms:
+            if isinstance(loss_term, LossWarmupMixin):
+                loss_term.finish_warmup()
 
     def _scale(self, loss_tensors: List[torch.Tensor]) -> List[torch.Tensor]:
         return [self.scalers[i].scale(tensor) for i, tensor in enumerate(loss_tensors)]
@@ -38,12 +42,27 @@ class MultiLoss(LossWarmupMixin, Loss):
     def _apply_loss_weights(self, loss_tensors: List[torch.Tensor]) -> List[torch.Tensor]:
         return [tensor * self.loss_weights[i] for i, tensor in enumerate(loss_tensors)]
 
+    def _get_loss_factors(self, device: torch.device, dtype: torch.dtype) -> Optional[torch.Tensor]:
+        # combines the scale factors and the loss weights to one factor per loss term.
+        # The tensor is only rebuilt, when the scalers have been retrained.
+        scale_factors = [scaler.get_scale_factor() for scaler in self.scalers]
+        if any(scale_factor is None for scale_factor in scale_factors):
+            return None
+        loss_factors_key = (tuple(scale_factor * loss_weight for scale_factor, loss_weight in zip(scale_factors, self.loss_weights)),
+                            device, dtype)
+        if loss_factors_key != self._loss_factors_key:
+            self._loss_factors = torch.tensor(loss_factors_key[0], device=device, dtype=dtype)
+            self._loss_factors_key = loss_factors_key
+        return self._loss_factors
+
     def _calc_loss(self, forward_batch: InferenceResultBatch) -> List[torch.Tensor]:
         return [loss_term(forward_batch) for loss_term in self.loss_terms]
 
     def __call__(self, eval_batch: InferenceResultBatch) -> torch.Tensor:
-        loss_tensors = self._calc_loss(eval_batch)
-        loss_tensors = self._scale(loss_tensors)
-        loss_tensors = self._apply_loss_weights(loss_tensors)
-        loss_tensor = torch.stack(loss_tensors).sum(dim=0)
-        return loss_tensor
+        loss_tensor = torch.stack(self._calc_loss(eval_batch))
+        loss_factors = self._get_loss_factors(loss_tensor.device, loss_tensor.dtype)
+        if loss_factors is None:  # at least one of the scalers is not linear
+            loss_tensors = self._apply_loss_weights(self._scale(list(loss_tensor)))
+            return torch.stack(loss_tensors).sum(dim=0)
+        # scaling, weighting and summing up the loss terms in a single operation
+        return torch.tensordot(loss_factors, loss_tensor, dims=1)
@@ -2,6 +2,7 @@ from typing import Callable, Dict, Any, Union, List
 import torch
 from sklearn.metrics import roc_auc_score, average_precision_score, auc
 from ml_gym.batching.batch import InferenceResultBatch
+from ml_gym.batching.batch_filters import BatchFilter
 from abc import ABC, abstractmethod
 import numpy as np
 from torch import nn
@@ -78,23 +79,19 @@ class ClassSpecificExpectedCalibrationErrorMetric(Metric):
     def __call__(self, result_batch: InferenceResultBatch) -> Union[float, List[float]]:
         y_true = result_batch.get_targets(self.target_subscription_key).cpu().flatten()
         y_pred = result_batch.get_predictions(self.prediction_subscription_key).cpu().flatten()  # confidence for single class
-
-        # bin samples based on prediction confidence
-        bin_indices = np.digitize(y_pred.detach().numpy(), bins=self.bins)
-        ce_scores = []
-        bin_weights = []
-        for bin_indice in range(self.num_bins):
-            bin_mask = bin_indices == bin_indice
-            y_pred_bin = y_pred[bin_mask]
-            y_true_bin = y_true[bin_mask]
-            if len(y_pred_bin) > 0:
-                ce_bin_score = self._calc_calibration_error(y_true=y_true_bin, y_pred=y_pred_bin)
-                bin_weight = len(y_pred_bin)/len(y_pred)
-                ce_scores.append(ce_bin_score)
-                bin_weights.append(bin_weight)
-            else:
-                ce_scores.append(0)
-                bin_weights.append(0)
+        return self.calc_from_class_mask(y_true == self.class_label, y_pred)
+
+    def calc_from_class_mask(self, class_mask: torch.Tensor, y_pred: torch.Tensor) -> Union[float, List[float]]:
+        """Calculates the calibration error from the boolean mask of the samples of `class_label`."""
+        # bin samples based on prediction confidence and aggregate the bins at once instead of selecting each bin
+        bin_indices = torch.bucketize(y_pred.detach(), torch.as_tensor(self.bins, dtype=y_pred.dtype), right=True)
+        bin_counts = torch.bincount(bin_indices, minlength=self.num_bins)
+        bin_positives = torch.bincount(bin_indices, weights=class_mask.to(y_pred.dtype), minlength=self.num_bins)
+        bin_confidences = torch.bincount(bin_indices, weights=y_pred.detach(), minlength=self.num_bins)
+        non_empty_bins = bin_counts > 0
+        bin_sizes = bin_counts.clamp(min=1).to(y_pred.dtype)
+        ce_scores = torch.where(non_empty_bins, torch.abs(bin_positives / bin_sizes - bin_confidences / bin_sizes), 0).tolist()
+        bin_weights = (bin_counts.to(y_pred.dtype) / len(y_pred)).tolist()
         if self.sum_up_bins:
             ece_score = sum([score * weight for score, weight in zip(ce_scores, bin_weights)])
             return ece_score
@@ -107,6 +104,7 @@ class BinaryClasswiseExpectedCalibrationErrorMetric(Metric):
     def __init__(self, tag: str, identifier: str, target_subscription_key: str,
                  prediction_subscription_key_0: str, prediction_subscription_key_1: str, class_labels: List[int], num_bins: int = 10):
         super().__init__(tag=tag, identifier=identifier)
+        self.target_subscription_key = target_subscription_key
         self.class_labels = class_labels
         self.class_specific_ece_funs = [ClassSpecificExpectedCalibrationErrorMetric(tag="",
                                                                                     identifier="",
@@ -124,7 +122,11 @@ class BinaryClasswiseExpectedCalibrationErrorMetric(Metric):
                                                                                     sum_up_bins=True), ]
 
     def __call__(self, result_batch: InferenceResultBatch) -> float:
-        return np.mean([fun(result_batch) for fun in self.class_specific_ece_funs])
+        # the class masks are computed at once and shared by the class specific metrics
+        y_true = result_batch.get_targets(self.target_subscription_key).cpu()
+        class_masks = BatchFilter.get_class_selection_masks(y_true, [fun.class_label for fun in self.class_specific_ece_funs])
+        return np.mean([fun.calc_from_class_mask(class_mask, result_batch.get_predictions(fun.prediction_subscription_key).cpu().flatten())
+                        for fun, class_mask in zip(self.class_specific_ece_funs, class_masks)])
 
 
 class BrierScoreMetric(Metric):
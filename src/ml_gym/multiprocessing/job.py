@@ -1,8 +1,13 @@
+import os
+import pickle
+import tempfile
+import weakref
 from abc import abstractmethod
+from dataclasses import dataclass
 from ml_gym.blueprints.blue_prints import BluePrint
 from ml_gym.multiprocessing.states import JobStatus, JobType
 import torch
-from typing import Callable, Dict, List
+from typing import Callable, Dict, List, Set
 
 
 class JobIF:
@@ -68,6 +73,79 @@ class Job(JobIF):
         return self.fun(blueprint=self.blueprint, **self.param_dict)
 
 
+@dataclass
+class JobStatusUpdate:
+    """Fixed schema status delta of a job, which the workers send to the pool instead of the job (and its blueprint)."""
+    job_id: str
+    status: JobStatus
+    starting_time: float
+    finishing_time: float
+    executing_process_id: int
+    device: str
+    error: str = None
+    stacktrace: str = None
+
+    @staticmethod
+    def from_job(job: Job) -> "JobStatusUpdate":
+        return JobStatusUpdate(job_id=job.job_id, status=job.status, starting_time=job.starting_time, finishing_time=job.finishing_time,
+                               executing_process_id=job.executing_process_id, device=str(job.device), error=job.error,
+                               stacktrace=job.stacktrace)
+
+    def apply(self, job: Job):
+        job.status = self.status
+        job.starting_time = self.starting_time
+        job.finishing_time = self.finishing_time
+        job.executing_process_id = self.executing_process_id
+        job.device = torch.device(self.device)
+        job.error = self.error
+        job.stacktrace = self.stacktrace
+
+
+@dataclass
+class JobDescriptor:
+    """Compact reference to a job pickled into a `JobSpool`, which is put on the job queue instead of the job."""
+    job_id: str
+    job_type: JobType
+    spool_path: str
+    offset: int
+    length: int
+
+    def load(self) -> Job:
+        with open(self.spool_path, "rb") as fd:
+            return pickle.loads(os.pread(fd.fileno(), self.length, self.offset))
+
+
+class JobSpool:
+    """Append only file of pickled jobs, from which the worker processes load the jobs of the `JobDescriptor`s. Each job is
+    pickled once, while the job queue only passes the small descriptors. The file is removed by `cleanup()`, when the spool is
+    garbage collected or at interpreter exit."""
+
+    def __init__(self, folder: str = None):
+        fd, self.path = tempfile.mkstemp(prefix="mlgym_jobs_", suffix=".pkl", dir=folder)
+        self._file = os.fdopen(fd, "wb")
+        self._finalizer = weakref.finalize(self, JobSpool._remove, self._file, self.path)
+
+    @staticmethod
+    def _remove(file, path: str):
+        file.close()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def put(self, job: Job) -> JobDescriptor:
+        """Appends the job. The descriptor can be loaded after the next `flush()`."""
+        offset = self._file.tell()
+        length = self._file.write(pickle.dumps(job, protocol=pickle.HIGHEST_PROTOCOL))
+        return JobDescriptor(job_id=job.job_id, job_type=job.job_type, spool_path=self.path, offset=offset, length=length)
+
+    def flush(self):
+        self._file.flush()
+
+    def cleanup(self):
+        self._finalizer()
+
+
 class JobStatusSubscriberIF:
 
     @abstractmethod
@@ -76,16 +154,34 @@ class JobStatusSubscriberIF:
 
 
 class JobCollection:
+    """Collection of the jobs of a pool. The CALC jobs are indexed by their status, so the counts are O(1) per update."""
 
     def __init__(self):
         self.job_dict: Dict[str, Job] = {}
         self.subscribers: List[JobStatusSubscriberIF] = []
+        self._status_index: Dict[JobStatus, Set[str]] = {status: set() for status in JobStatus}
+
+    def _index(self, job: Job):
+        for job_ids in self._status_index.values():
+            job_ids.discard(job.job_id)
+        if job.job_type == JobType.CALC:
+            self._status_index[job.status].add(job.job_id)
 
     def add_or_update_job(self, job: Job):
         self.job_dict[job.job_id] = job
+        self._index(job)
         if job.job_type == JobType.CALC:
             self.update_subscribers(job)
 
+    def apply_update(self, update: JobStatusUpdate) -> Job:
+        """Applies the status delta to its job and returns the job."""
+        job = self.job_dict[update.job_id]
+        update.apply(job)
+        self._index(job)
+        if job.job_type == JobType.CALC:
+            self.update_subscribers(job)
+        return job
+
     def add_subscriber(self, subscriber: JobStatusSubscriberIF):
         self.subscribers.append(subscriber)
 
@@ -93,17 +189,20 @@ class JobCollection:
         for s in self.subscribers:
             s.callback_job_event(job)
 
+    def get_jobs(self, status: JobStatus) -> List[Job]:
+        return [self.job_dict[job_id] for job_id in self._status_index[status]]
+
     def __len__(self) -> int:
-        return len([1 for job in self.job_dict.values() if job.job_type == JobType.CALC])
+        return self.job_count
 
     @property
     def done(self) -> bool:
-        return all([job.status == JobStatus.DONE for job in self.job_dict.values() if job.job_type == JobType.CALC])
+        return self.done_count == self.job_count
 
     @property
-    def done_count(self) -> bool:
-        return sum([job.status == JobStatus.DONE for job in self.job_dict.values() if job.job_type == JobType.CALC])
+    def done_count(self) -> int:
+        return len(self._status_index[JobStatus.DONE])
 
     @property
     def job_count(self) -> int:
-        return len([1 for job in self.job_dict.values() if job.job_type == JobType.CALC])
+        return sum(len(job_ids) for job_ids in self._status_index.values())
@@ -2,7 +2,7 @@ from torch.multiprocessing import Queue
 import tqdm
 import torch
 from typing import List
-from ml_gym.multiprocessing.job import JobType, Job, JobCollection, JobStatusSubscriberIF
+from ml_gym.multiprocessing.job import JobType, Job, JobCollection, JobSpool, JobStatusSubscriberIF, JobStatusUpdate
 from ml_gym.multiprocessing.worker import WorkerProcessWrapper
 from ml_gym.util.logger import QueuedLogging
 from ml_gym.util.logger import LogLevel, QLogger
@@ -34,6 +34,8 @@ class Pool:
         self.logger: QLogger = QueuedLogging.get_qlogger("logger_pool")
         self.logger.log(LogLevel.INFO, f"Initialized to run jobs on: {self.devices}")
         self.job_collection = JobCollection()
+        # the jobs are pickled into the spool once and passed to the workers as small descriptors
+        self.job_spool: JobSpool = None
         if logger_collection_constructable is not None:
             logger_collection = logger_collection_constructable.construct()
             job_status_logger = JobStatusLogger(logger=logger_collection)
@@ -41,13 +43,18 @@ class Pool:
             self.job_collection.add_subscriber(subscriber)
 
     def add_job(self, job: Job):
-        self.job_q.put(job)
-        self.job_collection.add_or_update_job(job)
+        self.add_jobs([job], show_progress=False)
 
-    def add_jobs(self, jobs: List[Job]):
-        self.logger.log(LogLevel.INFO, "Filling up job queue ... ")
-        for job in tqdm.tqdm(jobs):
-            self.job_q.put(job)
+    def add_jobs(self, jobs: List[Job], show_progress: bool = True):
+        if show_progress:
+            self.logger.log(LogLevel.INFO, "Filling up job queue ... ")
+        if self.job_spool is None:
+            self.job_spool = JobSpool()
+        job_descriptors = [self.job_spool.put(job) for job in (tqdm.tqdm(jobs) if show_progress else jobs)]
+        # the descriptors are enqueued after flushing the spool, such that the workers can load the jobs
+        self.job_spool.flush()
+        for job, job_descriptor in zip(jobs, job_descriptors):
+            self.job_q.put(job_descriptor)
             self.job_collection.add_or_update_job(job)
 
     def run(self):
@@ -55,7 +62,10 @@ class Pool:
         termination_jobs = [Job(job_id=i+len(self.job_collection), fun=None, blueprint=None, param_dict=None,
                                 job_type=JobType.TERMINATE) for i in range(self.num_processes)]
         print(f"num_processes: {self.num_processes}")
-        self.add_jobs(termination_jobs)
+        # the termination jobs are small and passed directly, as they may be loaded after the spool was removed
+        for job in termination_jobs:
+            self.job_q.put(job)
+            self.job_collection.add_or_update_job(job)
         # create and start worker processes
         self.logger.log(LogLevel.INFO, f"Creating {self.num_processes} worker processes...")
         for process_id in tqdm.tqdm(range(self.num_processes)):
@@ -65,8 +75,8 @@ class Pool:
             p.start()
         # wait until all jobs are done
         while not self.job_collection.done:
-            updated_job: Job = self.job_update_q.get()
-            self.job_collection.add_or_update_job(updated_job)
+            update: JobStatusUpdate = self.job_update_q.get()
+            updated_job = self.job_collection.apply_update(update)
             if updated_job.status == JobStatus.DONE and updated_job.error is not None:
                 self.logger.log(
                     LogLevel.FATAL, f"FATAL! Job {updated_job.job_id} crashed while being executed by process {updated_job.executing_process_id} on {updated_job.device} after {int(updated_job.finishing_time - updated_job.starting_time)} seconds with error {updated_job.error}")
@@ -77,6 +87,9 @@ class Pool:
                 self.logger.log(LogLevel.INFO, f"Progress: {int(self.job_collection.done_count / self.job_collection.job_count * 100)}%")
             if updated_job.status == JobStatus.DONE and updated_job.job_type == JobType.CALC:
                 self.worker_processes[updated_job.executing_process_id].recreate_process_if_done()
+        if self.job_spool is not None:
+            self.job_spool.cleanup()
+            self.job_spool = None
 
     def create_or_replace_process(self, process_id: int, num_jobs_to_perform: int):
         process = WorkerProcessWrapper(process_id=process_id,
@@ -0,0 +1,171 @@
+import io
+import pickle
+import time
+from dataclasses import dataclass
+from typing import Any, Tuple
+import torch
+import torch.multiprocessing
+
+
+@dataclass
+class SharedTensorHandle:
+    """Picklable reference to an object, whose tensors were written into `slot` of a `SharedTensorRing`. The payload holds
+    the object pickled without its tensors. Objects without tensors and objects that exceed the slot size are pickled
+    entirely into the payload (`slot` is -1)."""
+    slot: int
+    payload: bytes
+
+
+class _SlotOverflowError(Exception):
+    pass
+
+
+class _TensorPickler(pickle.Pickler):
+
+    def __init__(self, file: io.BytesIO, slot_buffer: torch.Tensor, alignment: int):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.slot_buffer = slot_buffer
+        self.alignment = alignment
+        self.offset = 0
+        self.num_tensors = 0
+
+    def persistent_id(self, obj: Any) -> Tuple:
+        # tensor subclasses (e.g., parameters) and non strided tensors are pickled regularly
+        if type(obj) is not torch.Tensor or obj.layout != torch.strided:
+            return None
+        offset = -(-self.offset // self.alignment) * self.alignment
+        num_bytes = obj.numel() * obj.element_size()
+        if offset + num_bytes > len(self.slot_buffer):
+            raise _SlotOverflowError
+        self.slot_buffer[offset:offset + num_bytes].view(obj.dtype).view(obj.shape).copy_(obj.detach())
+        self.offset = offset + num_bytes
+        self.num_tensors += 1
+        return offset, obj.dtype, tuple(obj.shape)
+
+
+class _TensorUnpickler(pickle.Unpickler):
+
+    def __init__(self, file: io.BytesIO, slot_buffer: torch.Tensor):
+        super().__init__(file)
+        self.slot_buffer = slot_buffer
+
+    def persistent_load(self, pid: Tuple) -> torch.Tensor:
+        offset, dtype, shape = pid
+        num_bytes = torch.Size(shape).numel() * torch.empty((), dtype=dtype).element_size()
+        return self.slot_buffer[offset:offset + num_bytes].view(dtype).view(shape)
+
+
+class SharedTensorRing:
+    """Ring of `num_slots` preallocated slots within torch shared memory storage, which passes objects with tensors (e.g.,
+    `DatasetBatch`, `InferenceResultBatch` or `EvaluationBatchResult`) between processes without pickling and copying the
+    tensors through the queues.
+
+    `pack` writes the tensors of an object into a free slot and returns a small handle, which is sent through any queue.
+    The consumers reconstruct the object with `unpack`, whose tensors are views into the slot (zero copy), and must `release`
+    the handle when they are done with the tensors. Each slot is reference counted and reused once all `num_consumers` of
+    its object released it. If no slot is free, `pack` waits up to `timeout` seconds.
+
+    The ring has to be passed to the consumer processes at their creation (e.g., as argument of the `Process`), such that
+    the shared storage is mapped instead of copied. The reference counts are created within the multiprocessing `context`
+    of the processes (the default context by default).
+    """
+
+    alignment = 64
+
+    def __init__(self, num_slots: int = 4, slot_size_bytes: int = 32 * 2**20, timeout: float = 60, context: Any = None):
+        self.num_slots = num_slots
+        self.slot_size_bytes = slot_size_bytes
+        self.timeout = timeout
+        self._buffer = torch.empty(num_slots * slot_size_bytes, dtype=torch.uint8).share_memory_()
+        context = context if context is not None else torch.multiprocessing
+        self._ref_counts = context.Array("q", num_slots)
+        self._next_slot = 0
+
+    def _get_slot_buffer(self, slot: int) -> torch.Tensor:
+        return self._buffer[slot * self.slot_size_bytes:(slot + 1) * self.slot_size_bytes]
+
+    def _acquire_slot(self, num_consumers: int) -> int:
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._ref_counts.get_lock():
+                for i in range(self.num_slots):
+                    slot = (self._next_slot + i) % self.num_slots
+                    if self._ref_counts[slot] == 0:
+                        self._ref_counts[slot] = num_consumers
+                        self._next_slot = slot + 1
+                        return slot
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"No slot of the shared tensor ring was released within {self.timeout} seconds.")
+            time.sleep(0.001)
+
+    def _release_slot(self, slot: int, count: int):
+        with self._ref_counts.get_lock():
+            if self._ref_counts[slot] < count:
+                raise ValueError(f"Slot {slot} of the shared tensor ring was released more often than it was referenced.")
+            self._ref_counts[slot] -= count
+
+    def pack(self, obj: Any, num_consumers: int = 1) -> SharedTensorHandle:
+        slot = self._acquire_slot(num_consumers)
+        file = io.BytesIO()
+        pickler = _TensorPickler(file, self._get_slot_buffer(slot), SharedTensorRing.alignment)
+        try:
+            pickler.dump(obj)
+        except _SlotOverflowError:
+            self._release_slot(slot, num_consumers)
+            return SharedTensorHandle(slot=-1, payload=pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+        # the offset is not sufficient, as empty tensors are persisted without occupying the slot
+        if pickler.num_tensors == 0:
+            self._release_slot(slot, num_consumers)
+            slot = -1
+        return SharedTensorHandle(slot=slot, payload=file.getvalue())
+
+    def unpack(self, handle: SharedTensorHandle) -> Any:
+        if handle.slot < 0:
+            return pickle.loads(handle.payload)
+        return _TensorUnpickler(io.BytesIO(handle.payload), self._get_slot_buffer(handle.slot)).load()
+
+    def release(self, handle: SharedTensorHandle):
+        """Releases the slot of the handle. The tensors of the unpacked object must not be used afterwards."""
+        if handle.slot >= 0:
+            self._release_slot(handle.slot, 1)
+
+    @property
+    def num_free_slots(self) -> int:
+        with self._ref_counts.get_lock():
+            return sum(1 for ref_count in self._ref_counts if ref_count == 0)
+
+
+class SharedObject:
+    """Object received through a `SharedTensorQueue`, which releases its slot on `release()` or when leaving the context."""
+
+    def __init__(self, ring: SharedTensorRing, handle: SharedTensorHandle):
+        self._ring = ring
+        self._handle = handle
+        self.value = ring.unpack(handle)
+
+    def release(self):
+        if self._handle is not None:
+            self._ring.release(self._handle)
+            self._handle = None
+            self.value = None
+
+    def __enter__(self) -> Any:
+        return self.value
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class SharedTensorQueue:
+    """Wraps a multiprocessing queue (e.g., the queues of the `Pool`), such that the tensors of the objects are passed
+    through the `SharedTensorRing` instead of being pickled into the queue."""
+
+    def __init__(self, queue: Any, ring: SharedTensorRing):
+        self.queue = queue
+        self.ring = ring
+
+    def put(self, obj: Any, num_consumers: int = 1, **kwargs):
+        self.queue.put(self.ring.pack(obj, num_consumers), **kwargs)
+
+    def get(self, **kwargs) -> SharedObject:
+        return SharedObject(self.ring, self.queue.get(**kwargs))
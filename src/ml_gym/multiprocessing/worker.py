@@ -2,9 +2,8 @@ from torch.multiprocessing import Process, Queue
 import time
 import torch
 import traceback
-from ml_gym.multiprocessing.job import Job, JobType, JobStatus
+from ml_gym.multiprocessing.job import Job, JobDescriptor, JobStatusUpdate, JobType, JobStatus
 from ml_gym.util.logger import MLgymLoggerIF, LogLevel, QueuedLogging
-from copy import deepcopy
 
 
 class WorkerProcess(Process):
@@ -17,18 +16,20 @@ class WorkerProcess(Process):
         logger.log(LogLevel.INFO, f"Process {self.process_id} started working.")
         jobs_done_count = 0
         for job in iter(job_q.get, None):  # https://stackoverflow.com/a/21157892
+            if isinstance(job, JobDescriptor):
+                job = job.load()
             job.status = JobStatus.RUNNING
             job.device = device
             job.executing_process_id = self.process_id
             logger.log(LogLevel.INFO, f"Process {job.executing_process_id} started job {job.job_id} on {job.device}.")
             job.starting_time = time.time()
-            job_update_q.put(deepcopy(job))
+            job_update_q.put(JobStatusUpdate.from_job(job))
             if job.job_type == JobType.CALC:
                 self._do_calc(job)
             job.finishing_time = time.time()
             job.status = JobStatus.DONE
             jobs_done_count += 1
-            job_update_q.put(deepcopy(job))
+            job_update_q.put(JobStatusUpdate.from_job(job))
             if job.job_type == JobType.TERMINATE or num_jobs_to_perform == jobs_done_count:
                 logger.log(LogLevel.DEBUG, f"Process {self.process_id} terminated.")
                 break
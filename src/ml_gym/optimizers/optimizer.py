@@ -1,35 +1,107 @@
 from typing import Dict, Any, List, Type
+import inspect
+import io
+import pickle
+import zipfile
+import torch
 from torch.optim.optimizer import Optimizer
 from copy import deepcopy
 from ml_gym.error_handling.exception import OptimizerNotInitializedError
+from ml_gym.optimizers.state_precision import StatePrecision, StateCodecFactory
 
 
 class OptimizerAdapter(object):
 
-    def __init__(self, optimizer_class: Type[Optimizer], optimizer_params: Dict = None):
+    def __init__(self, optimizer_class: Type[Optimizer], optimizer_params: Dict = None,
+                 state_precision: StatePrecision = StatePrecision.FP32):
         self._optimizer_class = optimizer_class
         self._optimizer_params = optimizer_params if optimizer_params is not None else {}
+        self._state_precision = state_precision
+        self._state_codec = StateCodecFactory.get_state_codec(state_precision)
 
         self._optimizer: Optimizer = None
         self._state_dict = None
+        self._serialized_state_dict: bytes = None
 
     def register_model_params(self, model_params: Dict, restore_state: bool = True):
-        model_params_list = model_params.values()
+        model_params_list = list(model_params.values())
         if not restore_state:
             self._optimizer = self._optimizer_class(**self._optimizer_params, params=model_params_list)
             return
 
-        # since we instantiate a new optimizer when we register a model, we have to save and restore the optimizer state
         if self._optimizer is not None:
-            state_dict = self.state_dict()
-            self._optimizer = self._optimizer_class(**self._optimizer_params, params=model_params_list)
-            self.load_state_dict(state_dict)
+            # instead of instantiating a new optimizer and round-tripping its state dict, we register the params incrementally
+            # such that the existing optimizer state is kept by reference.
+            self._update_model_params(model_params_list)
         else:
             self._optimizer = self._optimizer_class(**self._optimizer_params, params=model_params_list)
+            if self._serialized_state_dict is not None:
+                self._state_dict = OptimizerAdapter.deserialize_state_dict(self._serialized_state_dict)
+                self._serialized_state_dict = None
             if self._state_dict is not None:
-                self._optimizer.load_state_dict(self._state_dict)
+                self._load_optimizer_state_dict(self._state_dict)
                 self._state_dict = None
 
+    def _update_model_params(self, model_params_list: List[torch.Tensor]):
+        registered_params = [param for group in self._optimizer.param_groups for param in group["params"]]
+        registered_param_ids = {id(param) for param in registered_params}
+        new_param_ids = {id(param) for param in model_params_list}
+
+        if registered_param_ids.issubset(new_param_ids):
+            # the already registered params stay untouched, new params are added as a separate param group
+            params_to_add = [param for param in model_params_list if id(param) not in registered_param_ids]
+            if params_to_add:
+                self._optimizer.add_param_group({"params": params_to_add})
+        elif len(registered_params) == len(model_params_list):
+            # the params were replaced (e.g., model was copied), so we rebind the params and their states by position
+            self._rebind_model_params(model_params_list)
+        else:
+            state_dict = self.state_dict()
+            self._optimizer = self._optimizer_class(**self._optimizer_params, params=model_params_list)
+            self._load_optimizer_state_dict(state_dict)
+
+    def _rebind_model_params(self, model_params_list: List[torch.Tensor]):
+        registered_params = [param for group in self._optimizer.param_groups for param in group["params"]]
+        # we validate all params before mutating the optimizer, such that a failing rebind leaves it untouched
+        if len(registered_params) != len(model_params_list):
+            raise ValueError(f"Cannot rebind {len(registered_params)} registered parameters to {len(model_params_list)} parameters.")
+        for old_param, new_param in zip(registered_params, model_params_list):
+            if old_param.shape != new_param.shape:
+                raise ValueError(f"Cannot rebind parameter of shape {tuple(old_param.shape)} to parameter of shape "
+                                 f"{tuple(new_param.shape)}.")
+        model_params_iter = iter(model_params_list)
+        for group in self._optimizer.param_groups:
+            rebound_params = []
+            for old_param in group["params"]:
+                new_param = next(model_params_iter)
+                if old_param in self._optimizer.state:
+                    self._optimizer.state[new_param] = self._optimizer.state.pop(old_param)
+                rebound_params.append(new_param)
+            group["params"] = rebound_params
+
+    @staticmethod
+    def serialize_state_dict(state_dict: Dict[str, Any]) -> bytes:
+        buffer = io.BytesIO()
+        torch.save(state_dict, buffer)
+        return buffer.getvalue()
+
+    @staticmethod
+    def deserialize_state_dict(serialized_state_dict: bytes) -> Dict[str, Any]:
+        """Deserializes a state dict serialized via `torch.save` onto the CPU. Legacy checkpoints serialized via pickle
+        are loaded via pickle.
+
+        Args:
+            serialized_state_dict (bytes): Serialized optimizer state dict
+
+        Returns:
+            Dict[str, Any]: Deserialized optimizer state dict
+        """
+        if not zipfile.is_zipfile(io.BytesIO(serialized_state_dict)):
+            return pickle.loads(serialized_state_dict)
+        # torch<1.13 does not support restricting the unpickling to tensors and primitive types
+        load_kwargs = {"weights_only": True} if "weights_only" in inspect.signature(torch.load).parameters else {}
+        return torch.load(io.BytesIO(serialized_state_dict), map_location="cpu", **load_kwargs)
+
     def __getstate__(self):
         if self._optimizer is not None:
             return self._optimizer.__getstate__()
@@ -51,16 +123,46 @@ class OptimizerAdapter(object):
     def state_dict(self) -> Dict[str, Any]:
         if self._optimizer is not None:
             return self._optimizer.state_dict()
+        elif self._serialized_state_dict is not None:
+            return OptimizerAdapter.deserialize_state_dict(self._serialized_state_dict)
         elif self._state_dict is not None:
             return self._state_dict
         else:
             raise OptimizerNotInitializedError("Cannot access state_dict, because internal optimizer was not instantiated.")
 
+    def _load_optimizer_state_dict(self, state_dict: Dict):
+        if self._state_codec is None:
+            self._optimizer.load_state_dict(state_dict)
+            return
+        # torch casts the loaded state to the dtype of the params, so we keep the encoded state out of the loading
+        # and put it back afterwards.
+        saved_param_ids = [param_id for group in state_dict["param_groups"] for param_id in group["params"]]
+        params = [param for group in self._optimizer.param_groups for param in group["params"]]
+        param_id_to_param = dict(zip(saved_param_ids, params))
+        state = {}
+        encoded_state = {}
+        for param_id, param_state in state_dict["state"].items():
+            param = param_id_to_param[param_id]
+            state[param_id] = {key: value for key, value in param_state.items() if not self._state_codec.is_encoded(value)}
+            encoded_state[param] = {key: self._state_codec.to(value, param.device)
+                                    for key, value in param_state.items() if self._state_codec.is_encoded(value)}
+        self._optimizer.load_state_dict({**state_dict, "state": state})
+        for param, param_state in encoded_state.items():
+            self._optimizer.state[param].update(param_state)
+
     def load_state_dict(self, state_dict: Dict):
         if self._optimizer is not None:
-            self._optimizer.load_state_dict(state_dict)
+            self._load_optimizer_state_dict(state_dict)
         else:  # here we store the state_dict until we instantiate the optimizer
             self._state_dict = state_dict
+            self._serialized_state_dict = None
+
+    def load_serialized_state_dict(self, serialized_state_dict: bytes):
+        if self._optimizer is not None:
+            self._load_optimizer_state_dict(OptimizerAdapter.deserialize_state_dict(serialized_state_dict))
+        else:  # deserialization is deferred until we instantiate the optimizer
+            self._serialized_state_dict = serialized_state_dict
+            self._state_dict = None
 
     def zero_grad(self, set_to_none: bool = False):
         if self._optimizer is None:
@@ -70,7 +172,29 @@ class OptimizerAdapter(object):
     def step(self, closure=None):
         if self._optimizer is None:
             raise OptimizerNotInitializedError("Internal optimizer was not instantiated. Has a model been registered for this optimizer?")
-        self._optimizer.step(closure)
+        if self._state_codec is None:
+            self._optimizer.step(closure)
+        else:
+            self._step_with_encoded_state(closure)
+
+    def _step_with_encoded_state(self, closure=None):
+        # the optimizer is stepped param by param via a temporary group with the hyperparameters of the param's group,
+        # such that only the state of a single param is decoded at a time.
+        if closure is not None:
+            with torch.enable_grad():
+                closure()
+        param_groups = self._optimizer.param_groups
+        try:
+            for group in param_groups:
+                for param in group["params"]:
+                    if param.grad is None:
+                        continue
+                    self._state_codec.decode_state(self._optimizer.state[param], param)
+                    self._optimizer.param_groups = [{**group, "params": [param]}]
+                    self._optimizer.step()
+                    self._state_codec.encode_state(self._optimizer.state[param], param)
+        finally:
+            self._optimizer.param_groups = param_groups
 
     def add_param_group(self, param_group):
         if self._optimizer is None:
@@ -125,6 +249,9 @@ class OptimizerBundle(OptimizerAdapter):
         for i, state_dict_i in state_dict.items():
             self.optimizers[i].load_state_dict(state_dict_i)
 
+    def load_serialized_state_dict(self, serialized_state_dict: bytes):
+        self.load_state_dict(OptimizerAdapter.deserialize_state_dict(serialized_state_dict))
+
     def zero_grad(self, set_to_none: bool = False, optimizer_id: int = None):
         if optimizer_id is None:
             for _, optimizer in self.optimizers.items():
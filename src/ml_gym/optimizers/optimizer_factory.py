@@ -1,6 +1,7 @@
 from torch.optim import Optimizer, SGD, Adam, Adadelta
 from typing import Dict
 from ml_gym.optimizers.optimizer import OptimizerAdapter
+from ml_gym.optimizers.state_precision import StatePrecision
 
 
 class OptimizerFactory:
@@ -11,6 +12,7 @@ class OptimizerFactory:
     }
 
     @classmethod
-    def get_optimizer(cls, optimizer_key: str, params: Dict) -> OptimizerAdapter:
+    def get_optimizer(cls, optimizer_key: str, params: Dict, state_precision: str = StatePrecision.FP32.value) -> OptimizerAdapter:
         optimizer_class = cls.optimizer_map[optimizer_key]
-        return OptimizerAdapter(optimizer_class=optimizer_class, optimizer_params=params)
+        return OptimizerAdapter(optimizer_class=optimizer_class, optimizer_params=params,
+                                state_precision=StatePrecision(state_precision))
@@ -0,0 +1,109 @@
+from abc import ABC, abstractmethod
+from enum import Enum
+from typing import Any, Dict
+import torch
+import torch.nn.functional as F
+
+
+class StatePrecision(Enum):
+    FP32 = "FP32"
+    BF16 = "BF16"
+    BLOCKWISE_8BIT = "BLOCKWISE_8BIT"
+
+
+class StateCodecIF(ABC):
+    """Encodes the per-parameter optimizer state (e.g., the Adam moments) into a compact representation.
+    Only tensors with the shape of the parameter are encoded, scalars such as the step counter are kept as they are.
+    """
+
+    @abstractmethod
+    def encode(self, tensor: torch.Tensor) -> Any:
+        raise NotImplementedError
+
+    @abstractmethod
+    def decode(self, encoded: Any, param: torch.Tensor) -> torch.Tensor:
+        raise NotImplementedError
+
+    @abstractmethod
+    def is_encoded(self, value: Any) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def to(self, encoded: Any, device: torch.device) -> Any:
+        raise NotImplementedError
+
+    def encode_state(self, state: Dict[str, Any], param: torch.Tensor):
+        for key, value in state.items():
+            if key != "step" and isinstance(value, torch.Tensor) and value.is_floating_point() and value.shape == param.shape:
+                state[key] = self.encode(value)
+
+    def decode_state(self, state: Dict[str, Any], param: torch.Tensor):
+        for key, value in state.items():
+            if self.is_encoded(value):
+                state[key] = self.decode(value, param)
+
+
+class BF16StateCodec(StateCodecIF):
+
+    def encode(self, tensor: torch.Tensor) -> torch.Tensor:
+        return tensor.to(torch.bfloat16)
+
+    def decode(self, encoded: torch.Tensor, param: torch.Tensor) -> torch.Tensor:
+        return encoded.to(param.dtype)
+
+    def is_encoded(self, value: Any) -> bool:
+        return isinstance(value, torch.Tensor) and value.dtype == torch.bfloat16
+
+    def to(self, encoded: torch.Tensor, device: torch.device) -> torch.Tensor:
+        return encoded.to(device)
+
+
+class Blockwise8BitStateCodec(StateCodecIF):
+    """Quantizes the state to 8 bit codes with one absmax scale per block of `block_size` values.
+    To keep the small values of the second moments from collapsing to zero, the values are companded by a signed
+    square root before quantization and the codes are stored as float8 (e4m3) values, which requires torch>=2.1.
+    """
+
+    def __init__(self, block_size: int = 256):
+        self.block_size = block_size
+        self.code_dtype = Blockwise8BitStateCodec.get_code_dtype()
+
+    @staticmethod
+    def get_code_dtype() -> torch.dtype:
+        # resolved lazily, such that older torch versions only fail when the 8 bit state is selected
+        if not hasattr(torch, "float8_e4m3fn"):
+            raise ValueError(f"{StatePrecision.BLOCKWISE_8BIT.value} optimizer state requires torch>=2.1 (found {torch.__version__}).")
+        return torch.float8_e4m3fn
+
+    def encode(self, tensor: torch.Tensor) -> Dict[str, torch.Tensor]:
+        flat_tensor = tensor.detach().reshape(-1).float()
+        blocks = F.pad(flat_tensor, (0, -len(flat_tensor) % self.block_size)).view(-1, self.block_size)
+        companded = blocks.abs().sqrt_().copysign_(blocks)
+        scales = companded.abs().amax(dim=1, keepdim=True).clamp_(min=torch.finfo(torch.float32).tiny)
+        codes = companded.mul_(torch.finfo(self.code_dtype).max / scales).to(self.code_dtype)
+        return {"codes": codes, "scales": scales.squeeze(1)}
+
+    def decode(self, encoded: Dict[str, torch.Tensor], param: torch.Tensor) -> torch.Tensor:
+        companded = encoded["codes"].float().mul_(encoded["scales"].unsqueeze(1) / torch.finfo(self.code_dtype).max)
+        blocks = companded.mul_(companded.abs())
+        return blocks.view(-1)[:param.numel()].view(param.shape).to(param.dtype)
+
+    def is_encoded(self, value: Any) -> bool:
+        return isinstance(value, dict) and "codes" in value and "scales" in value
+
+    def to(self, encoded: Dict[str, torch.Tensor], device: torch.device) -> Dict[str, torch.Tensor]:
+        return {key: value.to(device) for key, value in encoded.items()}
+
+
+class StateCodecFactory:
+
+    @staticmethod
+    def get_state_codec(state_precision: StatePrecision) -> StateCodecIF:
+        if state_precision == StatePrecision.FP32:
+            return None
+        elif state_precision == StatePrecision.BF16:
+            return BF16StateCodec()
+        elif state_precision == StatePrecision.BLOCKWISE_8BIT:
+            return Blockwise8BitStateCodec()
+        else:
+            raise ValueError(f"Unsupported optimizer state precision {state_precision}.")
@@ -4,6 +4,7 @@ from enum import Enum
 from typing import Any, List, Dict
 from ml_gym.multiprocessing.states import JobStatus, JobType
 from ml_gym.io.websocket_client import ClientFactory, BufferedClient
+from ml_gym.optimizers.optimizer import OptimizerAdapter
 import time
 import torch
 import pickle
@@ -147,7 +148,7 @@ class ExperimentStatusLogger:
 
         data_streams = {
             "model": pickle.dumps(model_state_dict) if model_state_dict is not None else None,
-            "optimizer": pickle.dumps(optimizer_state_dict) if optimizer_state_dict is not None else None,
+            "optimizer": OptimizerAdapter.serialize_state_dict(optimizer_state_dict) if optimizer_state_dict is not None else None,
             "stateful_components": pickle.dumps(stateful_components_state_dict) if stateful_components_state_dict is not None else None
         }
 
@@ -11,7 +11,7 @@ from ml_gym.gym.inference_component import InferenceComponent
 from ml_gym.util.grid_search import GridSearch
 from ml_gym.validation.validator_factory import ValidatorFactory
 from ml_gym.io.config_parser import YAMLConfigLoader
-from ml_gym.batching.batch import InferenceResultBatch, DatasetBatch
+from ml_gym.batching.batch import InferenceResultBatch, DatasetBatch, InferenceResultBatchAggregator
 from ml_gym.gym.predict_postprocessing_component import PredictPostprocessingComponent
 from ml_gym.gym.post_processing import PredictPostProcessingIF
 import tqdm
@@ -72,8 +72,10 @@ class ExportedModel:
 
     def predict_data_loader(self, dataset_loader: DatasetLoader, no_grad: bool = True) -> InferenceResultBatch:
         dataset_loader.device = self._device
-        result_batches = [self.predict_dataset_batch(batch, no_grad) for batch in tqdm.tqdm(dataset_loader, desc="Batches processed:")]
-        return InferenceResultBatch.combine(result_batches)
+        result_aggregator = InferenceResultBatchAggregator(num_samples=len(dataset_loader.dataset))
+        for batch in tqdm.tqdm(dataset_loader, desc="Batches processed:"):
+            result_aggregator.add(self.predict_dataset_batch(batch, no_grad))
+        return result_aggregator.get_result()
 
     @staticmethod
     def from_model_and_preprocessors(model: NNModel, post_processors: List[PredictPostProcessingIF], model_path: str,